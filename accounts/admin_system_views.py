@@ -11,6 +11,7 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from taskmanager.response_cache import cache_stats
 from .models import User
 from .admin_models import AdminAuditLog
 from .admin_serializers import AdminUserSerializer
@@ -115,6 +116,7 @@ def system_health(request):
             'active_users': active_users,
             'recent_logins_24h': recent_logins,
             'server_time': timezone.now().isoformat(),
+            'response_cache': cache_stats(),
             'status': 'operational'
         }
         
@@ -2,8 +2,7 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
-from django.utils import timezone
+from django.db.models import Count, Q, Sum
 from django.http import HttpResponse
 import csv
 import json
@@ -15,6 +14,7 @@ from .admin_serializers import (
     AdminUserSerializer, AdminUserCreateSerializer, AdminUserUpdateSerializer,
     AdminProjectSerializer, AdminAnalyticsSerializer, AdminAuditLogSerializer
 )
+from analytics.models import TaskRollup, ProjectDailyRollup
 from projects.models import Project
 from tasks.models import Task
 
@@ -147,32 +147,43 @@ def admin_analytics(request):
     total_users = User.objects.count()
     active_users = User.objects.filter(is_active=True).count()
     
+    # Projects by status (from the daily rollup)
+    projects_by_status = dict(
+        ProjectDailyRollup.objects.filter(project_count__gt=0).values('status')
+        .annotate(count=Sum('project_count')).values_list('status', 'count')
+    )
+    
     # Project statistics
-    total_projects = Project.objects.count()
-    active_projects = Project.objects.filter(status__in=['planning', 'active']).count()
+    total_projects = sum(projects_by_status.values())
+    active_projects = projects_by_status.get('planning', 0) + projects_by_status.get('active', 0)
+    
+    # Tasks by status (from the rollup)
+    tasks_by_status = dict(
+        TaskRollup.objects.filter(task_count__gt=0).values('status')
+        .annotate(count=Sum('task_count')).values_list('status', 'count')
+    )
     
     # Task statistics
-    total_tasks = Task.objects.count()
-    completed_tasks = Task.objects.filter(status='completed').count()
-    overdue_tasks = Task.objects.filter(
-        due_date__lt=timezone.now(),
-        status__in=['todo', 'in_progress', 'review']
-    ).count()
+    total_tasks = sum(tasks_by_status.values())
+    completed_tasks = tasks_by_status.get('completed', 0)
+    overdue_tasks = Task.objects.overdue().count()
     
     # Users by role
     users_by_role = dict(User.objects.values('role').annotate(count=Count('id')).values_list('role', 'count'))
     
-    # Projects by status
-    projects_by_status = dict(Project.objects.values('status').annotate(count=Count('id')).values_list('status', 'count'))
-    
-    # Tasks by status
-    tasks_by_status = dict(Task.objects.values('status').annotate(count=Count('id')).values_list('status', 'count'))
-    
-    # Workload distribution
+    # Workload distribution, one grouped rollup query instead of two counts per user
+    workload = {
+        row['assigned_to']: row
+        for row in TaskRollup.objects.values('assigned_to').annotate(
+            total=Sum('task_count'),
+            completed=Sum('task_count', filter=Q(status='completed')),
+        )
+    }
     workload_distribution = []
     for user in User.objects.filter(is_active=True):
-        task_count = user.assigned_tasks.count()
-        completed_count = user.assigned_tasks.filter(status='completed').count()
+        row = workload.get(user.id, {})
+        task_count = row.get('total') or 0
+        completed_count = row.get('completed') or 0
         workload_distribution.append({
             'user': f"{user.first_name} {user.last_name}".strip() or user.username,
             'role': user.role,
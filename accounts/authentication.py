@@ -0,0 +1,152 @@
+"""
+JWT authentication with a cached token-to-user lookup.
+
+simplejwt loads the User row on every request, and TaskConsumer did the same
+per connection. Here the user is rebuilt from a small snapshot held in a
+per-process LRU (a few seconds) in front of the Django cache (a minute), so
+the warm path costs no query. accounts.signals drops both entries whenever a
+user is saved or deleted; other processes' LRUs age out within
+AUTH_USER_LOCAL_TTL.
+
+The password hash is never cached: it is left deferred on the rebuilt user,
+so ``check_password`` loads it on demand and ``save()`` leaves it alone.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+CACHE_KEY = 'auth:user:{}'
+
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+def snapshot_fields():
+    return [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def user_snapshot(user):
+    return {
+        'values': [getattr(user, field) for field in snapshot_fields()],
+        'revoke_hash': get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None,
+    }
+
+
+def build_user(snapshot):
+    """A fresh instance per call so requests never share mutable state"""
+    user = User.from_db(User.objects.db, snapshot_fields(), snapshot['values'])
+    user._revoke_hash = snapshot['revoke_hash']
+    return user
+
+
+def _local_get(user_id):
+    with _lock:
+        entry = _local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            del _local[user_id]
+            return None
+        _local.move_to_end(user_id)
+        return snapshot
+
+
+def _local_set(user_id, snapshot):
+    with _lock:
+        _local[user_id] = (time.monotonic() + getattr(settings, 'AUTH_USER_LOCAL_TTL', 5), snapshot)
+        _local.move_to_end(user_id)
+        while len(_local) > getattr(settings, 'AUTH_USER_LOCAL_SIZE', 1024):
+            _local.popitem(last=False)
+
+
+def get_cached_user(user_id):
+    """The user for ``user_id`` or None, hitting the database only on a double miss"""
+    snapshot = _local_get(user_id)
+    if snapshot is None:
+        try:
+            snapshot = cache.get(cache_key(user_id))
+        except Exception:
+            # A cache outage must not lock everyone out
+            snapshot = None
+        if snapshot is None:
+            user = User.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            snapshot = user_snapshot(user)
+            try:
+                cache.set(cache_key(user_id), snapshot, getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+            except Exception:
+                pass
+        _local_set(user_id, snapshot)
+    return build_user(snapshot)
+
+
+def invalidate_user(user_id):
+    def drop():
+        with _lock:
+            _local.pop(user_id, None)
+        try:
+            cache.delete(cache_key(user_id))
+        except Exception:
+            pass
+
+    drop()
+    # Again after commit, in case a concurrent miss re-cached the old row meanwhile
+    transaction.on_commit(drop)
+
+
+def clear_local_cache():
+    with _lock:
+        _local.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication whose user lookup goes through get_cached_user"""
+    
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user._revoke_hash:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+def user_from_token(raw_token):
+    """Active user for a raw access token, or None; used by the WebSocket consumer"""
+    authentication = CachedJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:03
+
+import blobs.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_adminauditlog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=blobs.storage.ContentAddressedStorage(), upload_to='profiles/'),
+        ),
+    ]
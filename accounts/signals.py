@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from projects.models import Project
+from taskmanager.versions import ADMIN_SCOPE, bump, scoped
+from .authentication import invalidate_user
+
+User = get_user_model()
+
+
+def user_namespaces(user):
+    """
+    The user lists showing ``user``, and the task and project lists of
+    everyone sharing a project with them (those lists embed the user)
+    """
+    audience = Project.objects.filter(
+        Q(created_by=user) | Q(assigned_to=user) | Q(tasks__assigned_to=user) | Q(tasks__created_by=user)
+    ).audience() | {user.pk}
+    # Managers list every manager and intern; the role may just have changed, so always bump it
+    return [
+        f'users:{ADMIN_SCOPE}', 'users:manager', f'users:{user.pk}',
+        *scoped('tasks', audience), *scoped('projects', audience),
+    ]
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Covers profile edits, role changes and deactivation"""
+    invalidate_user(instance.pk)
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        # Logging in changes nothing any list shows
+        return
+    bump(*user_namespaces(instance))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Before the cascade removes the projects and tasks that make up the audience
+    bump(*user_namespaces(instance))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
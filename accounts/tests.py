@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from taskmanager.testing import create_user
+from .authentication import clear_local_cache, get_cached_user, user_from_token
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.user = create_user('intern', 'intern')
+        self.admin = create_user('admin', 'admin', is_staff=True)
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def test_warm_path_makes_no_queries(self):
+        self.login(self.user)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['username'], 'intern')
+
+        # Another process: empty LRU, shared cache still warm
+        clear_local_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_role_change_is_seen_immediately(self):
+        self.login(self.user)
+        self.client.get('/api/auth/profile/')
+
+        self.user.role = 'manager'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').data['role'], 'manager')
+
+    def test_deactivated_and_deleted_users_are_rejected(self):
+        self.login(self.user)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        self.login(self.admin)
+        response = self.client.post('/api/admin/users/deactivate/', {'user_id': self.user.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.login(self.user)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        self.assertIsNone(user_from_token(str(AccessToken.for_user(self.user))))
+
+        self.user.delete()
+        self.assertIsNone(get_cached_user(self.user.id))
+
+    def test_saving_a_cached_user_keeps_the_password(self):
+        self.login(self.user)
+        response = self.client.patch('/api/auth/profile/', {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Ada')
+        self.assertTrue(self.user.check_password('pass12345'))
+
+    def test_profile_edits_do_not_write_back_cached_fields(self):
+        self.login(self.user)
+        self.client.get('/api/auth/profile/')
+        # Changed elsewhere, without the signals that clear this process's cache
+        User.objects.filter(pk=self.user.pk).update(role='manager', is_active=False)
+
+        response = self.client.patch('/api/auth/profile/', {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.role, self.user.is_active), ('Ada', 'manager', False))
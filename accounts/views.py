@@ -3,6 +3,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from taskmanager.compiled import CompiledListMixin
+from taskmanager.fieldsets import SparseFieldsetViewMixin
+from taskmanager.response_cache import CachedListMixin
 from .models import User
 from .serializers import UserRegistrationSerializer, UserSerializer, LoginSerializer
 
@@ -59,16 +62,21 @@ def logout_view(request):
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(SparseFieldsetViewMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # request.user is rebuilt from a cached snapshot; saving it could write
+        # back a role or is_active another process has changed since
+        return User.objects.get(pk=self.request.user.pk)
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(CachedListMixin, CompiledListMixin, SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = UserSerializer
+    cache_namespaces = ('users:{role}', 'users:{user}')
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.rollups import ROLLUPS, is_daily, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the analytics rollups from the task and project tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only refresh the most recent N days of the daily (project) rollup',
+        )
+        parser.add_argument(
+            '--rollup',
+            choices=sorted(ROLLUPS),
+            action='append',
+            help='Rollup to rebuild (repeatable, default: all)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.localdate() - timedelta(days=options['days'])
+
+        for name in options['rollup'] or sorted(ROLLUPS):
+            rows = rebuild_rollups(name, since=since)
+            scope = f"since {since}" if since and is_daily(name) else "full history"
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {name} rollup ({scope}): {rows} row(s)"))
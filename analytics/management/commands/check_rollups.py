@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.rollups import ROLLUPS, find_rollup_drift
+
+
+class Command(BaseCommand):
+    help = 'Compare the analytics rollups against the raw task and project tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only check the most recent N days of the daily (project) rollup',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days'] is not None:
+            since = timezone.localdate() - timedelta(days=options['days'])
+
+        total = 0
+        for name in sorted(ROLLUPS):
+            drift = find_rollup_drift(name, since=since)
+            for key, stored, expected in drift:
+                self.stdout.write(f"{name} {key}: stored {stored}, expected {expected}")
+            total += len(drift)
+
+        if total:
+            raise CommandError(f"{total} rollup bucket(s) disagree with the raw tables; run backfill_rollups")
+        self.stdout.write(self.style.SUCCESS('Rollups are consistent'))
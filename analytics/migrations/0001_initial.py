@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Project = apps.get_model('projects', 'Project')
+    TaskDailyRollup = apps.get_model('analytics', 'TaskDailyRollup')
+    ProjectDailyRollup = apps.get_model('analytics', 'ProjectDailyRollup')
+
+    task_rows = Task.objects.order_by().annotate(day=TruncDate('updated_at')).values(
+        'day', 'project_id', 'assigned_to_id', 'created_by_id', 'status'
+    ).annotate(task_count=Count('id'))
+    TaskDailyRollup.objects.bulk_create(
+        (TaskDailyRollup(**row) for row in task_rows), batch_size=2000
+    )
+
+    project_rows = Project.objects.order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'created_by_id', 'status'
+    ).annotate(project_count=Count('id'))
+    ProjectDailyRollup.objects.bulk_create(
+        (ProjectDailyRollup(**row) for row in project_rows), batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0003_task_counters'),
+        ('tasks', '0004_task_overdue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('project_count', models.IntegerField(default=0)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('task_count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'day'], name='task_rollup_status_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'project', 'assigned_to', 'created_by', 'status'), name='unique_task_daily_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='projectdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'created_by', 'status'), name='unique_project_daily_rollup'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:21
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def clear_task_rollups(apps, schema_editor):
+    # Rows merge once the creator leaves the key; rebuilt below
+    apps.get_model('analytics', 'TaskDailyRollup').objects.all().delete()
+
+
+def rebuild_task_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskDailyRollup = apps.get_model('analytics', 'TaskDailyRollup')
+
+    rows = Task.objects.order_by().annotate(day=TruncDate('updated_at')).values(
+        'day', 'project_id', 'assigned_to_id', 'status'
+    ).annotate(task_count=Count('id'))
+    TaskDailyRollup.objects.bulk_create(
+        (TaskDailyRollup(**row) for row in rows), batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_task_rollups, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='taskdailyrollup',
+            name='unique_task_daily_rollup',
+        ),
+        migrations.RemoveField(
+            model_name='taskdailyrollup',
+            name='created_by',
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'project', 'assigned_to', 'status'), name='unique_task_daily_rollup'),
+        ),
+        migrations.RunPython(rebuild_task_rollups, clear_task_rollups),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def rebuild_task_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskRollup = apps.get_model('analytics', 'TaskRollup')
+
+    rows = Task.objects.order_by().values(
+        'project_id', 'assigned_to_id', 'status'
+    ).annotate(task_count=Count('id'))
+    TaskRollup.objects.bulk_create(
+        (TaskRollup(**row) for row in rows), batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0002_task_rollup_without_creator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('task_count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+        ),
+        migrations.DeleteModel(
+            name='TaskDailyRollup',
+        ),
+        migrations.AddConstraint(
+            model_name='taskrollup',
+            constraint=models.UniqueConstraint(fields=('project', 'assigned_to', 'status'), name='unique_task_rollup'),
+        ),
+        migrations.RunPython(rebuild_task_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+from django.db import models
+from django.db.models import Q
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class TaskRollupQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Task.objects.visible_to over rollup keys. For managers this covers
+        their assignments and projects; tasks they created elsewhere have no
+        rollup key and are added by analytics.rollups.task_counts.
+        """
+        if user.is_admin:
+            return self
+        if user.is_manager:
+            return self.filter(Q(assigned_to=user) | Q(project__created_by=user))
+        return self.filter(assigned_to=user)
+
+
+class TaskRollup(models.Model):
+    """
+    Number of tasks currently in ``status``, per project and assignee. Rows
+    are deleted when their count reaches zero, so the table grows with the
+    number of (project, assignee, status) combinations, not with history.
+    """
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='+')
+    assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    task_count = models.IntegerField(default=0)
+    
+    objects = TaskRollupQuerySet.as_manager()
+    
+    KEY_FIELDS = ('project_id', 'assigned_to_id', 'status')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'assigned_to', 'status'],
+                name='unique_task_rollup',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.status}: {self.task_count}"
+
+
+class ProjectDailyRollup(models.Model):
+    """Number of projects created on ``day``, per creator and current status"""
+    day = models.DateField()
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    project_count = models.IntegerField(default=0)
+    
+    KEY_FIELDS = ('day', 'created_by_id', 'status')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'created_by', 'status'],
+                name='unique_project_daily_rollup',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.project_count}"
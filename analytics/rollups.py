@@ -0,0 +1,187 @@
+"""
+Incremental maintenance of the rollup tables.
+
+TaskRollup counts tasks per (project, assignee, status), the keys the task
+reports group and filter on; ProjectDailyRollup counts projects per creation
+day, creator and status for the monthly report. Both are pure functions of
+the current task/project rows, so they are kept exact by applying -1/+1
+deltas for every (before, after) snapshot pair, and can always be rebuilt
+from the raw tables (the project rollup also for a recent window). Rows
+whose count drops to zero are deleted, so the tables only hold keys that
+still have tasks or projects.
+"""
+
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TaskRollup, ProjectDailyRollup
+
+
+def task_key(state):
+    return (
+        state['project_id'],
+        state['assigned_to_id'],
+        state['status'],
+    )
+
+
+def project_key(state):
+    return (
+        timezone.localdate(state['created_at']),
+        state['created_by_id'],
+        state['status'],
+    )
+
+
+def rollup_deltas(changes, key):
+    deltas = Counter()
+    for before, after in changes:
+        if before is not None:
+            deltas[key(before)] -= 1
+        if after is not None:
+            deltas[key(after)] += 1
+    return {rollup_key: delta for rollup_key, delta in deltas.items() if delta}
+
+
+def add_to_row(model, count_field, lookup, delta):
+    rows = model.objects.filter(**lookup)
+    while not rows.update(**{count_field: F(count_field) + delta}):
+        if delta < 0:
+            return  # Already drifted; check_rollups reports it
+        # Missing, or deleted at zero by a concurrent writer since bulk_create
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **{count_field: delta})
+            return
+        except IntegrityError:
+            continue
+    if delta < 0:
+        rows.filter(**{count_field: 0}).delete()
+
+
+def apply_deltas(model, count_field, deltas):
+    if not deltas:
+        return
+    created = [
+        model(**dict(zip(model.KEY_FIELDS, rollup_key)))
+        for rollup_key, delta in deltas.items() if delta > 0
+    ]
+    if created:
+        model.objects.bulk_create(created, ignore_conflicts=True)
+    for rollup_key, delta in sorted(deltas.items()):
+        add_to_row(model, count_field, dict(zip(model.KEY_FIELDS, rollup_key)), delta)
+
+
+def update_task_rollups(changes):
+    apply_deltas(TaskRollup, 'task_count', rollup_deltas(changes, task_key))
+
+
+def update_project_rollups(changes):
+    apply_deltas(ProjectDailyRollup, 'project_count', rollup_deltas(changes, project_key))
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def expected_task_rollups(since=None):
+    """The task rollup has no day, so it is always compared and rebuilt whole"""
+    from tasks.models import Task
+    rows = Task.objects.order_by().values('project_id', 'assigned_to_id', 'status').annotate(count=Count('id'))
+    return {(row['project_id'], row['assigned_to_id'], row['status']): row['count'] for row in rows}
+
+
+def expected_project_rollups(since=None):
+    from projects.models import Project
+    projects = Project.objects.order_by()
+    if since is not None:
+        projects = projects.filter(created_at__gte=start_of_day(since))
+    rows = projects.annotate(day=TruncDate('created_at')).values(
+        'day', 'created_by_id', 'status'
+    ).annotate(count=Count('id'))
+    return {
+        (row['day'], row['created_by_id'], row['status']): row['count']
+        for row in rows
+    }
+
+
+def stored_rollups(model, count_field, since=None):
+    rows = model.objects.exclude(**{count_field: 0})
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    return {
+        row[:-1]: row[-1]
+        for row in rows.values_list(*model.KEY_FIELDS, count_field).iterator()
+    }
+
+
+ROLLUPS = {
+    'task': (TaskRollup, 'task_count', expected_task_rollups),
+    'project': (ProjectDailyRollup, 'project_count', expected_project_rollups),
+}
+
+
+def is_daily(name):
+    """Whether the rollup is keyed by day, so it can be rebuilt or checked for a recent window"""
+    return 'day' in ROLLUPS[name][0].KEY_FIELDS
+
+
+def rebuild_rollups(name, since=None, batch_size=2000):
+    """Replace the rollup rows for days >= since (or everything) with a fresh GROUP BY"""
+    model, count_field, expected = ROLLUPS[name]
+    if not is_daily(name):
+        since = None
+    with transaction.atomic():
+        stale = model.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+        rows = [
+            model(**dict(zip(model.KEY_FIELDS, rollup_key)), **{count_field: count})
+            for rollup_key, count in expected(since).items()
+        ]
+        model.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def find_rollup_drift(name, since=None):
+    """Return [(key, stored, expected)] where the rollup disagrees with the raw table"""
+    model, count_field, expected = ROLLUPS[name]
+    if not is_daily(name):
+        since = None
+    wanted = expected(since)
+    stored = stored_rollups(model, count_field, since)
+    return [
+        (rollup_key, stored.get(rollup_key, 0), wanted.get(rollup_key, 0))
+        for rollup_key in sorted(set(wanted) | set(stored))
+        if stored.get(rollup_key, 0) != wanted.get(rollup_key, 0)
+    ]
+
+
+def task_counts(user, *fields):
+    """
+    ``{values of fields: count}`` over Task.objects.visible_to(user), grouped
+    on rollup fields (``status``, ``assigned_to__username``, ...). Managers
+    also see tasks they created in projects they do not own and assigned to
+    someone else; the rollup has no creator key, so those few are grouped
+    from the task table.
+    """
+    from tasks.models import Task
+    sources = [
+        TaskRollup.objects.visible_to(user).order_by().values(*fields).annotate(count=Sum('task_count'))
+    ]
+    if user.is_manager:
+        created_elsewhere = Task.objects.filter(created_by=user).exclude(assigned_to=user).exclude(
+            project__created_by=user
+        )
+        sources.append(created_elsewhere.order_by().values(*fields).annotate(count=Count('id')))
+    counts = Counter()
+    for rows in sources:
+        for row in rows:
+            counts[tuple(row[field] for field in fields)] += row['count']
+    return +counts
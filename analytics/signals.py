@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from projects.models import Project
+from .rollups import update_project_rollups
+
+
+@receiver(post_save, sender=Project)
+def project_rollup_on_save(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, '_loaded_state', None)
+    update_project_rollups([(before, instance.snapshot())])
+
+
+@receiver(post_delete, sender=Project)
+def project_rollup_on_delete(sender, instance, **kwargs):
+    before = getattr(instance, '_loaded_state', None) or instance.snapshot()
+    update_project_rollups([(before, None)])
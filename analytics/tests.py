@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from taskmanager.testing import create_project, create_user
+from tasks.models import Task
+from .models import TaskRollup
+from .rollups import find_rollup_drift
+
+
+class RollupTests(APITestCase):
+    def setUp(self):
+        self.admin = create_user('admin', 'admin')
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+
+    def create_task(self, **kwargs):
+        return Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.manager, **kwargs
+        )
+
+    def assertConsistent(self):
+        self.assertEqual(find_rollup_drift('task'), [])
+        self.assertEqual(find_rollup_drift('project'), [])
+
+    def test_rollups_track_writes_exactly(self):
+        first = self.create_task()
+        second = self.create_task(status='completed')
+        self.assertConsistent()
+
+        # Editing a task last touched yesterday leaves its rollup row where it is
+        yesterday = timezone.now() - timedelta(days=1)
+        Task.objects.filter(pk=second.pk).update(updated_at=yesterday)
+        call_command('backfill_rollups', '--days', '2', stdout=StringIO())
+        self.assertConsistent()
+        rows = list(TaskRollup.objects.order_by('pk').values_list('pk', 'status', 'task_count'))
+
+        second = Task.objects.get(pk=second.pk)
+        second.title = 'Edited'
+        second.save()
+        self.assertEqual(list(TaskRollup.objects.order_by('pk').values_list('pk', 'status', 'task_count')), rows)
+        first.status = 'completed'
+        first.assigned_to = self.manager
+        first.save()
+        self.assertConsistent()
+
+        Task.objects.get(pk=first.pk).delete()
+        self.project.status = 'active'
+        self.project.save()
+        self.assertConsistent()
+
+    def test_check_command_detects_drift(self):
+        self.create_task()
+        TaskRollup.objects.update(task_count=5)
+        with self.assertRaises(CommandError):
+            call_command('check_rollups', stdout=StringIO())
+        call_command('backfill_rollups', stdout=StringIO())
+        call_command('check_rollups', stdout=StringIO())
+
+    def test_analytics_endpoints_read_rollups(self):
+        self.create_task(status='completed')
+        self.create_task()
+
+        self.client.force_authenticate(self.intern)
+        response = self.client.get('/api/tasks/analytics/?include=daily')
+        self.assertEqual(response.data['daily_completions'], [{'day': timezone.localdate(), 'count': 1}])
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/admin/analytics/')
+        self.assertEqual(response.data['tasks_by_status'], {'completed': 1, 'todo': 1})
+        self.assertEqual(response.data['total_projects'], 1)
+        workload = {row['user']: row['total_tasks'] for row in response.data['workload_distribution']}
+        self.assertEqual(workload['intern'], 2)
+
+        response = self.client.get('/api/projects/analytics/')
+        self.assertEqual(response.data['monthly_projects'], [
+            {'month': timezone.localdate().strftime('%Y-%m'), 'count': 1}
+        ])
+
+    def test_rollup_rows_reaching_zero_are_deleted(self):
+        task = self.create_task()
+        task.status = 'completed'
+        task.save()
+        self.assertEqual(list(TaskRollup.objects.values_list('status', 'task_count')), [('completed', 1)])
+        task.delete()
+        self.assertFalse(TaskRollup.objects.exists())
+        self.assertConsistent()
+
+    def test_task_analytics_counts_match_the_raw_scope(self):
+        other = create_user('other', 'manager')
+        elsewhere = create_project(other, 'Elsewhere')
+        self.create_task(status='completed')
+        self.create_task()
+        # Visible to the manager only as its creator, which the rollup key does not carry
+        Task.objects.create(title='Created', project=elsewhere, assigned_to=self.intern, created_by=self.manager)
+        Task.objects.create(title='Hidden', project=elsewhere, assigned_to=other, created_by=other)
+
+        for user, total in ((self.manager, 3), (self.intern, 3), (self.admin, 4)):
+            self.client.force_authenticate(user)
+            response = self.client.get('/api/tasks/analytics/?include=status,workload')
+            tasks = Task.objects.visible_to(user)
+            self.assertEqual(response.data['total_tasks'], total)
+            self.assertEqual(
+                {row['status']: row['count'] for row in response.data['status_distribution']},
+                {row['status']: row['count'] for row in tasks.values('status').annotate(count=Count('id'))},
+            )
+            self.assertEqual(
+                {row['assigned_to__username']: row['count'] for row in response.data['workload_distribution']},
+                {
+                    row['assigned_to__username']: row['count']
+                    for row in tasks.values('assigned_to__username').annotate(count=Count('id'))
+                },
+            )
@@ -0,0 +1,106 @@
+"""
+Garbage collection for blobs.storage.
+
+A blob is removed once nothing references it and it has not been written,
+reused or released for ``grace`` (so an upload whose row is still being
+saved is never collected). ``recount`` rebuilds the reference counts from
+the tables, for writes that bypassed model signals such as
+QuerySet.update().
+"""
+
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Blob
+from .signals import tracked_fields
+from .storage import BLOB_DIR, blob_storage
+
+GRACE = timedelta(hours=24)
+
+
+def count_references():
+    """``{blob name: references}`` from every tracked field"""
+    counts = Counter()
+    for model in apps.get_models():
+        for field in tracked_fields(model):
+            names = model._base_manager.filter(**{f'{field.attname}__startswith': f'{BLOB_DIR}/'})
+            counts.update(names.values_list(field.attname, flat=True).iterator())
+    return counts
+
+
+def recount():
+    """Store the real reference counts; returns how many blobs were off"""
+    counts = count_references()
+    fixed = 0
+    with transaction.atomic():
+        for blob in Blob.objects.select_for_update().iterator():
+            refs = counts.pop(blob.name, 0)
+            if blob.refs != refs:
+                Blob.objects.filter(pk=blob.pk).update(refs=refs, updated_at=timezone.now())
+                fixed += 1
+        for name, refs in counts.items():
+            Blob.objects.create(name=name, refs=refs)
+            fixed += 1
+    return fixed
+
+
+def _collect_blob(name, cutoff, storage):
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(pk=name, refs=0, updated_at__lt=cutoff).first()
+        if blob is None:
+            return False
+        storage.remove_blob(name)
+        blob.delete()
+    return True
+
+
+def _orphan_files(storage, cutoff):
+    """Blob files without a Blob row, such as a write whose transaction rolled back"""
+    root = storage.path(BLOB_DIR)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if storage.get_modified_time(name) < cutoff and not Blob.objects.filter(pk=name).exists():
+                yield name
+
+
+def _collect_orphan(name, cutoff, storage):
+    # Claiming the row first makes a concurrent save() of the same contents
+    # wait in Blob.objects.touch until the file is gone, then write it afresh
+    with transaction.atomic():
+        _, created = Blob.objects.select_for_update().get_or_create(name=name)
+        if not created:
+            # Saved since the scan
+            return False
+        removable = storage.exists(name) and storage.get_modified_time(name) < cutoff
+        if removable:
+            storage.remove_blob(name)
+        Blob.objects.filter(pk=name).delete()
+    return removable
+
+
+def collect(grace=GRACE, dry_run=False, storage=None):
+    """Remove unreferenced blobs; returns ``(count, bytes)``"""
+    storage = storage or blob_storage
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+
+    unreferenced = Blob.objects.filter(refs=0, updated_at__lt=cutoff).values_list('name', flat=True)
+    for name in list(unreferenced.iterator()):
+        size = storage.size(name) if storage.exists(name) else 0
+        if dry_run or _collect_blob(name, cutoff, storage):
+            removed += 1
+            freed += size
+
+    for name in list(_orphan_files(storage, cutoff)):
+        size = storage.size(name)
+        if dry_run or _collect_orphan(name, cutoff, storage):
+            removed += 1
+            freed += size
+    return removed, freed
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from blobs.collection import GRACE, collect, recount
+
+
+class Command(BaseCommand):
+    help = 'Remove stored files that no attachment or profile picture references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=GRACE.total_seconds() / 3600,
+            help='Keep unreferenced blobs touched within this many hours',
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Rebuild reference counts from the tables first',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be removed without removing it',
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = recount()
+            self.stdout.write(f"Corrected {fixed} reference count(s)")
+
+        removed, freed = collect(grace=timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} blob(s), {freed} bytes"))
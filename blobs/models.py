@@ -0,0 +1,50 @@
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class BlobQuerySet(models.QuerySet):
+    def touch(self, name, sha256, size):
+        """Lock the row for ``name``, creating it if needed, and restart its grace period"""
+        blob, created = self.select_for_update().get_or_create(
+            name=name, defaults={'sha256': sha256, 'size': size}
+        )
+        if not created:
+            self.filter(pk=name).update(updated_at=timezone.now())
+        return blob
+    
+    def acquire(self, names):
+        for name in names:
+            updated = self.filter(pk=name).update(refs=F('refs') + 1, updated_at=timezone.now())
+            if not updated:
+                # A blob written before reference counting started
+                self.get_or_create(name=name, defaults={'refs': 1})
+    
+    def release(self, names):
+        for name in names:
+            self.filter(pk=name, refs__gt=0).update(refs=F('refs') - 1, updated_at=timezone.now())
+
+
+class Blob(models.Model):
+    """
+    One stored file in blobs.storage, shared by every field value that has
+    the same contents. ``refs`` counts the rows pointing at it; blobs left at
+    zero are removed by ``manage.py collect_blobs``.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last write, dedupe hit or reference change; the GC grace period runs from here
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    objects = BlobQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['refs', 'updated_at'], name='blob_refs_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from .models import Blob
+from .storage import ContentAddressedStorage, is_blob_name
+
+
+def tracked_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def current_names(instance, fields):
+    # Deferred fields are left out rather than loaded
+    return {field.attname: instance.__dict__[field.attname] for field in fields if field.attname in instance.__dict__}
+
+
+def name_of(value):
+    return getattr(value, 'name', value) or ''
+
+
+def connect_reference_tracking():
+    """Count references for every FileField stored in a ContentAddressedStorage"""
+    for model in apps.get_models():
+        fields = tracked_fields(model)
+        if not fields:
+            continue
+        uid = f'blobs:{model._meta.label}'
+
+        def remember(sender, instance, fields=fields, **kwargs):
+            instance._blob_names = {
+                attname: name_of(value) for attname, value in current_names(instance, fields).items()
+            }
+
+        def fill_unknown(sender, instance, fields=fields, **kwargs):
+            known = getattr(instance, '_blob_names', {})
+            missing = [field.attname for field in fields if field.attname not in known]
+            if missing and instance.pk is not None and not instance._state.adding:
+                row = sender._base_manager.filter(pk=instance.pk).values(*missing).first() or {}
+                instance._blob_names = {**known, **{attname: row.get(attname) or '' for attname in missing}}
+
+        def update_refs(sender, instance, created, update_fields=None, fields=fields, **kwargs):
+            before = {} if created else getattr(instance, '_blob_names', {})
+            after = {
+                field.attname: name_of(getattr(instance, field.attname)) for field in fields
+                if update_fields is None or field.name in update_fields
+            }
+            changed = [attname for attname in after if after[attname] != before.get(attname, '')]
+            Blob.objects.release([before.get(attname) for attname in changed if is_blob_name(before.get(attname))])
+            Blob.objects.acquire([after[attname] for attname in changed if is_blob_name(after[attname])])
+            instance._blob_names = {**before, **after}
+
+        def drop_refs(sender, instance, fields=fields, **kwargs):
+            names = getattr(instance, '_blob_names', {})
+            Blob.objects.release([name for name in names.values() if is_blob_name(name)])
+
+        post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+        pre_save.connect(fill_unknown, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(update_refs, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(drop_refs, sender=model, weak=False, dispatch_uid=uid)
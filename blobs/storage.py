@@ -0,0 +1,86 @@
+"""
+Content-addressed file storage.
+
+A file is stored once under ``blobs/<aa>/<bb>/<sha256><ext>``, named after
+the SHA-256 of its contents and sharded by the first two byte pairs so no
+directory grows past a few hundred entries. Saving contents that are
+already stored writes nothing and returns the existing name, so every
+attachment or profile picture with the same bytes shares one file.
+
+References are counted on blobs.models.Blob by the receivers in
+blobs.signals. ``delete()`` therefore never removes a blob that another row
+may share; unreferenced blobs are removed by ``manage.py collect_blobs``.
+Names outside ``blobs/`` (files saved before this storage) behave as in
+FileSystemStorage.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+from .models import Blob
+
+BLOB_DIR = 'blobs'
+
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,9}$')
+
+
+def content_digest(content):
+    """SHA-256 of ``content``; uses a digest the caller already computed when there is one"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(f'{BLOB_DIR}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def blob_name(self, sha256, name):
+        # The extension is kept so MEDIA_URL serves a sensible content type
+        extension = os.path.splitext(name or '')[1].lower()
+        if not EXTENSION_RE.match(extension):
+            extension = ''
+        return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        sha256 = content_digest(content)
+        name = self.blob_name(sha256, name)
+
+        # The row lock keeps collect_blobs from removing the file between the check and the reuse
+        with transaction.atomic():
+            Blob.objects.touch(name, sha256, content.size)
+            if not self.exists(name):
+                saved = self._save(name, content)
+                if saved != name:
+                    # Lost a race with an identical write; keep the first copy
+                    super().delete(saved)
+                # A moved temporary file keeps its old mtime, which collect_blobs would misread
+                os.utime(self.path(name))
+        return name
+
+    def delete(self, name):
+        # Blobs may be shared; they are only removed once unreferenced (collect_blobs)
+        if not is_blob_name(name):
+            super().delete(name)
+
+    def remove_blob(self, name):
+        super().delete(name)
+
+
+blob_storage = ContentAddressedStorage()
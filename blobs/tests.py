@@ -0,0 +1,128 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from taskmanager.testing import create_project, create_user
+from tasks import uploads
+from tasks.models import Task, TaskAttachment
+from .collection import _collect_orphan, _orphan_files, collect, recount
+from .models import Blob
+from .storage import blob_storage
+
+
+class BlobStorageTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media, ATTACHMENT_UPLOAD_DIR=os.path.join(self.media, 'parts'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.manager = create_user('manager', 'manager')
+        project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=project, assigned_to=self.manager, created_by=self.manager,
+        )
+        self.content = b'spec ' * 1000
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def attach(self, content=None, filename='spec.PDF'):
+        attachment = TaskAttachment(task=self.task, filename=filename, uploaded_by=self.manager)
+        attachment.file.save(filename, ContentFile(content or self.content), save=False)
+        attachment.save()
+        return attachment
+
+    def stored_files(self):
+        return [
+            os.path.join(directory, filename)
+            for directory, _, filenames in os.walk(os.path.join(self.media, 'blobs')) for filename in filenames
+        ]
+
+    def test_identical_files_are_stored_once(self):
+        first = self.attach()
+        self.assertEqual(first.file.name, f'blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}.pdf')
+        inode = os.stat(first.file.path).st_ino
+
+        second = self.attach(filename='copy.pdf')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(os.stat(second.file.path).st_ino, inode)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(Blob.objects.get().refs, 2)
+
+        self.manager.profile_picture.save('me.pdf', ContentFile(self.content))
+        self.assertEqual(Blob.objects.get().refs, 3)
+        self.manager.profile_picture = None
+        self.manager.save()
+        self.assertEqual(Blob.objects.get().refs, 2)
+
+    def test_unreferenced_blobs_are_collected(self):
+        first = self.attach()
+        second = self.attach()
+        other = self.attach(content=b'other')
+        name = first.file.name
+
+        first.delete()
+        second.file.delete()  # Drops the reference but leaves the blob to the collector
+        self.assertTrue(blob_storage.exists(name))
+        self.assertEqual(Blob.objects.get(pk=name).refs, 0)
+
+        # Still within the grace period
+        self.assertEqual(collect(), (0, 0))
+        self.assertEqual(collect(grace=timedelta(0)), (1, len(self.content)))
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(Blob.objects.filter(pk=name).exists())
+        self.assertTrue(blob_storage.exists(other.file.name))
+
+    def test_recount_and_orphan_files(self):
+        attachment = self.attach()
+        TaskAttachment.objects.filter(pk=attachment.pk).update(file='task_attachments/legacy.pdf')
+        blob_storage.save('stray.txt', ContentFile(b'stray'))
+        Blob.objects.filter(sha256=hashlib.sha256(b'stray').hexdigest()).delete()
+
+        self.assertEqual(recount(), 1)
+        self.assertEqual(Blob.objects.get(pk=attachment.file.name).refs, 0)
+
+        out = StringIO()
+        call_command('collect_blobs', '--grace-hours', '0', stdout=out)
+        self.assertIn('Removed 2 blob(s)', out.getvalue())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_orphans_saved_during_collection_are_kept(self):
+        blob_storage.save('stray.txt', ContentFile(b'stray'))
+        name = Blob.objects.get().name
+        Blob.objects.all().delete()
+        self.assertEqual(list(_orphan_files(blob_storage, timezone.now() + timedelta(hours=1))), [name])
+
+        # A save() of the same contents claimed the row after the scan
+        blob_storage.save('again.txt', ContentFile(b'stray'))
+        self.assertFalse(_collect_orphan(name, timezone.now() + timedelta(hours=1), blob_storage))
+        self.assertTrue(blob_storage.exists(name))
+        self.assertTrue(Blob.objects.filter(pk=name).exists())
+
+        Blob.objects.all().delete()
+        self.assertTrue(_collect_orphan(name, timezone.now() + timedelta(hours=1), blob_storage))
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_completed_upload_reuses_stored_contents(self):
+        existing = self.attach()
+        upload = uploads.create_upload(self.task, self.manager, 'again.pdf', len(self.content))
+        uploads.write_chunk(upload.pk, ContentFile(self.content), 0, len(self.content))
+
+        attachment, sha256 = uploads.complete_upload(upload.pk)
+        self.assertEqual(sha256, self.sha256)
+        self.assertEqual(attachment.file.name, existing.file.name)
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'parts')), [])
+        self.assertEqual(Blob.objects.get().refs, 2)
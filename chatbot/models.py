@@ -31,6 +31,9 @@ class ChatMessage(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['session', 'timestamp', 'id'], name='message_session_ts_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.role}: {self.content[:50]}..."
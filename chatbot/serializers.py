@@ -1,17 +1,19 @@
 from rest_framework import serializers
+from taskmanager.fieldsets import SparseFieldsetMixin
 from .models import ChatSession, ChatMessage
 
 
-class ChatMessageSerializer(serializers.ModelSerializer):
+class ChatMessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = ['id', 'role', 'content', 'timestamp']
         read_only_fields = ['id', 'timestamp']
 
 
-class ChatSessionSerializer(serializers.ModelSerializer):
+class ChatSessionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     messages = ChatMessageSerializer(many=True, read_only=True)
     message_count = serializers.SerializerMethodField()
+    expandable_fields = {'messages': None}
     
     class Meta:
         model = ChatSession
@@ -22,7 +24,7 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         return obj.messages.count()
 
 
-class ChatSessionListSerializer(serializers.ModelSerializer):
+class ChatSessionListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     message_count = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
     
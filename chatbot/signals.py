@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from taskmanager.versions import bump
+from .models import ChatMessage, ChatSession
+
+
+@receiver(post_save, sender=ChatSession)
+@receiver(post_delete, sender=ChatSession)
+def session_changed(sender, instance, **kwargs):
+    bump(f'chat:{instance.user_id}')
+
+
+@receiver(post_save, sender=ChatMessage)
+def message_saved(sender, instance, **kwargs):
+    """
+    Messages are only removed along with their session, which bumps on its
+    own; a post_delete receiver here would also stop that cascade from being
+    a single DELETE.
+    """
+    bump(f'chat:{instance.session.user_id}')
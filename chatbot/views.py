@@ -16,9 +16,13 @@ from .serializers import (
     ChatMessageSerializer, ChatMessageCreateSerializer
 )
 from .services import ChatbotService
+from taskmanager.compiled import CompiledListMixin
+from taskmanager.fieldsets import SparseFieldsetViewMixin
+from taskmanager.response_cache import cache_response
+from taskmanager.pagination import MessagePagination
 
 
-class ChatSessionListCreateView(generics.ListCreateAPIView):
+class ChatSessionListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     serializer_class = ChatSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -34,7 +38,7 @@ class ChatSessionListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class ChatSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ChatSessionDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ChatSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -42,9 +46,10 @@ class ChatSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
         return ChatSession.objects.filter(user=self.request.user)
 
 
-class ChatMessageListCreateView(generics.ListCreateAPIView):
+class ChatMessageListCreateView(CompiledListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessagePagination
     
     def get_queryset(self):
         session_id = self.kwargs['session_id']
@@ -207,6 +212,7 @@ def download_chat_history(request, session_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cache_response('chat:{user}')
 def chatbot_stats(request):
     """Get chatbot usage statistics"""
     user = request.user
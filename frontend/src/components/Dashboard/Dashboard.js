@@ -7,6 +7,33 @@ import { useAuth } from '../../contexts/AuthContext';
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement);
 
+const ANALYTICS_TOTALS = ['total_tasks', 'completed_tasks', 'in_progress_tasks', 'overdue_tasks'];
+
+// Fold the analytics part of WebSocket task deltas into /api/tasks/analytics/ data
+const applyAnalyticsDeltas = (stats, deltas) => {
+  if (!stats) return stats;
+  const next = { ...stats };
+  const statusCounts = {};
+  (stats.status_distribution || []).forEach(item => {
+    statusCounts[item.status] = item.count;
+  });
+  deltas.forEach(({ analytics }) => {
+    ANALYTICS_TOTALS.forEach(field => {
+      next[field] = (next[field] || 0) + (analytics[field] || 0);
+    });
+    Object.entries(analytics.status_distribution || {}).forEach(([status, count]) => {
+      statusCounts[status] = (statusCounts[status] || 0) + count;
+    });
+  });
+  next.status_distribution = Object.entries(statusCounts)
+    .filter(([, count]) => count > 0)
+    .map(([status, count]) => ({ status, count }));
+  next.completion_rate = next.total_tasks > 0
+    ? Math.round((next.completed_tasks / next.total_tasks) * 10000) / 100
+    : 0;
+  return next;
+};
+
 const Dashboard = () => {
   const [projectStats, setProjectStats] = useState(null);
   const [taskStats, setTaskStats] = useState(null);
@@ -53,9 +80,11 @@ const Dashboard = () => {
           setTimeout(() => {
             setNotification(prev => ({ ...prev, show: false }));
           }, 5000);
-          
-          // Refresh dashboard data
-          fetchDashboardData();
+        }
+        
+        if (data.type === 'task_delta') {
+          // Update counters locally instead of refetching both analytics endpoints
+          setTaskStats(prev => applyAnalyticsDeltas(prev, data.deltas));
         }
       };
       
@@ -22,6 +22,7 @@ const Projects = () => {
   });
   const { user } = useAuth();
   const wsRef = useRef(null);
+  const projectIdsRef = useRef([]);
 
   useEffect(() => {
     fetchProjects();
@@ -49,15 +50,25 @@ const Projects = () => {
     
     wsRef.current.onopen = () => {
       console.log('WebSocket connected for projects');
+      subscribeToProjects(projectIdsRef.current);
     };
     
     wsRef.current.onmessage = (event) => {
       const data = JSON.parse(event.data);
       
-      if (data.type === 'task_status_update') {
-        // Refresh projects to show updated task counts
-        fetchProjects();
-        toast.info(`Task status updated in project`);
+      if (data.type === 'task_delta') {
+        // Patch task counts from the project summaries carried by each delta
+        const summaries = {};
+        data.deltas.forEach(delta => {
+          delta.projects.forEach(summary => {
+            summaries[summary.id] = summary;
+          });
+        });
+        setProjects(prevProjects =>
+          prevProjects.map(project =>
+            summaries[project.id] ? { ...project, ...summaries[project.id] } : project
+          )
+        );
       }
     };
     
@@ -70,10 +81,21 @@ const Projects = () => {
     };
   };
 
+  // Join each project's topic so task changes by any member show up live
+  const subscribeToProjects = (projectIds) => {
+    if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return;
+    projectIds.forEach(projectId => {
+      wsRef.current.send(JSON.stringify({ type: 'subscribe', project_id: projectId }));
+    });
+  };
+
   const fetchProjects = async () => {
     try {
       const response = await axios.get('/api/projects/');
-      setProjects(response.data.results || response.data);
+      const projectList = response.data.results || response.data;
+      setProjects(projectList);
+      projectIdsRef.current = projectList.map(project => project.id);
+      subscribeToProjects(projectIdsRef.current);
     } catch (error) {
       console.error('Error fetching projects:', error);
       toast.error('Failed to fetch projects');
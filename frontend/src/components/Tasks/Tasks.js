@@ -56,17 +56,23 @@ const Tasks = () => {
     wsRef.current.onmessage = (event) => {
       const data = JSON.parse(event.data);
       
-      if (data.type === 'task_status_update') {
-        // Update task status in real-time
-        setTasks(prevTasks => 
-          prevTasks.map(task => 
-            task.id === data.task_id 
-              ? { ...task, status: data.status }
-              : task
-          )
-        );
-        
-        toast.info(`Task "${data.task_data.title}" status updated to ${data.status}`);
+      if (data.type === 'task_delta') {
+        // Apply versioned row deltas instead of refetching the list
+        setTasks(prevTasks => {
+          let nextTasks = prevTasks;
+          data.deltas.forEach(delta => {
+            const current = nextTasks.find(task => task.id === delta.task_id);
+            if (current && current.version >= delta.version) return;
+            if (delta.op === 'delete') {
+              nextTasks = nextTasks.filter(task => task.id !== delta.task_id);
+            } else if (current) {
+              nextTasks = nextTasks.map(task => task.id === delta.task_id ? delta.task : task);
+            } else {
+              nextTasks = [delta.task, ...nextTasks];
+            }
+          });
+          return nextTasks;
+        });
       }
     };
     
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:56
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Task = apps.get_model('tasks', 'Task')
+    rows = Task.objects.order_by().values('project_id').annotate(
+        total_tasks=Count('id'),
+        completed_tasks=Count('id', filter=Q(status='completed')),
+        overdue_tasks=Count('id', filter=Q(overdue=True)),
+        estimated_hours_total=Coalesce(Sum('estimated_hours'), Value(Decimal('0'))),
+        actual_hours_total=Coalesce(Sum('actual_hours'), Value(Decimal('0'))),
+    )
+    for row in rows:
+        Project.objects.filter(pk=row.pop('project_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_keyset_indexes'),
+        ('tasks', '0004_task_overdue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='actual_hours_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='completed_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='estimated_hours_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='overdue_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='total_tasks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
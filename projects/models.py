@@ -1,10 +1,47 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from taskmanager.fieldsets import expands, includes
 
 User = get_user_model()
 
 
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Projects the user may see: admins all, managers created or assigned, interns assigned"""
+        if user.is_admin:
+            return self
+        if user.is_manager:
+            return self.filter(Q(created_by=user) | Q(assigned_to=user)).distinct()
+        return self.filter(assigned_to=user)
+    
+    def audience(self):
+        """
+        Ids of the non-admin users who can see these projects, or a task in
+        them (task lists embed the project), in one query
+        """
+        from tasks.models import Task
+        projects = self.order_by()
+        tasks = Task.objects.filter(project__in=projects.values('id')).order_by()
+        rows = projects.values_list('created_by_id').union(
+            projects.filter(assigned_to__isnull=False).values_list('assigned_to'),
+            tasks.values_list('assigned_to_id'),
+            tasks.values_list('created_by_id'),
+        )
+        return {user_id for user_id, in rows if user_id is not None}
+    
+    def with_list_relations(self, selection=None):
+        """Everything ProjectListSerializer reads, in a constant number of queries"""
+        queryset = self
+        if expands(selection, 'created_by'):
+            queryset = queryset.select_related('created_by')
+        # Collapsed to ids the members still come from the prefetch
+        if includes(selection, 'assigned_to'):
+            queryset = queryset.prefetch_related('assigned_to')
+        return queryset
+
+
 class Project(models.Model):
     STATUS_CHOICES = [
         ('planning', 'Planning'),
@@ -34,22 +71,62 @@ class Project(models.Model):
     )
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_projects')
     assigned_to = models.ManyToManyField(User, related_name='assigned_projects', blank=True)
+    
+    # Task counters, maintained by tasks.counters on every task write
+    total_tasks = models.PositiveIntegerField(default=0, editable=False)
+    completed_tasks = models.PositiveIntegerField(default=0, editable=False)
+    overdue_tasks = models.PositiveIntegerField(default=0, editable=False)
+    estimated_hours_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    actual_hours_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProjectQuerySet.as_manager()
+    
+    COUNTER_FIELDS = (
+        'total_tasks', 'completed_tasks', 'overdue_tasks',
+        'estimated_hours_total', 'actual_hours_total',
+    )
+    
+    # Fields whose before/after values drive task visibility and the analytics rollups
+    SNAPSHOT_FIELDS = ('created_by_id', 'status', 'created_at')
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
-    @property
-    def total_tasks(self):
-        return self.tasks.count()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so post_save receivers can see what changed
+        if set(cls.SNAPSHOT_FIELDS).issubset(field_names):
+            instance._loaded_state = instance.snapshot()
+        return instance
     
-    @property
-    def completed_tasks(self):
-        return self.tasks.filter(status='completed').count()
+    def snapshot(self):
+        return {field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            if getattr(self, '_loaded_state', None) is None:
+                self._loaded_state = type(self).objects.filter(pk=self.pk).values(*self.SNAPSHOT_FIELDS).first()
+            # Counters only ever change through atomic F() updates; writing back the
+            # values loaded with this instance would clobber concurrent increments.
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                ]
+        # Together with the rollup and visibility writes of the post_save receivers
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_state = self.snapshot()
     
     @property
     def completion_percentage(self):
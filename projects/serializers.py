@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Project
 from accounts.serializers import UserSerializer
+from taskmanager.fieldsets import SparseFieldsetMixin
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     assigned_to = UserSerializer(many=True, read_only=True)
     assigned_to_ids = serializers.PrimaryKeyRelatedField(
@@ -15,6 +16,7 @@ class ProjectSerializer(serializers.ModelSerializer):
     total_tasks = serializers.ReadOnlyField()
     completed_tasks = serializers.ReadOnlyField()
     completion_percentage = serializers.ReadOnlyField()
+    expandable_fields = {'created_by': 'created_by_id', 'assigned_to': None}
     
     class Meta:
         model = Project
@@ -31,12 +33,13 @@ class ProjectSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     assigned_to = UserSerializer(many=True, read_only=True)
     total_tasks = serializers.ReadOnlyField()
     completed_tasks = serializers.ReadOnlyField()
     completion_percentage = serializers.ReadOnlyField()
+    expandable_fields = {'created_by': 'created_by_id', 'assigned_to': None}
     
     class Meta:
         model = Project
@@ -0,0 +1,40 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from taskmanager.versions import bump, scoped
+from .models import Project
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    audience = Project.objects.filter(pk=instance.pk).audience()
+    before = getattr(instance, '_loaded_state', None)
+    if not created and before is not None:
+        # A previous owner loses the project
+        audience.add(before['created_by_id'])
+    bump(*scoped('projects', audience))
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    # Before the cascade removes the members and tasks that make up the audience
+    bump(*scoped('projects', Project.objects.filter(pk=instance.pk).audience()))
+
+
+@receiver(m2m_changed, sender=Project.assigned_to.through)
+def project_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Membership decides which projects a user can see, and project lists show the members"""
+    if action == 'pre_clear':
+        # The cleared side is gone by post_clear
+        related = instance.assigned_projects if reverse else instance.assigned_to
+        instance._cleared_member_ids = set(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_member_ids', set())
+    if reverse:
+        projects, users = Project.objects.filter(pk__in=pk_set), {instance.pk}
+    else:
+        projects, users = Project.objects.filter(pk=instance.pk), set(pk_set or ())
+    bump(*scoped('projects', projects.audience() | users))
@@ -1,26 +1,34 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Count, Q
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 from django.conf import settings
+from datetime import timedelta
+from analytics.models import ProjectDailyRollup
+from taskmanager.compiled import CompiledListMixin
+from taskmanager.conditional import ConditionalListMixin, conditional
+from taskmanager.fieldsets import SparseFieldsetViewMixin
+from taskmanager.response_cache import CachedListMixin, cache_response
+from taskmanager.pagination import NewestFirstPagination
 from .models import Project
 from .serializers import ProjectSerializer, ProjectListSerializer
 
 
-class ProjectListCreateView(generics.ListCreateAPIView):
+class ProjectListCreateView(
+    ConditionalListMixin, CachedListMixin, CompiledListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView
+):
     serializer_class = ProjectSerializer
+    conditional_namespaces = cache_namespaces = ('projects:{viewer}',)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewestFirstPagination
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_admin:
-            return Project.objects.all()
-        elif user.is_manager:
-            return Project.objects.filter(
-                Q(created_by=user) | Q(assigned_to=user)
-            ).distinct()
-        else:
-            return Project.objects.filter(assigned_to=user)
+        queryset = Project.objects.visible_to(self.request.user)
+        if self.request.method == 'GET':
+            queryset = queryset.with_list_relations(self.field_selection())
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -28,38 +36,23 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         return ProjectSerializer
 
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_admin:
-            return Project.objects.all()
-        elif user.is_manager:
-            return Project.objects.filter(
-                Q(created_by=user) | Q(assigned_to=user)
-            ).distinct()
-        else:
-            return Project.objects.filter(assigned_to=user)
+        return Project.objects.visible_to(self.request.user)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional('projects:{viewer}')
+@cache_response('projects:{viewer}')
 def project_analytics(request):
     user = request.user
     
     # Base queryset based on user role
-    if user.is_admin:
-        projects = Project.objects.all()
-    elif user.is_manager:
-        # Manager can see projects they created OR are assigned to
-        projects = Project.objects.filter(
-            Q(created_by=user) | Q(assigned_to=user)
-        ).distinct()
-    else:
-        # Intern can only see projects they are assigned to
-        projects = Project.objects.filter(assigned_to=user)
+    projects = Project.objects.visible_to(user)
     
     # Analytics data
     total_projects = projects.count()
@@ -72,15 +65,21 @@ def project_analytics(request):
     # Priority distribution
     priority_distribution = projects.values('priority').annotate(count=Count('priority'))
     
-    # Projects by month (last 6 months) - simplified for SQLite
-    from django.utils import timezone
-    from datetime import timedelta
-    six_months_ago = timezone.now().date() - timedelta(days=180)
-    monthly_projects = projects.filter(
-        created_at__date__gte=six_months_ago
-    ).extra(
-        select={'month': "substr(projects_project.created_at, 1, 7)"}
-    ).values('month').annotate(count=Count('id')).order_by('month')
+    # Projects by month (last 6 months). Admins read the daily rollup; other
+    # roles only see a handful of projects, so grouping them directly is cheap.
+    six_months_ago = timezone.localdate() - timedelta(days=180)
+    if user.is_admin:
+        monthly = ProjectDailyRollup.objects.filter(
+            day__gte=six_months_ago, project_count__gt=0
+        ).annotate(month=TruncMonth('day')).values('month').annotate(count=Sum('project_count'))
+    else:
+        monthly = projects.filter(
+            created_at__date__gte=six_months_ago
+        ).annotate(month=TruncMonth('created_at')).values('month').annotate(count=Count('id', distinct=True))
+    monthly_projects = [
+        {'month': row['month'].strftime('%Y-%m'), 'count': row['count']}
+        for row in monthly.order_by('month')
+    ]
     
     # Debug information (only in development)
     if settings.DEBUG:
@@ -97,7 +96,7 @@ def project_analytics(request):
         'completed_projects': completed_projects,
         'status_distribution': list(status_distribution),
         'priority_distribution': list(priority_distribution),
-        'monthly_projects': list(monthly_projects),
+        'monthly_projects': monthly_projects,
     })
 
 
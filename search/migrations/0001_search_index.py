@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from search.schema import install, uninstall
+
+
+def install_search_index(apps, schema_editor):
+    # On PostgreSQL the generated columns rewrite each table once
+    install(schema_editor.connection, apps)
+
+
+def uninstall_search_index(apps, schema_editor):
+    uninstall(schema_editor.connection, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_task_counters'),
+        ('tasks', '0008_task_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
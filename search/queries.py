@@ -0,0 +1,130 @@
+"""
+Ranked, role-scoped matching against the indexes in search.schema.
+
+Each source is one query that ranks matches inside the same visibility scope
+the list endpoints use and returns the top ids; the rows themselves are then
+loaded through the usual serializers. Queries share a time budget
+(SEARCH_TIMEOUT_MS) and a source that runs out of it is reported rather than
+allowed to hold the request.
+"""
+
+import re
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from projects.models import Project
+from tasks.models import Task, TaskComment
+from .schema import FTS_WEIGHTS, SOURCES, TEXT_CONFIG, fts_table
+
+WORD_RE = re.compile(r'\w+')
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def scope_queryset(kind, user):
+    """Ids of the rows of ``kind`` the user may see, or None for everything"""
+    if user.is_admin:
+        return None
+    if kind == 'task':
+        scope = Task.objects.visible_to(user)
+    elif kind == 'comment':
+        scope = TaskComment.objects.filter(task__in=Task.objects.visible_to(user))
+    else:
+        scope = Project.objects.visible_to(user)
+    # Without ordering, so a DISTINCT scope does not drag its sort columns into the subquery
+    return scope.order_by().values('id')
+
+
+def model_for(kind):
+    return apps.get_model(SOURCES[kind][0])
+
+
+def terms(text):
+    return WORD_RE.findall(text)
+
+
+def _postgresql_sql(table, scope_sql):
+    # plainto_tsquery ANDs the terms, matching the FTS5 query built below
+    return f"""
+        SELECT t.id, ts_rank(t.search_vector, q.query) AS rank
+        FROM {table} AS t, plainto_tsquery('{TEXT_CONFIG}', %s) AS q(query)
+        WHERE t.search_vector @@ q.query {scope_sql}
+        ORDER BY rank DESC, t.id DESC
+        LIMIT %s
+    """
+
+
+def _sqlite_sql(fts, scope_sql, columns):
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS[:len(columns)])
+    # bm25 is lower-is-better, so it is negated to rank like ts_rank
+    return f"""
+        SELECT {fts}.rowid, -bm25({fts}, {weights}) AS rank
+        FROM {fts}
+        WHERE {fts} MATCH %s {scope_sql}
+        ORDER BY rank DESC, {fts}.rowid DESC
+        LIMIT %s
+    """
+
+
+def match(kind, text, user, limit, deadline):
+    """``[(id, rank)]`` for the best ``limit`` visible matches of ``kind``"""
+    words = terms(text)
+    if not words:
+        return []
+    columns = SOURCES[kind][1]
+    table = model_for(kind)._meta.db_table
+    postgresql = connection.vendor == 'postgresql'
+    id_column = 't.id' if postgresql else f"{fts_table(table)}.rowid"
+
+    scope = scope_queryset(kind, user)
+    scope_sql, scope_params = '', ()
+    if scope is not None:
+        sql, scope_params = scope.query.sql_with_params()
+        scope_sql = f"AND {id_column} IN ({sql})"
+
+    if postgresql:
+        sql = _postgresql_sql(table, scope_sql)
+        query = ' '.join(words)
+    else:
+        sql = _sqlite_sql(fts_table(table), scope_sql, columns)
+        # Quoted terms can never be read as FTS5 operators
+        query = ' '.join(f'"{word}"' for word in words)
+    params = [query, *scope_params, limit]
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise SearchTimeout(kind)
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if postgresql:
+                    cursor.execute(
+                        "SELECT set_config('statement_timeout', %s, true)", [str(max(int(remaining * 1000), 1))]
+                    )
+                    cursor.execute(sql, params)
+                    return [(row[0], float(row[1])) for row in cursor.fetchall()]
+                return _sqlite_execute(cursor, sql, params, deadline)
+    except OperationalError:
+        if time.monotonic() >= deadline:
+            raise SearchTimeout(kind)
+        raise
+
+
+def _sqlite_execute(cursor, sql, params, deadline):
+    raw = connection.connection
+    # Returning True from the progress handler interrupts the running statement
+    raw.set_progress_handler(lambda: time.monotonic() >= deadline, 1000)
+    try:
+        cursor.execute(sql, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
+    finally:
+        raw.set_progress_handler(None, 0)
+
+
+def search_deadline():
+    return time.monotonic() + getattr(settings, 'SEARCH_TIMEOUT_MS', 500) / 1000
@@ -0,0 +1,112 @@
+"""
+Full-text index DDL for the searchable tables.
+
+PostgreSQL gets a generated ``search_vector`` tsvector column on each table
+(title weighted above description) with a GIN index; being generated, it is
+kept current by the database on every write, bulk ones included. SQLite gets
+an external-content FTS5 table per source, ``<table>_fts``, maintained by
+triggers. Other backends have no index and search is unavailable.
+
+SQLite drops a table's triggers when a migration rebuilds the table, so
+``install`` is idempotent and also runs after every migrate.
+"""
+
+# Searchable sources: model label -> columns, most important first
+SOURCES = {
+    'task': ('tasks.Task', ('title', 'description')),
+    'comment': ('tasks.TaskComment', ('content',)),
+    'project': ('projects.Project', ('title', 'description')),
+}
+
+# Relative column weights; the PostgreSQL labels map to ts_rank's default 1.0 / 0.4
+PG_WEIGHTS = ('A', 'B')
+FTS_WEIGHTS = (1.0, 0.4)
+
+TEXT_CONFIG = 'english'
+
+# SQLite triggers per FTS table: after insert, delete and update
+TRIGGER_SUFFIXES = ('ai', 'ad', 'au')
+
+
+def source_tables(apps):
+    for kind, (label, columns) in SOURCES.items():
+        yield kind, apps.get_model(label)._meta.db_table, columns
+
+
+def fts_table(table):
+    return f"{table}_fts"
+
+
+def supported(connection):
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def _postgresql_install(cursor, table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{TEXT_CONFIG}', coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(columns, PG_WEIGHTS)
+    )
+    cursor.execute(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED"
+    )
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING GIN (search_vector)")
+
+
+def _sqlite_install(cursor, table, columns):
+    fts = fts_table(table)
+    names = ', '.join(columns)
+    new_values = ', '.join(f"new.{column}" for column in columns)
+    old_values = ', '.join(f"old.{column}" for column in columns)
+    triggers = [f"{fts}_{suffix}" for suffix in TRIGGER_SUFFIXES]
+    cursor.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", triggers
+    )
+    triggers_present = cursor.fetchone()[0] == len(triggers)
+
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+    )
+    if not triggers_present:
+        # New index, or writes may have happened while the triggers were missing
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def install(connection, apps):
+    if not supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for kind, table, columns in source_tables(apps):
+            if connection.vendor == 'postgresql':
+                _postgresql_install(cursor, table, columns)
+            else:
+                _sqlite_install(cursor, table, columns)
+
+
+def uninstall(connection, apps):
+    if not supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for kind, table, columns in source_tables(apps):
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+                cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+            else:
+                fts = fts_table(table)
+                for suffix in TRIGGER_SUFFIXES:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {fts}")
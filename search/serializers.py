@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from tasks.serializers import TaskCommentSerializer
+
+
+class SearchCommentSerializer(TaskCommentSerializer):
+    task_id = serializers.IntegerField(read_only=True)
+    task_title = serializers.CharField(source='task.title', read_only=True)
+    
+    class Meta(TaskCommentSerializer.Meta):
+        fields = TaskCommentSerializer.Meta.fields + ['task_id', 'task_title']
@@ -0,0 +1,16 @@
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+from .schema import install
+
+INDEX_MIGRATION = ('search', '0001_search_index')
+
+
+def reinstall_search_index(sender, using, apps, **kwargs):
+    """Restore SQLite triggers lost when a later migration rebuilt an indexed table"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if INDEX_MIGRATION not in MigrationRecorder(connection).applied_migrations():
+        return
+    install(connection, apps)
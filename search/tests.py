@@ -0,0 +1,98 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from taskmanager.testing import create_project, create_user
+from tasks.models import Task, TaskComment
+from tasks.serializers import TaskListSerializer
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.admin = create_user('admin', 'admin')
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.other = create_user('other', 'intern')
+        self.project = create_project(self.manager, 'Website redesign', description='New landing pages')
+        self.project.assigned_to.add(self.intern)
+        self.title_match = Task.objects.create(
+            title='Design the invoice page', project=self.project, assigned_to=self.intern, created_by=self.manager,
+        )
+        self.description_match = Task.objects.create(
+            title='Billing follow-up', description='Check the invoice totals',
+            project=self.project, assigned_to=self.other, created_by=self.manager,
+        )
+        TaskComment.objects.create(task=self.description_match, user=self.manager, content='Invoice numbers look off')
+
+    def search(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/search/', params)
+
+    def test_ranked_by_weighted_columns(self):
+        response = self.search(self.manager, q='invoice')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['id'] for row in response.data['tasks']], [self.title_match.id, self.description_match.id]
+        )
+        self.assertGreater(response.data['tasks'][0]['rank'], response.data['tasks'][1]['rank'])
+        self.assertEqual(len(response.data['comments']), 1)
+        self.assertEqual(response.data['timed_out'], [])
+
+    def test_results_are_role_scoped(self):
+        response = self.search(self.intern, q='invoice')
+        self.assertEqual([row['id'] for row in response.data['tasks']], [self.title_match.id])
+        self.assertEqual(response.data['comments'], [])
+
+        self.assertEqual(len(self.search(self.intern, q='landing').data['projects']), 1)
+        self.assertEqual(self.search(self.other, q='landing').data['projects'], [])
+        self.assertEqual(len(self.search(self.admin, q='invoice').data['tasks']), 2)
+
+    def test_index_follows_writes(self):
+        self.title_match.title = 'Draft the receipt page'
+        self.title_match.save()
+        self.description_match.delete()
+
+        response = self.search(self.manager, q='receipt', type='task')
+        self.assertEqual([row['id'] for row in response.data['tasks']], [self.title_match.id])
+        self.assertNotIn('comments', response.data)
+        response = self.search(self.manager, q='invoice')
+        self.assertEqual(response.data['tasks'], [])
+        self.assertEqual(response.data['comments'], [])
+
+    def test_stemming_and_operator_characters(self):
+        self.assertEqual(len(self.search(self.manager, q='designing').data['tasks']), 1)
+        response = self.search(self.manager, q='"invoice* -(')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['tasks']), 2)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.search(self.manager).status_code, 400)
+        self.assertEqual(self.search(self.manager, q='invoice', type='user').status_code, 400)
+        self.assertEqual(self.search(self.manager, q='invoice', limit='many').status_code, 400)
+
+    def test_ranked_pages_cost_a_fixed_number_of_queries(self):
+        def queries(limit):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.search(self.manager, q='invoice', type='task', limit=limit)
+            return response, len(captured)
+
+        small, few = queries(2)
+        for i in range(10):
+            Task.objects.create(
+                title=f'Invoice {i}', project=self.project, assigned_to=self.intern, created_by=self.manager,
+            )
+        large, many = queries(12)
+        self.assertEqual(len(large.data['tasks']), 12)
+        self.assertEqual(many, few)
+
+        first = large.data['tasks'][0]
+        rows = TaskListSerializer(Task.objects.filter(id=first['id']), many=True).data
+        self.assertEqual({key: value for key, value in first.items() if key != 'rank'}, rows[0])
+
+    @override_settings(SEARCH_TIMEOUT_MS=0)
+    def test_sources_over_budget_are_reported(self):
+        response = self.search(self.manager, q='invoice')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['timed_out'], ['task', 'comment', 'project'])
+        self.assertEqual(response.data['tasks'], [])
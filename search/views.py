@@ -0,0 +1,69 @@
+from django.db import connection
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from projects.models import Project
+from projects.serializers import ProjectListSerializer
+from tasks.models import Task, TaskComment
+from taskmanager.compiled import CompiledSerializer
+from tasks.serializers import TaskListSerializer
+from .queries import SearchTimeout, match, search_deadline
+from .schema import SOURCES, supported
+from .serializers import SearchCommentSerializer
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+# Response key, queryset and serializer per searchable source
+RESULTS = {
+    'task': ('tasks', lambda: Task.objects.with_list_relations(), TaskListSerializer),
+    'comment': ('comments', lambda: TaskComment.objects.select_related('user', 'task'), SearchCommentSerializer),
+    'project': ('projects', lambda: Project.objects.with_list_relations(), ProjectListSerializer),
+}
+
+
+def load_ranked(kind, ranked):
+    """Serialized rows for ``[(id, rank)]``, best first, each with its ``rank``"""
+    key, queryset, serializer_class = RESULTS[kind]
+    objects = queryset().in_bulk([object_id for object_id, _ in ranked])
+    found = [(objects[object_id], rank) for object_id, rank in ranked if object_id in objects]
+    # One compiled serializer for the page rather than a serializer per row
+    rows = CompiledSerializer(serializer_class, [instance for instance, _ in found], many=True).data
+    return [dict(row, rank=round(rank, 6)) for row, (_, rank) in zip(rows, found)]
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search(request):
+    """
+    Ranked full-text search over the tasks, comments and projects the user can
+    see: ``?q=<words>[&type=task,comment,project][&limit=N]``.
+    """
+    if not supported(connection):
+        return Response({'error': 'Search is not available on this database'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    text = request.query_params.get('q', '').strip()
+    if not text:
+        return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind] or list(SOURCES)
+    unknown = sorted(set(kinds) - set(SOURCES))
+    if unknown:
+        return Response({'error': f"Unknown type(s): {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    deadline = search_deadline()
+    data = {'query': text, 'timed_out': []}
+    for kind in kinds:
+        try:
+            ranked = match(kind, text, request.user, limit, deadline)
+        except SearchTimeout:
+            data['timed_out'].append(kind)
+            ranked = []
+        data[RESULTS[kind][0]] = load_ranked(kind, ranked)
+    return Response(data)
@@ -0,0 +1,173 @@
+"""
+Read-only fast path for list serializers.
+
+``Serializer.to_representation`` re-resolves every field per row: it walks
+``_readable_fields``, goes through ``Field.get_attribute`` with its
+exception handling and per-attribute callable checks, and builds an
+OrderedDict. ``compile_fields`` does that resolution once per request
+instead, turning the bound fields of a serializer (after sparse fieldsets
+are applied) into a list of ``(name, reader)`` pairs. Plain column fields
+read with ``attrgetter`` and convert with the same builtin DRF would use;
+anything else (dates, decimals, files, related fields, method fields) still
+goes through the field's own ``to_representation``; datetimes only
+resolve their timezone once. The rendered JSON is
+byte-identical to the serializer's.
+"""
+
+from datetime import datetime
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PKOnlyObject, RelatedField, ManyRelatedField
+from rest_framework.settings import api_settings
+
+# Fields whose to_representation is exactly this builtin
+CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.BooleanField: bool,
+}
+
+
+def _identity(value):
+    return value
+
+
+def _converter(field):
+    field_type = type(field)
+    if field_type is serializers.ReadOnlyField:
+        return _identity
+    if field_type in CONVERTERS:
+        return CONVERTERS[field_type]
+    if field_type is serializers.ChoiceField:
+        choices = field.choice_strings_to_values
+
+        def convert(value):
+            if value in ('', None):
+                return value
+            return choices.get(str(value), value)
+        return convert
+    if field_type is serializers.DateTimeField:
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation with the timezone looked up once rather
+    than per value; anything but an aware datetime in ISO 8601 falls back.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime) or value.utcoffset() is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _is_model_attribute(model, name):
+    """A model field or property: never a callable DRF would invoke"""
+    if isinstance(getattr(model, name, None), property):
+        return True
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _getter(field):
+    """A plain attribute read where that is all ``field.get_attribute`` would do, else None"""
+    if field.source == '*':
+        return _identity
+    model = getattr(getattr(field.parent, 'Meta', None), 'model', None)
+    if (
+        model is not None
+        and len(field.source_attrs) == 1
+        and not isinstance(field, (RelatedField, ManyRelatedField))
+        and _is_model_attribute(model, field.source_attrs[0])
+    ):
+        return attrgetter(field.source_attrs[0])
+    return None
+
+
+def _reader(field):
+    """A function mapping an instance to this field's representation"""
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    if isinstance(field, serializers.ListSerializer):
+        child = compile_fields(field.child)
+
+        def convert(value):
+            iterable = value.all() if isinstance(value, models.manager.BaseManager) else value
+            return [child(item) for item in iterable]
+    elif isinstance(field, serializers.BaseSerializer):
+        convert = compile_fields(field)
+    else:
+        convert = _converter(field)
+
+    get = _getter(field)
+    if get is None:
+        def read(instance):
+            attribute = field.get_attribute(instance)
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            return None if check_for_none is None else convert(attribute)
+        return read
+
+    def read(instance):
+        try:
+            attribute = get(instance)
+        except ObjectDoesNotExist:
+            return None
+        return None if attribute is None else convert(attribute)
+    return read
+
+
+def compile_fields(serializer):
+    """A function rendering one instance the way ``serializer.to_representation`` would"""
+    readers = [(field.field_name, _reader(field)) for field in serializer._readable_fields]
+
+    def represent(instance):
+        return {name: read(instance) for name, read in readers}
+    return represent
+
+
+class CompiledSerializer:
+    """
+    Stand-in for ``serializer_class(instance, many=..., context=...)`` on
+    reads; only ``.data`` is supported.
+    """
+
+    def __init__(self, serializer_class, instance, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.represent = compile_fields(serializer_class(context=context or {}))
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.represent(item) for item in self.instance]
+        return self.represent(self.instance)
+
+
+class CompiledListMixin:
+    """Generic-view mixin serving GET list pages through CompiledSerializer"""
+
+    def get_serializer(self, *args, **kwargs):
+        if not (kwargs.get('many') and self.request.method == 'GET'):
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        return CompiledSerializer(self.get_serializer_class(), *args, **kwargs)
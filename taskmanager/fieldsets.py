@@ -0,0 +1,134 @@
+"""
+Sparse fieldsets (``?fields=``) and relation expansion (``?expand=``) for
+the read endpoints.
+
+Without either parameter responses are unchanged. With one of them:
+
+- ``fields=id,title,project.title`` keeps only the listed keys. Dotted
+  paths narrow a nested object and imply expanding it.
+- ``expand=project,project.created_by`` renders those relations as nested
+  objects. Any other relation a serializer lists in ``expandable_fields``
+  collapses to its id (or list of ids).
+
+Collapsed or omitted relations never instantiate their serializers, and the
+list querysets drop the matching select_related/prefetch_related, so a
+smaller response also costs fewer queries.
+"""
+
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    """``'a,b.c'`` -> ``{'a': {}, 'b': {'c': {}}}``"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in filter(None, path.strip().split('.')):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class FieldSelection:
+    """
+    The requested shape of one serializer's output. ``fields`` is None when
+    every field is wanted; relations are expanded only when asked for.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def from_request(cls, request):
+        """None (everything, fully expanded) unless the request narrows the shape"""
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        fields = parse_paths(params['fields']) if params.get('fields') else None
+        return cls(fields, parse_paths(params.get('expand', '')))
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        if not self.includes(name):
+            return False
+        return name in self.expand or bool(self.fields and self.fields.get(name))
+
+    def nested(self, name):
+        return FieldSelection((self.fields or {}).get(name) or None, self.expand.get(name))
+
+
+# Helpers for queryset builders, where None means "everything"
+
+def includes(selection, name):
+    return selection is None or selection.includes(name)
+
+
+def expands(selection, name):
+    return selection is None or selection.expands(name)
+
+
+def nested(selection, name):
+    return None if selection is None else selection.nested(name)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin applying the FieldSelection in ``context['selection']``.
+
+    ``expandable_fields`` maps each nested relation to the attribute holding
+    its id when collapsed, or to None for a to-many relation (a list of ids).
+    """
+    expandable_fields = {}
+
+    @property
+    def field_selection(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        selection = self.context.get('selection')
+        for name in reversed(path):
+            if selection is None:
+                break
+            selection = selection.nested(name)
+        return selection
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.field_selection
+        if selection is None:
+            return fields
+
+        unknown = sorted(set(selection.fields or ()) - set(fields))
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+
+        for name in list(fields):
+            if not selection.includes(name):
+                del fields[name]
+            elif name in self.expandable_fields and not selection.expands(name):
+                source = self.expandable_fields[name]
+                if source is None:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        many=True, read_only=True, source=fields[name].source
+                    )
+                else:
+                    fields[name] = serializers.IntegerField(source=source, read_only=True)
+        return fields
+
+
+class SparseFieldsetViewMixin:
+    """Generic-view mixin passing the request's FieldSelection to serializers on reads"""
+
+    def field_selection(self):
+        if self.request.method != 'GET':
+            return None
+        return FieldSelection.from_request(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['selection'] = self.field_selection()
+        return context
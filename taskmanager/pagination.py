@@ -0,0 +1,139 @@
+"""
+Pagination classes shared by the list endpoints.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination unless the client opts in to keyset paging.
+
+    Sending ``?cursor=`` (empty for the first page) or ``?pagination=cursor``
+    switches to keyset paging on ``(timestamp_field, id)``: every page is an
+    indexed range scan, so it costs the same at any depth, and no COUNT(*)
+    is issued.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+    timestamp_field = 'created_at'
+    descending = True
+
+    def use_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        # Walking backwards flips both the comparison and the ordering
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.timestamp_field}', f'{prefix}id')
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.timestamp_field}__{lookup}': cursor['position']})
+                | Q(**{self.timestamp_field: cursor['position'], f'id__{lookup}': cursor['id']})
+            )
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if results:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+            if cursor and (has_more or not reverse):
+                self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_cursor_link(self.next_cursor)),
+            ('previous', self.get_cursor_link(self.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, item, reverse):
+        payload = {
+            'p': getattr(item, self.timestamp_field).isoformat(),
+            'i': item.pk,
+            'r': int(reverse),
+        }
+        data = json.dumps(payload, separators=(',', ':')).encode('ascii')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = parse_datetime(payload['p'])
+            if position is None:
+                raise ValueError(payload['p'])
+            return {
+                'position': position,
+                'id': int(payload['i']),
+                'reverse': bool(payload.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeEncodeError):
+            raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+
+class NewestFirstPagination(KeysetPagination):
+    """Tasks and projects: newest first, keyed on (created_at, id)"""
+    timestamp_field = 'created_at'
+    descending = True
+
+
+class OldestFirstPagination(KeysetPagination):
+    """Task comments: oldest first, keyed on (created_at, id)"""
+    timestamp_field = 'created_at'
+    descending = False
+
+
+class AttachmentPagination(KeysetPagination):
+    """Task attachments: oldest first, keyed on (uploaded_at, id)"""
+    timestamp_field = 'uploaded_at'
+    descending = False
+
+
+class MessagePagination(KeysetPagination):
+    """Chat messages: oldest first, keyed on (timestamp, id)"""
+    timestamp_field = 'timestamp'
+    descending = False
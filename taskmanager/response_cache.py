@@ -0,0 +1,95 @@
+"""
+Per-user cache of read responses, invalidated through taskmanager.versions.
+
+An entry is keyed by the user, their role, the absolute request URL and the
+current stamps of the namespaces the response is built from. A write bumps
+its namespace, which moves every dependent key, so stale entries are never
+read again and simply expire after RESPONSE_CACHE_TTL (0 turns the cache
+off). Namespaces are scoped per viewer (``tasks:{viewer}``, ``chat:{user}``;
+see taskmanager.versions), so a write only moves the keys of the users who
+can see it.
+"""
+
+import hashlib
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .versions import bumps, current_versions, resolve
+
+# Per-process counters: hits and misses here, invalidations in versions.bumps
+stats = Counter()
+
+
+def cache_key(request, namespaces):
+    versions = current_versions(namespaces)
+    if versions is None:
+        return None
+    user = request.user
+    key = '|'.join([
+        str(user.pk), getattr(user, 'role', ''), request.build_absolute_uri(),
+        *(f'{namespace}={versions[namespace]}' for namespace in sorted(versions)),
+    ])
+    return f'response:{user.pk}:{hashlib.md5(key.encode()).hexdigest()}'
+
+
+def cached_response(request, namespaces, view):
+    """``view()``'s response, served from the cache while ``namespaces`` are unchanged"""
+    timeout = getattr(settings, 'RESPONSE_CACHE_TTL', 300)
+    if request.method != 'GET' or not timeout:
+        return view()
+    key = cache_key(request, resolve(namespaces, request.user))
+    if key is None:
+        return view()
+    try:
+        data = cache.get(key)
+    except Exception:
+        # A cache outage must not fail the read
+        data = None
+    if data is not None:
+        stats['hits'] += 1
+        return Response(data)
+    stats['misses'] += 1
+    response = view()
+    if isinstance(response, Response) and response.status_code == 200:
+        try:
+            cache.set(key, response.data, timeout)
+        except Exception:
+            pass
+    return response
+
+
+def cache_stats():
+    by_namespace = Counter()
+    for namespace, count in bumps.items():
+        # Per-user namespaces are reported together
+        by_namespace[namespace.split(':')[0]] += count
+    return {
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'invalidations': sum(bumps.values()),
+        'invalidations_by_namespace': dict(sorted(by_namespace.items())),
+    }
+
+
+def cache_response(*namespaces):
+    """Decorator for DRF function views, applied below ``@api_view``"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return cached_response(request, namespaces, lambda: view(request, *args, **kwargs))
+        return wrapped
+    return decorator
+
+
+class CachedListMixin:
+    """List-view mixin; ``cache_namespaces`` names the data the list is built from"""
+    cache_namespaces = ()
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.cache_namespaces, lambda: super(CachedListMixin, self).list(request, *args, **kwargs)
+        )
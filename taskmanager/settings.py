@@ -42,6 +42,9 @@ INSTALLED_APPS = [
     'projects',
     'tasks',
     'chatbot',
+    'analytics',
+    'search',
+    'blobs',
 ]
 
 MIDDLEWARE = [
@@ -140,6 +143,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resumable attachment uploads (tasks.uploads). Part files should live on the
+# same filesystem as MEDIA_ROOT so completing an upload is a rename.
+ATTACHMENT_UPLOAD_DIR = os.getenv('ATTACHMENT_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload_parts'))
+ATTACHMENT_MAX_SIZE = int(os.getenv('ATTACHMENT_MAX_SIZE', str(512 * 1024 * 1024)))
+# Chunk size suggested to clients, and the most one PUT may carry
+ATTACHMENT_CHUNK_SIZE = 8 * 1024 * 1024
+ATTACHMENT_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Uploads untouched for this long are removed by `manage.py purge_uploads`
+ATTACHMENT_UPLOAD_EXPIRY_HOURS = int(os.getenv('ATTACHMENT_UPLOAD_EXPIRY_HOURS', '48'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -148,7 +161,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -202,9 +215,48 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Task notifications go through tasks.NotificationOutbox. In production run
+# `manage.py dispatch_notifications`; with this set, each commit also wakes a
+# dispatcher thread in the writing process, which is what the in-memory layer
+# needs locally (runserver with NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT=True).
+NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT = os.getenv('NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT', 'False') == 'True'
+
+# Per-task notifications wait this long so later changes to the same task
+# merge into one message per recipient (0 disables coalescing)
+NOTIFICATION_COALESCE_SECONDS = float(os.getenv('NOTIFICATION_COALESCE_SECONDS', '2'))
+
 # Redis Configuration
 REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1')
 
+# Cache (JWT user lookups, version stamps and cached responses). Redis when
+# CACHE_BACKEND=redis or REDIS_URL is set, otherwise in-process.
+if os.getenv('CACHE_BACKEND', 'redis' if os.getenv('REDIS_URL') else 'locmem') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a cached read response is kept; writes invalidate it sooner (taskmanager.response_cache).
+# 0 disables the cache.
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+
+# Seconds a resolved JWT user stays in the shared cache / the per-process LRU
+AUTH_USER_CACHE_TTL = 60
+AUTH_USER_LOCAL_TTL = 5
+AUTH_USER_LOCAL_SIZE = 1024
+
+# Time budget for one /api/search/ request, shared by its per-source queries
+SEARCH_TIMEOUT_MS = int(os.getenv('SEARCH_TIMEOUT_MS', '500'))
+
 # Hugging Face API Configuration
 HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY', '')
 HUGGINGFACE_READ_KEY = os.getenv('HUGGINGFACE_READ_KEY', '')
@@ -0,0 +1,23 @@
+"""
+Fixtures shared by the apps' test suites: users and projects with the
+defaults most tests do not care about.
+"""
+
+from datetime import date
+
+from django.contrib.auth import get_user_model
+
+from projects.models import Project
+
+PASSWORD = 'pass12345'
+
+
+def create_user(username, role='intern', **fields):
+    return get_user_model().objects.create_user(username=username, password=PASSWORD, role=role, **fields)
+
+
+def create_project(created_by, title='Project', **fields):
+    """A project running through 2024"""
+    fields.setdefault('start_date', date(2024, 1, 1))
+    fields.setdefault('end_date', date(2024, 12, 31))
+    return Project.objects.create(title=title, created_by=created_by, **fields)
@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/projects/', include('projects.urls')),
     path('api/tasks/', include('tasks.urls')),
     path('api/chatbot/', include('chatbot.urls')),
+    path('api/search/', include('search.urls')),
 ]
 
 if settings.DEBUG:
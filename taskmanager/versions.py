@@ -0,0 +1,98 @@
+"""
+Version stamps for groups of data ("namespaces").
+
+Namespaces are scoped to whoever can see the data, so a write only moves
+the stamps of the users it affects: ``tasks:<user id>`` and
+``projects:<user id>`` per non-admin viewer, ``tasks:admin`` and
+``projects:admin`` shared by the admins (who see everything),
+``users:<role>`` / ``users:<user id>`` for the user list, and
+``chat:<user id>``. Views
+name their namespaces with ``{user}``, ``{viewer}`` (``admin`` or the user
+id) and ``{role}`` placeholders, filled in per request by ``resolve``.
+
+Each namespace has one stamp in the shared cache, bumped after every write
+that commits a change to it. Reading a handful of stamps is a single cache
+round trip, which makes them a cheap validator for responses built from
+that data. A stamp starts at the current microsecond time and is then
+incremented atomically, so a stamp lost from the cache comes back newer
+than anything a client may hold.
+"""
+
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+# Per-process count of bumps applied, by namespace
+bumps = Counter()
+
+
+ADMIN_SCOPE = 'admin'
+
+
+def viewer_scope(user):
+    """Admins share one scope: every write is visible to all of them"""
+    return ADMIN_SCOPE if user.is_admin else str(user.pk)
+
+
+def resolve(namespaces, user):
+    """``namespaces`` with their placeholders filled in for ``user``"""
+    return [
+        namespace.format(user=user.pk, viewer=viewer_scope(user), role=getattr(user, 'role', ''))
+        for namespace in namespaces
+    ]
+
+
+def scoped(namespace, user_ids):
+    """``namespace`` for the admins and for each of ``user_ids``"""
+    return [
+        f'{namespace}:{ADMIN_SCOPE}',
+        *(f'{namespace}:{user_id}' for user_id in sorted({user_id for user_id in user_ids if user_id is not None})),
+    ]
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def current_versions(namespaces):
+    """``{namespace: stamp}``, creating stamps that are missing; None if the cache is down"""
+    keys = {namespace: VERSION_KEY.format(namespace) for namespace in namespaces}
+    try:
+        found = cache.get_many(keys.values())
+        for key in set(keys.values()) - set(found):
+            cache.add(key, _now(), timeout=None)
+            found[key] = cache.get(key)
+    except Exception:
+        # Without stamps nothing can be validated; callers build the response afresh
+        return None
+    return {namespace: found[key] for namespace, key in keys.items()}
+
+
+def advance(key):
+    # add() and incr() are atomic, so two concurrent bumps never share a stamp
+    if cache.add(key, _now(), timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between the two calls
+        cache.add(key, _now(), timeout=None)
+
+
+def bump(*namespaces):
+    """Give ``namespaces`` new stamps once the current transaction commits"""
+    def apply():
+        for namespace in namespaces:
+            try:
+                advance(VERSION_KEY.format(namespace))
+            except Exception:
+                # A cache outage must not fail a write that has already committed
+                continue
+            bumps[namespace] += 1
+
+    # Bumping before commit would let a reader label the old rows with the new stamp
+    transaction.on_commit(apply)
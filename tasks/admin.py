@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Task, TaskComment, TaskAttachment
+from .uploads import delete_upload
+from .models import AttachmentUpload, NotificationOutbox, Task, TaskComment, TaskAttachment
 
 
 class TaskCommentInline(admin.TabularInline):
@@ -36,6 +37,7 @@ class TaskAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not change:  # Creating new task
             obj.created_by = request.user
+        obj._changed_by = request.user  # Attributed in the status event log
         super().save_model(request, obj, form, change)
 
 
@@ -57,4 +59,24 @@ class TaskAttachmentAdmin(admin.ModelAdmin):
     readonly_fields = ('uploaded_by', 'uploaded_at')
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'group', 'created_at', 'available_at', 'attempts', 'failed_at')
+    list_filter = ('failed_at',)
+    search_fields = ('group', 'last_error')
+    readonly_fields = ('group', 'payload', 'created_at', 'attempts', 'last_error')
 
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'task', 'user', 'offset', 'size', 'updated_at')
+    search_fields = ('filename', 'user__username')
+    readonly_fields = ('id', 'offset', 'created_at', 'updated_at')
+    ordering = ('-updated_at',)
+    
+    def delete_model(self, request, obj):
+        delete_upload(obj)  # Removes the part file too
+    
+    def delete_queryset(self, request, queryset):
+        for upload in queryset:
+            delete_upload(upload)
@@ -0,0 +1,120 @@
+"""
+Set-wise task writes behind the /api/tasks/bulk/ endpoints.
+
+Each helper writes the whole batch inside one transaction with
+``bulk_create``/``bulk_update``, runs the bookkeeping the post_save signal
+does for single saves (tasks.changes and tasks.visibility), and queues one
+notification per affected user in the notification outbox.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+from django.utils import timezone
+from projects.models import Project
+from .changes import apply_task_changes
+from .models import Task
+from .notifications import enqueue
+from .visibility import sync_task_visibility
+
+# Largest batch a single bulk request may carry
+BULK_MAX_TASKS = 1000
+
+
+def bulk_create_tasks(rows, user):
+    """Create one task per validated row, all owned by ``user``"""
+    now = timezone.now()
+    tasks = [Task(created_by=user, **row) for row in rows]
+    for task in tasks:
+        task.overdue = task.compute_overdue(now)
+
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks)
+        apply_task_changes([(None, task.snapshot()) for task in tasks], actor=user)
+        sync_task_visibility(task.id for task in tasks)
+        notify_task_changes([task.snapshot() for task in tasks], 'created', user)
+    return tasks
+
+
+def bulk_update_tasks(rows, user):
+    """
+    Apply partial updates given as ``{id: {field: value}}``. The caller has
+    already checked that every id is visible to ``user``.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(Task.objects.select_for_update().filter(id__in=rows).order_by('id'))
+        fields = {'overdue', 'version', 'updated_at'}
+        moved = []
+        for task in tasks:
+            for field, value in rows[task.id].items():
+                setattr(task, field, value)
+                fields.add(field)
+            task.overdue = task.compute_overdue(now)
+            task.version += 1
+            task.updated_at = now
+            if (task.project_id, task.assigned_to_id) != (
+                task._loaded_state['project_id'], task._loaded_state['assigned_to_id']
+            ):
+                moved.append(task.id)
+
+        Task.objects.bulk_update(tasks, sorted(fields))
+        changes = [(task._loaded_state, task.snapshot()) for task in tasks]
+        apply_task_changes(changes, actor=user)
+        sync_task_visibility(moved)
+        notify_task_changes([after for _, after in changes], 'updated', user)
+    return tasks
+
+
+def bulk_set_status(task_ids, new_status, user):
+    """Move every task in ``task_ids`` to ``new_status`` with a single UPDATE"""
+    now = timezone.now()
+    if new_status in Task.OPEN_STATUSES:
+        overdue = ExpressionWrapper(Q(due_date__lt=now), output_field=BooleanField())
+    else:
+        overdue = Value(False)
+
+    with transaction.atomic():
+        queryset = Task.objects.select_for_update().filter(id__in=task_ids).order_by('id')
+        before = list(queryset.values(*Task.SNAPSHOT_FIELDS))
+        queryset.update(status=new_status, overdue=overdue, version=F('version') + 1, updated_at=now)
+
+        changes = []
+        for state in before:
+            after = dict(state, status=new_status, version=state['version'] + 1, updated_at=now)
+            after['overdue'] = (
+                new_status in Task.OPEN_STATUSES and state['due_date'] is not None and state['due_date'] < now
+            )
+            changes.append((state, after))
+        apply_task_changes(changes, actor=user)
+        notify_task_changes([after for _, after in changes], 'updated', user)
+    return len(before)
+
+
+def notify_task_changes(states, action, actor):
+    """
+    Queue one coalesced ``task_notification`` per affected user (assignee and
+    project creator of each task) in the surrounding transaction.
+    """
+    if not states:
+        return
+    creators = dict(
+        Project.objects.filter(id__in={state['project_id'] for state in states})
+        .values_list('id', 'created_by_id')
+    )
+    task_ids = defaultdict(list)
+    for state in states:
+        for user_id in {state['assigned_to_id'], creators.get(state['project_id'])}:
+            if user_id:
+                task_ids[user_id].append(state['id'])
+
+    enqueue([
+        (f"user_{user_id}", {
+            'type': 'task_notification',
+            'message': f"{actor.username} {action} {len(ids)} task(s)",
+            'task_ids': ids,
+            'action': f"bulk_{action}",
+        })
+        for user_id, ids in task_ids.items()
+    ])
@@ -0,0 +1,107 @@
+"""
+Bookkeeping that has to follow every task write.
+
+A write is described as a ``(before, after)`` pair of ``Task.snapshot()``
+dicts: ``before`` is None for a create and ``after`` is None for a delete.
+Signals feed single saves through here; bulk code paths that bypass
+``save()`` must call ``apply_task_changes`` themselves. Latency-sensitive
+paths may ``defer_task_changes`` instead: that writes one outbox row in the
+caller's transaction, and the outbox dispatcher applies the changes later.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from analytics.rollups import update_task_rollups
+from projects.models import Project
+from taskmanager.versions import bump, scoped
+from .counters import update_project_counters
+from .deltas import task_delta_messages
+from .models import Task, TaskStatusEvent
+from .notifications import enqueue
+
+# Outbox group of deferred changes: applied by the dispatcher, never sent
+DEFERRED_GROUP = 'task_changes'
+
+
+def status_events(changes, actor=None):
+    """One event per create and per status transition"""
+    actor_id = getattr(actor, 'pk', actor)
+    return [
+        TaskStatusEvent(
+            task_id=after['id'],
+            from_status=before['status'] if before else '',
+            to_status=after['status'],
+            changed_by_id=actor_id,
+            timestamp=after['updated_at'],
+        )
+        for before, after in changes
+        if after is not None and (before is None or before['status'] != after['status'])
+    ]
+
+
+def apply_task_changes(changes, actor=None):
+    """``actor`` is the user (or user id) responsible for the writes, if known"""
+    changes = [(before, after) for before, after in changes if before != after]
+    if not changes:
+        return
+    counted = update_project_counters(changes)
+    update_task_rollups(changes)
+    events = status_events(changes, actor)
+    if events:
+        TaskStatusEvent.objects.bulk_create(events)
+    # After the counters, so the project summaries in the deltas are current
+    enqueue(task_delta_messages(changes))
+    bump(*task_namespaces(changes, counted))
+
+
+def task_viewers(states, project_creators):
+    """Users who may see a task in any of ``states``: assignee, creator and project creator"""
+    return {
+        user_id
+        for state in states if state is not None
+        for user_id in (state['assigned_to_id'], state['created_by_id'], project_creators.get(state['project_id']))
+    }
+
+
+def task_namespaces(changes, counted=()):
+    """Version namespaces the changes move; ``counted`` are projects whose counters changed"""
+    project_ids = {state['project_id'] for change in changes for state in change if state}
+    creators = dict(Project.objects.filter(id__in=project_ids).values_list('id', 'created_by_id'))
+    namespaces = scoped('tasks', task_viewers([state for change in changes for state in change], creators))
+    if counted:
+        # Project counters are part of every project representation
+        namespaces += scoped('projects', Project.objects.filter(id__in=counted).audience())
+    return namespaces
+
+
+def _encode(state):
+    # JSON for the outbox payload; datetimes keep their microseconds
+    if state is None:
+        return None
+    return {
+        field: value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, Decimal) else value
+        for field, value in state.items()
+    }
+
+
+def _decode(state):
+    if state is None:
+        return None
+    return {field: Task._meta.get_field(field).to_python(value) for field, value in state.items()}
+
+
+def defer_task_changes(changes, actor=None):
+    """Queue ``apply_task_changes(changes, actor)`` for the outbox dispatcher"""
+    enqueue([(DEFERRED_GROUP, {
+        'type': 'task_changes',
+        'changes': [[_encode(before), _encode(after)] for before, after in changes],
+        'actor': getattr(actor, 'pk', actor),
+    })])
+
+
+def apply_deferred_changes(payloads):
+    """Apply the payloads of DEFERRED_GROUP outbox rows, in order"""
+    for payload in payloads:
+        changes = [(_decode(before), _decode(after)) for before, after in payload['changes']]
+        apply_task_changes(changes, actor=payload['actor'])
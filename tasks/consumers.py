@@ -1,12 +1,11 @@
 import json
-import jwt
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from django.conf import settings
+from accounts.authentication import user_from_token
+from projects.models import Project
 from .models import Task
-
-User = get_user_model()
+from .deltas import ADMIN_GROUP, project_topic
+from .status import set_task_status
 
 
 class TaskConsumer(AsyncWebsocketConsumer):
@@ -21,39 +20,28 @@ class TaskConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
         
-        # Verify JWT token
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-            user_id = payload.get('user_id')
-            if user_id:
-                self.user = await self.get_user(user_id)
-                if self.user:
-                    self.group_name = f"user_{self.user.id}"
-                    await self.channel_layer.group_add(
-                        self.group_name,
-                        self.channel_name
-                    )
-                    await self.accept()
-                else:
-                    await self.close()
-            else:
-                await self.close()
-        except jwt.ExpiredSignatureError:
+        # Verify JWT token; the user comes from the cached lookup HTTP auth uses
+        self.user = await database_sync_to_async(user_from_token)(token)
+        if self.user is None:
             await self.close()
-        except jwt.InvalidTokenError:
-            await self.close()
-    
-    @database_sync_to_async
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
+            return
+        
+        self.group_name = f"user_{self.user.id}"
+        self.group_names = [self.group_name]
+        # Admins see every task, so their deltas are addressed to the role
+        if self.user.is_admin:
+            self.group_names.append(ADMIN_GROUP)
+        for group_name in self.group_names:
+            await self.channel_layer.group_add(
+                group_name,
+                self.channel_name
+            )
+        await self.accept()
 
     async def disconnect(self, close_code):
-        if hasattr(self, 'group_name'):
+        for group_name in getattr(self, 'group_names', []):
             await self.channel_layer.group_discard(
-                self.group_name,
+                group_name,
                 self.channel_name
             )
 
@@ -63,14 +51,9 @@ class TaskConsumer(AsyncWebsocketConsumer):
             message_type = text_data_json.get('type')
             
             if message_type == 'task_update':
-                task_id = text_data_json.get('task_id')
-                new_status = text_data_json.get('status')
-                
-                # Update task status
-                await self.update_task_status(task_id, new_status)
-                
-                # Broadcast update to all relevant users
-                await self.broadcast_task_update(task_id, new_status)
+                await self.handle_task_update(text_data_json)
+            elif message_type in ('subscribe', 'unsubscribe'):
+                await self.handle_subscription(message_type, text_data_json)
                 
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({
@@ -78,76 +61,92 @@ class TaskConsumer(AsyncWebsocketConsumer):
                 'message': 'Invalid JSON'
             }))
 
+    async def handle_subscription(self, message_type, data):
+        project_id = data.get('project_id')
+        reply = {'type': f"{message_type}d", 'request_id': data.get('request_id'), 'project_id': project_id}
+        
+        if message_type == 'subscribe':
+            if not isinstance(project_id, int) or not await self.can_see_project(project_id):
+                reply.update(type='error', message='Project not found')
+            elif project_topic(project_id) not in self.group_names:
+                self.group_names.append(project_topic(project_id))
+                await self.channel_layer.group_add(project_topic(project_id), self.channel_name)
+        elif project_topic(project_id) in self.group_names:
+            self.group_names.remove(project_topic(project_id))
+            await self.channel_layer.group_discard(project_topic(project_id), self.channel_name)
+        
+        await self.send(text_data=json.dumps(reply))
+
+    async def project_access_changed(self, event):
+        # Sent when the user leaves a project's members or stops owning it
+        for project_id in event['project_ids']:
+            topic = project_topic(project_id)
+            if topic in self.group_names and not await self.can_see_project(project_id):
+                self.group_names.remove(topic)
+                await self.channel_layer.group_discard(topic, self.channel_name)
+                await self.send(text_data=json.dumps({
+                    'type': 'unsubscribed', 'request_id': None, 'project_id': project_id, 'reason': 'access_revoked'
+                }))
+
     @database_sync_to_async
-    def update_task_status(self, task_id, new_status):
-        try:
-            task = Task.objects.get(id=task_id)
-            task.status = new_status
-            task.save()
-            return task
-        except Task.DoesNotExist:
-            return None
+    def can_see_project(self, project_id):
+        return Project.objects.visible_to(self.user).filter(id=project_id).exists()
 
-    async def broadcast_task_update(self, task_id, new_status):
-        # Get task details
-        task_data = await self.get_task_data(task_id)
-        if task_data:
-            # Send to task assignee
-            if task_data['assigned_to_id']:
-                await self.channel_layer.group_send(
-                    f"user_{task_data['assigned_to_id']}",
-                    {
-                        'type': 'task_status_update',
-                        'task_id': task_id,
-                        'status': new_status,
-                        'task_data': task_data
-                    }
-                )
-            
-            # Send to project creator
-            if task_data['project_created_by_id']:
-                await self.channel_layer.group_send(
-                    f"user_{task_data['project_created_by_id']}",
-                    {
-                        'type': 'task_status_update',
-                        'task_id': task_id,
-                        'status': new_status,
-                        'task_data': task_data
-                    }
-                )
+    async def handle_task_update(self, data):
+        request_id = data.get('request_id')
+        task_id = data.get('task_id')
+        new_status = data.get('status')
+        
+        if not isinstance(task_id, int) or new_status not in dict(Task.STATUS_CHOICES):
+            await self.send_ack(request_id, task_id, error='Invalid task id or status')
+            return
+        
+        task_data = await self.update_task_status(task_id, new_status)
+        if task_data is None:
+            # Either out of scope or already in that status; only the slow path tells them apart
+            if await self.task_has_status(task_id, new_status):
+                await self.send_ack(request_id, task_id, status=new_status, changed=False)
+            else:
+                await self.send_ack(request_id, task_id, error='Task not found')
+            return
+        
+        # Recipients hear about the change once, through the task_delta the write enqueued
+        await self.send_ack(request_id, task_id, status=new_status, changed=True)
+
+    async def send_ack(self, request_id, task_id, status=None, changed=False, error=None):
+        message = {
+            'type': 'task_update_ack',
+            'request_id': request_id,
+            'task_id': task_id,
+            'ok': error is None,
+        }
+        if error is None:
+            message.update(status=status, changed=changed)
+        else:
+            message['error'] = error
+        await self.send(text_data=json.dumps(message))
 
     @database_sync_to_async
-    def get_task_data(self, task_id):
-        try:
-            task = Task.objects.select_related('assigned_to', 'project__created_by').get(id=task_id)
-            return {
-                'id': task.id,
-                'title': task.title,
-                'status': task.status,
-                'assigned_to_id': task.assigned_to.id if task.assigned_to else None,
-                'project_id': task.project.id,
-                'project_created_by_id': task.project.created_by.id if task.project.created_by else None,
-            }
-        except Task.DoesNotExist:
-            return None
+    def update_task_status(self, task_id, new_status):
+        return set_task_status(task_id, new_status, self.user)
+
+    @database_sync_to_async
+    def task_has_status(self, task_id, status):
+        return Task.objects.visible_to(self.user).filter(id=task_id, status=status).exists()
 
-    async def task_status_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'task_status_update',
-            'task_id': event['task_id'],
-            'status': event['status'],
-            'task_data': event['task_data']
-        }))
-    
     async def task_notification(self, event):
         await self.send(text_data=json.dumps({
             'type': 'task_notification',
             'message': event['message'],
-            'task_id': event['task_id'],
-            'task_title': event['task_title'],
+            'task_id': event.get('task_id'),
+            'task_ids': event.get('task_ids'),
+            'task_title': event.get('task_title'),
             'status': event.get('status'),
             'action': event['action']
         }))
 
-
-
+    async def task_delta(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'task_delta',
+            'deltas': event['deltas']
+        }))
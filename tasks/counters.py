@@ -0,0 +1,83 @@
+"""
+Per-project task counters stored on Project and kept exact with F() updates.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from projects.models import Project
+
+ZERO = Decimal('0')
+
+
+def contribution(state):
+    """What a single task state adds to its project's counters"""
+    return {
+        'total_tasks': 1,
+        'completed_tasks': int(state['status'] == 'completed'),
+        'overdue_tasks': int(bool(state['overdue'])),
+        'estimated_hours_total': Decimal(state['estimated_hours'] or ZERO),
+        'actual_hours_total': Decimal(state['actual_hours'] or ZERO),
+    }
+
+
+def project_counter_deltas(changes):
+    deltas = defaultdict(lambda: dict.fromkeys(Project.COUNTER_FIELDS, 0))
+    for before, after in changes:
+        if before is not None:
+            for field, value in contribution(before).items():
+                deltas[before['project_id']][field] -= value
+        if after is not None:
+            for field, value in contribution(after).items():
+                deltas[after['project_id']][field] += value
+    return {
+        project_id: {field: value for field, value in delta.items() if value}
+        for project_id, delta in deltas.items()
+        if any(delta.values())
+    }
+
+
+def update_project_counters(changes):
+    """Apply the counter deltas; returns the ids of the projects that changed"""
+    deltas = project_counter_deltas(changes)
+    # Fixed order so concurrent writers lock project rows in the same sequence
+    for project_id, delta in sorted(deltas.items()):
+        Project.objects.filter(pk=project_id).update(
+            **{field: F(field) + value for field, value in delta.items()}
+        )
+    return list(deltas)
+
+
+def expected_counters(project_ids=None):
+    """Recompute counters from the task table, keyed by project id"""
+    from .models import Task
+    tasks = Task.objects.order_by()
+    if project_ids is not None:
+        tasks = tasks.filter(project_id__in=project_ids)
+    rows = tasks.values('project_id').annotate(
+        total_tasks=Count('id'),
+        completed_tasks=Count('id', filter=Q(status='completed')),
+        overdue_tasks=Count('id', filter=Q(overdue=True)),
+        estimated_hours_total=Coalesce(Sum('estimated_hours'), Value(ZERO)),
+        actual_hours_total=Coalesce(Sum('actual_hours'), Value(ZERO)),
+    )
+    return {row.pop('project_id'): row for row in rows}
+
+
+def find_counter_drift(project_ids=None):
+    """Return [(project_id, field, stored, expected)] for every counter that is off"""
+    expected = expected_counters(project_ids)
+    empty = dict.fromkeys(Project.COUNTER_FIELDS, 0)
+    projects = Project.objects.order_by('pk')
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+    drift = []
+    for row in projects.values('pk', *Project.COUNTER_FIELDS).iterator():
+        wanted = expected.get(row['pk'], empty)
+        for field in Project.COUNTER_FIELDS:
+            if row[field] != wanted[field]:
+                drift.append((row['pk'], field, row[field], wanted[field]))
+    return drift
@@ -0,0 +1,177 @@
+"""
+Versioned row deltas pushed over WebSockets after task writes.
+
+For every change handed to ``tasks.changes.apply_task_changes``, each user
+whose view of the task changed gets an ``upsert`` (the serialized task) or a
+``delete``, the counters of the projects involved, and the change to their own
+``task_analytics`` totals, so clients patch local state instead of
+refetching lists. Admins see every task and share ADMIN_GROUP.
+
+Each change is also published once to the ``project_<id>`` topic of every
+project involved; sockets subscribe to those after a membership check and the
+channel layer does the fan-out to project members. Members may not be
+allowed to see every task in the project (interns only see their own), so
+topic deltas carry the task id, version and project counters but never the
+task row or analytics; rows only travel through the per-user groups above.
+
+Topics therefore add to the per-user sends rather than replace them: an event
+costs one ``group_send`` per affected viewer, one for ADMIN_GROUP and one per
+project involved. They exist so every project member's board stays live, not
+to cut the number of sends; replacing the per-user groups would need rows
+that every subscriber of a topic is allowed to see.
+"""
+
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from projects.models import Project
+from .models import Task
+from .serializers import TaskListSerializer
+
+User = get_user_model()
+
+ADMIN_GROUP = 'role_admin'
+
+# task_analytics totals a single task contributes to
+ANALYTICS_TOTALS = ('total_tasks', 'completed_tasks', 'in_progress_tasks', 'overdue_tasks')
+
+
+def project_topic(project_id):
+    return f"project_{project_id}"
+
+
+def analytics_contribution(state, sign=1):
+    return {
+        'total_tasks': sign,
+        'completed_tasks': sign * (state['status'] == 'completed'),
+        'in_progress_tasks': sign * (state['status'] == 'in_progress'),
+        'overdue_tasks': sign * bool(state['overdue']),
+        'status_distribution': {state['status']: sign},
+    }
+
+
+def merge_analytics(*deltas):
+    """Sum analytics deltas, dropping zero entries"""
+    totals = dict.fromkeys(ANALYTICS_TOTALS, 0)
+    statuses = defaultdict(int)
+    for delta in deltas:
+        for field in ANALYTICS_TOTALS:
+            totals[field] += delta.get(field, 0)
+        for status_name, count in delta.get('status_distribution', {}).items():
+            statuses[status_name] += count
+    merged = {field: value for field, value in totals.items() if value}
+    statuses = {status_name: count for status_name, count in statuses.items() if count}
+    if statuses:
+        merged['status_distribution'] = statuses
+    return merged
+
+
+def merge_deltas(current, incoming):
+    """Combine two delta lists; per task the later row wins and analytics add up"""
+    merged = {delta['task_id']: delta for delta in current}
+    for delta in incoming:
+        earlier = merged.get(delta['task_id'])
+        if earlier is not None:
+            delta = dict(delta, analytics=merge_analytics(earlier['analytics'], delta['analytics']))
+        merged[delta['task_id']] = delta
+    return list(merged.values())
+
+
+def viewers(state, roles, project_creators):
+    """Non-admin users who can see a task in ``state``; mirrors Task.objects.visible_to"""
+    if state is None:
+        return set()
+    candidates = {state['assigned_to_id'], state['created_by_id'], project_creators.get(state['project_id'])}
+    users = {user_id for user_id in candidates if roles.get(user_id) == 'manager'}
+    if roles.get(state['assigned_to_id']) == 'intern':
+        users.add(state['assigned_to_id'])
+    return users
+
+
+def task_delta_messages(changes):
+    """``(group, payload)`` pairs for tasks.notifications.enqueue, one per affected group"""
+    if not changes:
+        return []
+    project_ids = {state['project_id'] for change in changes for state in change if state}
+    projects = {
+        row['id']: row
+        for row in Project.objects.filter(id__in=project_ids).values(
+            'id', 'created_by_id', 'total_tasks', 'completed_tasks', 'overdue_tasks'
+        )
+    }
+    project_creators = {project_id: row['created_by_id'] for project_id, row in projects.items()}
+    user_ids = {
+        user_id
+        for change in changes for state in change if state
+        for user_id in (state['assigned_to_id'], state['created_by_id'], project_creators.get(state['project_id']))
+    }
+    roles = dict(User.objects.filter(id__in=user_ids).values_list('id', 'role'))
+    upserted = {after['id'] for _, after in changes if after}
+    rows = {
+        row['id']: row
+        for row in TaskListSerializer(
+            Task.objects.filter(id__in=upserted).with_list_relations(), many=True
+        ).data
+    }
+
+    deltas = defaultdict(list)
+    for before, after in changes:
+        state = after or before
+        summaries = [
+            project_summary(projects[project_id])
+            for project_id in sorted({s['project_id'] for s in (before, after) if s})
+            if project_id in projects
+        ]
+        seen_before = viewers(before, roles, project_creators)
+        seen_after = viewers(after, roles, project_creators)
+        recipients = [(f"user_{user_id}", user_id in seen_before, user_id in seen_after)
+                      for user_id in sorted(seen_before | seen_after)]
+        recipients.append((ADMIN_GROUP, before is not None, after is not None))
+
+        for group, was_visible, is_visible in recipients:
+            parts = []
+            if was_visible:
+                parts.append(analytics_contribution(before, -1))
+            if is_visible:
+                parts.append(analytics_contribution(after))
+            delta = {
+                'op': 'upsert' if is_visible and state['id'] in rows else 'delete',
+                'task_id': state['id'],
+                'version': after['version'] if after else before['version'] + 1,
+                'projects': summaries,
+                'analytics': merge_analytics(*parts),
+            }
+            if delta['op'] == 'upsert':
+                delta['task'] = rows[state['id']]
+            deltas[group].append(delta)
+
+        for summary in summaries:
+            in_project = after is not None and after['project_id'] == summary['id'] and state['id'] in rows
+            deltas[project_topic(summary['id'])].append({
+                'op': 'upsert' if in_project else 'delete',
+                'task_id': state['id'],
+                'version': after['version'] if after else before['version'] + 1,
+                'projects': [summary],
+                'analytics': {},
+            })
+
+    messages = []
+    for group, group_deltas in deltas.items():
+        payload = {'type': 'task_delta', 'deltas': group_deltas}
+        if len(group_deltas) == 1:
+            # Lets the outbox coalesce further changes to the same task
+            payload['task_id'] = group_deltas[0]['task_id']
+        messages.append((group, payload))
+    return messages
+
+
+def project_summary(row):
+    total, completed = row['total_tasks'], row['completed_tasks']
+    return {
+        'id': row['id'],
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'overdue_tasks': row['overdue_tasks'],
+        'completion_percentage': round(completed / total * 100, 2) if total else 0,
+    }
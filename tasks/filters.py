@@ -0,0 +1,60 @@
+"""
+Server-side filtering and ordering for the task list endpoints.
+
+Every filter maps to a plain column predicate that one of the composite
+indexes on Task can serve:
+
+- ``assigned_to`` / the intern scope -> (assigned_to, status, due_date)
+- ``project`` -> (project, status)
+- ``status`` -> (status, due_date)
+- ``overdue=true`` -> (status, due_date); ``overdue=false`` matches most
+  tasks and walks the ordering index
+- ``priority`` -> (priority, status)
+- ``due_after`` / ``due_before`` -> (due_date)
+- ``updated_since`` -> (updated_at, id)
+
+Each ordering has an index of its own ((title, id) and so on).
+
+``overdue`` reads the persisted Task.overdue flag, which writes and the
+overdue sweeper (tasks.overdue) keep current, plus open tasks past their due
+date that the sweeper has not flagged yet (TaskQuerySet.overdue).
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+# Columns clients may order by; ties are broken on id in the same direction
+ORDERING_FIELDS = ('created_at', 'updated_at', 'due_date', 'title')
+ORDERING_CHOICES = [prefix + field for field in ORDERING_FIELDS for prefix in ('', '-')]
+DEFAULT_ORDERING = '-created_at'
+
+EARLIEST_DUE = datetime(1, 1, 2, tzinfo=dt_timezone.utc)
+LATEST_DUE = datetime(9999, 12, 30, tzinfo=dt_timezone.utc)
+
+
+def filter_tasks(queryset, filters, user):
+    """Apply validated TaskFilterSerializer data to a Task queryset"""
+    if 'status' in filters:
+        queryset = queryset.filter(status__in=filters['status'])
+    if 'priority' in filters:
+        queryset = queryset.filter(priority__in=filters['priority'])
+    if 'project' in filters:
+        queryset = queryset.filter(project_id__in=filters['project'])
+    if 'assigned_to' in filters:
+        assignee = user.id if filters['assigned_to'] == 'me' else filters['assigned_to']
+        queryset = queryset.filter(assigned_to_id=assignee)
+    if 'due_after' in filters or 'due_before' in filters:
+        # Always bounded on both ends: planners take a half-open range for most
+        # of the table and walk the ordering index instead of task_due_idx
+        queryset = queryset.filter(
+            due_date__gte=filters.get('due_after', EARLIEST_DUE), due_date__lt=filters.get('due_before', LATEST_DUE)
+        )
+    if 'overdue' in filters:
+        queryset = queryset.overdue(filters['overdue'])
+    if 'updated_since' in filters:
+        queryset = queryset.filter(updated_at__gte=filters['updated_since'])
+    return queryset
+
+
+def order_tasks(queryset, ordering):
+    ordering = ordering or DEFAULT_ORDERING
+    return queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
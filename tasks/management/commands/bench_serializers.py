@@ -0,0 +1,137 @@
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from accounts.serializers import UserSerializer
+from chatbot.models import ChatMessage, ChatSession
+from chatbot.serializers import ChatMessageSerializer
+from projects.models import Project
+from projects.serializers import ProjectListSerializer
+from taskmanager.compiled import CompiledSerializer
+from tasks.models import Task
+from tasks.serializers import TaskListSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows/sec of the DRF list serializers and their compiled fast path. '
+        'Runs in a throwaway test database, checks the rendered JSON is byte-identical '
+        'and prints a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per serializer')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best is reported')
+        parser.add_argument('--output', default='-', help='File for the JSON report, - for stdout')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # In-process, so the run needs no Redis whatever the configured cache
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+                querysets = self.create_fixtures(max(options['rows'], 1))
+                report = {
+                    name: self.compare(serializer_class, list(queryset), options['repeat'])
+                    for name, (serializer_class, queryset) in querysets.items()
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        mismatched = [name for name, result in report.items() if not result['identical']]
+        output = json.dumps({
+            'rows': options['rows'],
+            'database': connection.vendor,
+            'serializers': report,
+        }, indent=2, sort_keys=True)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        if mismatched:
+            raise CommandError(f"Output differs for: {', '.join(mismatched)}")
+
+    def create_fixtures(self, rows):
+        """Rows are bulk-inserted: the counters and outbox are not part of the measurement"""
+        users = User.objects.bulk_create([
+            User(username=f'bench{i}', email=f'bench{i}@example.com', role=('admin', 'manager', 'intern')[i % 3])
+            for i in range(rows)
+        ])
+        managers = users[:max(rows // 100, 1)]
+        projects = Project.objects.bulk_create([
+            Project(
+                title=f'Bench project {i}',
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                budget=Decimal('1500.50') if i % 2 else None,
+                created_by=managers[i % len(managers)],
+            )
+            for i in range(rows)
+        ])
+        Project.assigned_to.through.objects.bulk_create([
+            Project.assigned_to.through(project_id=project.id, user_id=users[(i + n) % rows].id)
+            for i, project in enumerate(projects)
+            for n in range(2)
+        ])
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(
+                title=f'Bench task {i}',
+                description='Some words ' * (i % 5),
+                status=Task.STATUS_CHOICES[i % len(Task.STATUS_CHOICES)][0],
+                due_date=now + timedelta(days=i % 30 - 15) if i % 3 else None,
+                estimated_hours=Decimal('4.50') if i % 2 else None,
+                project=projects[i % len(projects)],
+                assigned_to=users[i % rows],
+                created_by=managers[i % len(managers)],
+            )
+            for i in range(rows)
+        ])
+        session = ChatSession.objects.create(user=users[0], title='Bench')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, role=('user', 'assistant')[i % 2], content=f'Message {i} ' * 10)
+            for i in range(rows)
+        ])
+
+        return {
+            'TaskListSerializer': (TaskListSerializer, Task.objects.with_list_relations()),
+            'ProjectListSerializer': (ProjectListSerializer, Project.objects.with_list_relations()),
+            'UserSerializer': (UserSerializer, User.objects.all()),
+            'ChatMessageSerializer': (ChatMessageSerializer, ChatMessage.objects.filter(session=session)),
+        }
+
+    def compare(self, serializer_class, instances, repeat):
+        paths = {
+            'drf': lambda: serializer_class(instances, many=True).data,
+            'compiled': lambda: CompiledSerializer(serializer_class, instances, many=True).data,
+        }
+        result = {}
+        rendered = {}
+        for name, serialize in paths.items():
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                data = serialize()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            rendered[name] = JSONRenderer().render(data)
+            result[name] = {
+                'seconds': round(best, 4),
+                'rows_per_second': round(len(instances) / best) if best else None,
+            }
+        result['speedup'] = round(result['drf']['seconds'] / result['compiled']['seconds'], 2)
+        result['identical'] = rendered['drf'] == rendered['compiled']
+        return result
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Project
+from tasks.models import Task
+from tasks.notifications import dispatch_pending
+
+User = get_user_model()
+
+STATUS_CYCLE = ['todo', 'in_progress', 'review', 'completed']
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def latency_summary(seconds):
+    values = sorted(round(value * 1000, 3) for value in seconds)
+    return {
+        'samples': len(values),
+        'p50_ms': percentile(values, 0.50),
+        'p90_ms': percentile(values, 0.90),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': values[-1] if values else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark TaskConsumer fan-out with simulated WebSocket connections. '
+        'Runs in a throwaway test database and prints a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=500, help='Sockets to open')
+        parser.add_argument('--users', type=int, default=50, help='Distinct users the sockets log in as')
+        parser.add_argument('--projects', type=int, default=10, help='Projects to spread users and tasks over')
+        parser.add_argument('--tasks-per-project', type=int, default=5)
+        parser.add_argument('--operations', type=int, default=100, help='Writes to drive after connecting')
+        parser.add_argument(
+            '--status-ratio',
+            type=float,
+            default=0.5,
+            help='Share of operations sent as WebSocket task_update; the rest are ORM saves',
+        )
+        parser.add_argument(
+            '--subscribe',
+            action='store_true',
+            help='Subscribe every socket to the project topics its user can see',
+        )
+        parser.add_argument('--connect-batch', type=int, default=200, help='Sockets connected concurrently')
+        parser.add_argument(
+            '--settle-ms',
+            type=float,
+            default=50.0,
+            help='Quiet period that marks the end of one operation\'s fan-out',
+        )
+        parser.add_argument('--layer', choices=['memory', 'redis'], default='memory')
+        parser.add_argument(
+            '--redis-url',
+            default='redis://127.0.0.1:6379/0',
+            help='Channel layer host for --layer redis (any Redis-compatible server)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='-', help='File for the JSON report, - for stdout')
+
+    def channel_layers(self, options):
+        if options['layer'] == 'redis':
+            return {'default': {
+                'BACKEND': 'channels_redis.core.RedisChannelLayer',
+                'CONFIG': {'hosts': [options['redis_url']], 'capacity': 10000},
+            }}
+        return {'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {'capacity': 10000},
+        }}
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report['config'] = {
+            key: options[key] for key in (
+                'connections', 'users', 'projects', 'tasks_per_project', 'operations',
+                'status_ratio', 'subscribe', 'connect_batch', 'settle_ms', 'layer', 'seed',
+            )
+        }
+        report['database'] = connection.vendor
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+
+    def benchmark(self, options):
+        """Fixtures and measurement in the current database"""
+        with override_settings(
+            CHANNEL_LAYERS=self.channel_layers(options),
+            # In-process, so the run needs no Redis for auth lookups or version stamps
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            NOTIFICATION_COALESCE_SECONDS=0,
+            NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT=False,
+        ):
+            fixtures = self.create_fixtures(options)
+            return async_to_sync(self.run)(fixtures, options)
+
+    def create_fixtures(self, options):
+        users = [
+            User.objects.create_user(
+                username=f'bench{i}', password='bench-pass', role='manager' if i % 5 == 0 else 'intern'
+            )
+            for i in range(max(options['users'], 1))
+        ]
+        managers = [user for user in users if user.role == 'manager']
+        interns = [user for user in users if user.role == 'intern'] or managers
+
+        projects = []
+        for i in range(max(options['projects'], 1)):
+            project = Project.objects.create(
+                title=f'Bench project {i}',
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                created_by=managers[i % len(managers)],
+            )
+            members = interns[i::options['projects']] or interns[:1]
+            project.assigned_to.add(*members)
+            projects.append((project, members))
+
+        tasks = [
+            Task.objects.create(
+                title=f'Bench task {project.id}.{n}',
+                project=project,
+                assigned_to=members[n % len(members)],
+                created_by=project.created_by,
+            )
+            for project, members in projects
+            for n in range(options['tasks_per_project'])
+        ]
+        # Setup notifications are not part of the measurement
+        self.dispatch()
+
+        return {
+            'users': users,
+            'tokens': {user.id: str(AccessToken.for_user(user)) for user in users},
+            'tasks': tasks,
+            'topics': {
+                user.id: list(Project.objects.visible_to(user).values_list('id', flat=True))
+                for user in users
+            },
+        }
+
+    async def run(self, fixtures, options):
+        from taskmanager.asgi import application
+
+        rng = random.Random(options['seed'])
+        users = fixtures['users']
+        sockets = []
+        received = []
+
+        async def connect(user):
+            communicator = WebsocketCommunicator(application, f"/ws/tasks/?token={fixtures['tokens'][user.id]}")
+            connected, _ = await communicator.connect(timeout=30)
+            return user, communicator if connected else None
+
+        # Connect phase
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        failed = 0
+        started = time.perf_counter()
+        for start in range(0, options['connections'], options['connect_batch']):
+            batch = [
+                connect(users[i % len(users)])
+                for i in range(start, min(start + options['connect_batch'], options['connections']))
+            ]
+            for user, communicator in await asyncio.gather(*batch):
+                if communicator is None:
+                    failed += 1
+                else:
+                    sockets.append((user, communicator))
+        connect_seconds = time.perf_counter() - started
+        memory_per_connection = (tracemalloc.get_traced_memory()[0] - memory_before) / max(len(sockets), 1)
+        tracemalloc.stop()
+
+        if options['subscribe']:
+            for user, communicator in sockets:
+                for project_id in fixtures['topics'][user.id]:
+                    await communicator.send_json_to({'type': 'subscribe', 'project_id': project_id})
+            # Drain the subscription replies
+            for user, communicator in sockets:
+                for _ in fixtures['topics'][user.id]:
+                    await communicator.output_queue.get()
+
+        acks = asyncio.Queue()
+
+        async def read(communicator):
+            while True:
+                message = await communicator.output_queue.get()
+                # Replies to the sender are not fan-out
+                if json.loads(message.get('text', '{}')).get('type') == 'task_update_ack':
+                    acks.put_nowait(message)
+                else:
+                    received.append((time.perf_counter(), message))
+
+        readers = [asyncio.ensure_future(read(communicator)) for _, communicator in sockets]
+        sender_for = {}
+        for user, communicator in sockets:
+            sender_for.setdefault(user.id, communicator)
+
+        # Drive phase: one operation at a time so every message belongs to the operation before it
+        latencies = {'status': [], 'write': []}
+        messages = {'status': 0, 'write': 0}
+        acknowledged = 0
+        drive_started = time.perf_counter()
+        for number in range(options['operations']):
+            task = rng.choice(fixtures['tasks'])
+            kind = 'status' if rng.random() < options['status_ratio'] else 'write'
+            first = len(received)
+            started = time.perf_counter()
+            if kind == 'status' and task.created_by_id in sender_for:
+                task.status = STATUS_CYCLE[(STATUS_CYCLE.index(task.status) + 1) % len(STATUS_CYCLE)]
+                await sender_for[task.created_by_id].send_json_to({
+                    'type': 'task_update', 'task_id': task.id, 'status': task.status, 'request_id': number,
+                })
+                # The change is committed once acknowledged; its deltas go out through the outbox
+                await asyncio.wait_for(acks.get(), timeout=30)
+                acknowledged += 1
+                await database_sync_to_async(self.dispatch)()
+            else:
+                kind = 'write'
+                await database_sync_to_async(self.write)(task, number)
+
+            await self.settle(received, options['settle_ms'] / 1000)
+            arrivals = received[first:]
+            messages[kind] += len(arrivals)
+            latencies[kind].extend(arrived - started for arrived, _ in arrivals)
+        drive_seconds = time.perf_counter() - drive_started
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*(communicator.disconnect() for _, communicator in sockets), return_exceptions=True)
+
+        total_messages = sum(messages.values())
+        return {
+            'connect': {
+                'opened': len(sockets),
+                'failed': failed,
+                'seconds': round(connect_seconds, 4),
+                'per_second': round(len(sockets) / connect_seconds, 2) if connect_seconds else None,
+                'memory_bytes_per_connection': round(memory_per_connection),
+            },
+            'fanout': {
+                'operations': options['operations'],
+                'messages': total_messages,
+                'acks': acknowledged,
+                'seconds': round(drive_seconds, 4),
+                'messages_per_second': round(total_messages / drive_seconds, 2) if drive_seconds else None,
+                'latency': latency_summary(latencies['status'] + latencies['write']),
+                'by_operation': {
+                    kind: {'messages': messages[kind], 'latency': latency_summary(latencies[kind])}
+                    for kind in latencies
+                },
+            },
+        }
+
+    def write(self, task, number):
+        """An ORM save as the API would do it, then what the outbox dispatcher would send"""
+        task = Task.objects.get(pk=task.pk)
+        task.title = f'Bench edit {number}'
+        task.priority = 'high' if task.priority != 'high' else 'low'
+        task._changed_by = task.created_by_id
+        task.save()
+        self.dispatch()
+
+    def dispatch(self):
+        while dispatch_pending(1000)[0]:
+            pass
+
+    async def settle(self, received, quiet):
+        count = -1
+        while count != len(received):
+            count = len(received)
+            await asyncio.sleep(quiet)
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.notifications import dispatch_pending, outbox_lag, stats
+
+
+class Command(BaseCommand):
+    help = 'Send queued WebSocket notifications from the outbox, retrying failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Messages sent per transaction',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain what is due now and exit instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when the outbox is empty',
+        )
+        parser.add_argument(
+            '--report-every',
+            type=float,
+            default=60.0,
+            help='Seconds between lag reports while polling',
+        )
+        parser.add_argument(
+            '--lag',
+            action='store_true',
+            help='Only print the outbox lag and exit',
+        )
+
+    def report(self):
+        lag = outbox_lag()
+        self.stdout.write(
+            f"Outbox: {lag['pending']} pending ({lag['merged_pending']} merged events), "
+            f"{lag['failed']} failed, oldest pending {lag['lag_seconds']}s"
+        )
+
+    def handle(self, *args, **options):
+        if options['lag']:
+            self.report()
+            return
+
+        total_sent = total_failed = 0
+        last_report = time.monotonic()
+        try:
+            while True:
+                sent, failed = dispatch_pending(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+
+                if not sent and not failed:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+
+                if time.monotonic() - last_report >= options['report_every']:
+                    self.report()
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {total_sent} notification(s) covering {stats['merged_sent']} merged event(s), "
+            f"{total_failed} failed attempt(s)"
+        ))
+        self.report()
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned attachment uploads and their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS,
+            help='Remove uploads that have not received a chunk for this many hours',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} abandoned upload(s)"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from projects.models import Project
+from tasks.counters import expected_counters, find_counter_drift
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized per-project task counters and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not write corrected values',
+        )
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            dest='project_ids',
+            help='Limit the check to this project id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        drift = find_counter_drift(options['project_ids'])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Project counters are consistent'))
+            return
+
+        drifted_projects = sorted({project_id for project_id, *_ in drift})
+        for project_id, field, stored, expected in drift:
+            self.stdout.write(f"Project {project_id}: {field} is {stored}, expected {expected}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drift)} counter(s) drifted across {len(drifted_projects)} project(s)"
+            ))
+            return
+
+        empty = dict.fromkeys(Project.COUNTER_FIELDS, 0)
+        for project_id in drifted_projects:
+            with transaction.atomic():
+                # Lock the row so no F() increment lands between recount and write
+                Project.objects.select_for_update().filter(pk=project_id).first()
+                counters = expected_counters([project_id]).get(project_id, empty)
+                Project.objects.filter(pk=project_id).update(**counters)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {len(drifted_projects)} project(s)"
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.overdue import SWEEP_BATCH_SIZE, sweep_overdue
+
+
+class Command(BaseCommand):
+    help = 'Flag tasks that have passed their due date and notify their assignees'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help='Tasks flagged per transaction',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single sweep and exit instead of looping',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Seconds between sweeps while looping',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                flagged = sweep_overdue(batch_size=options['batch_size'])
+                total += flagged
+                if flagged:
+                    self.stdout.write(f"Flagged {flagged} overdue task(s)")
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Flagged {total} overdue task(s) in total"))
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_visibility(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskVisibility = apps.get_model('tasks', 'TaskVisibility')
+    rows = []
+    for task_id, *user_ids in Task.objects.values_list(
+        'id', 'assigned_to_id', 'created_by_id', 'project__created_by_id'
+    ).iterator():
+        for user_id in set(user_ids):
+            rows.append(TaskVisibility(task_id=task_id, user_id=user_id))
+        if len(rows) >= 5000:
+            TaskVisibility.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    TaskVisibility.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskvisibility',
+            constraint=models.UniqueConstraint(fields=('user', 'task'), name='unique_task_visibility'),
+        ),
+        migrations.RunPython(backfill_visibility, migrations.RunPython.noop),
+    ]
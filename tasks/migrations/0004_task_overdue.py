@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:56
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def flag_overdue_tasks(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(
+        due_date__lt=timezone.now(),
+        status__in=['todo', 'in_progress', 'review']
+    ).update(overdue=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_taskvisibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='overdue',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_overdue_tasks, migrations.RunPython.noop),
+    ]
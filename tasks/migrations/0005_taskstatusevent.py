@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_status_events(apps, schema_editor):
+    """
+    History before this migration is unknown; record each task's current
+    status at its last update so completion series have a starting point.
+    """
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatusEvent = apps.get_model('tasks', 'TaskStatusEvent')
+    events = (
+        TaskStatusEvent(task_id=task_id, from_status='', to_status=status, timestamp=updated_at)
+        for task_id, status, updated_at in Task.objects.values_list('id', 'status', 'updated_at').iterator()
+    )
+    TaskStatusEvent.objects.bulk_create(events, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0004_task_overdue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('todo', 'To Do'), ('in_progress', 'In Progress'), ('review', 'Review'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('to_status', models.CharField(choices=[('todo', 'To Do'), ('in_progress', 'In Progress'), ('review', 'Review'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='tasks.task')),
+            ],
+            options={
+                'ordering': ['timestamp'],
+                'indexes': [models.Index(fields=['timestamp'], name='status_event_ts_idx'), models.Index(fields=['to_status', 'timestamp'], name='status_event_to_ts_idx'), models.Index(fields=['task', 'timestamp'], name='status_event_task_ts_idx')],
+            },
+        ),
+        migrations.RunPython(seed_status_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='merged_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(condition=models.Q(('attempts', 0), models.Q(('coalesce_key', ''), _negated=True)), fields=['group', 'coalesce_key'], name='outbox_coalesce_idx'),
+        ),
+    ]
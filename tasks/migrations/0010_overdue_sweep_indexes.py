@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('overdue', False), ('status__in', ['todo', 'in_progress', 'review'])), fields=['due_date'], name='task_due_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('overdue', True)), fields=['due_date'], name='task_overdue_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_overdue_sweep_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskattachment',
+            index=models.Index(fields=['task', 'uploaded_at', 'id'], name='attachment_task_uploaded_idx'),
+        ),
+    ]
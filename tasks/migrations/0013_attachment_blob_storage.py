@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:03
+
+import blobs.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_attachmentupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='taskattachment',
+            name='file',
+            field=models.FileField(storage=blobs.storage.ContentAddressedStorage(), upload_to='task_attachments/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_attachment_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['title', 'id'], name='task_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('overdue', True)), fields=['created_at', 'id'], name='task_overdue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('overdue', False)), fields=['created_at', 'id'], name='task_on_time_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_overdue_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_overdue_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_on_time_created_idx',
+        ),
+    ]
@@ -1,10 +1,92 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from blobs.storage import blob_storage
+from taskmanager.fieldsets import expands, includes, nested
 
 User = get_user_model()
 
 
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Tasks the user may see: admins see everything, interns their own
+        assignments, and managers anything they are assigned to, created, or
+        that lives in a project they created (resolved through TaskVisibility).
+        """
+        if user.is_admin:
+            return self
+        if user.is_manager:
+            return self.filter(
+                id__in=TaskVisibility.objects.filter(user=user).values('task_id')
+            )
+        return self.filter(assigned_to=user)
+    
+    def overdue(self, overdue=True, now=None):
+        """
+        Tasks that are (``overdue=False``: are not) overdue as of ``now``.
+
+        The stored flag trails the clock by up to one sweep interval, so this
+        reads the dates instead. A flagged task is always open and past due,
+        so ``overdue=True OR (open AND past due)`` reduces to the second term,
+        which task_status_due_idx serves; the complement is spelled as three
+        index-friendly terms rather than a NOT.
+        """
+        now = now or timezone.now()
+        if overdue:
+            return self.filter(status__in=self.model.OPEN_STATUSES, due_date__lt=now)
+        closed = [key for key, _ in self.model.STATUS_CHOICES if key not in self.model.OPEN_STATUSES]
+        return self.filter(Q(status__in=closed) | Q(due_date__isnull=True) | Q(due_date__gte=now))
+    
+    def with_list_relations(self, selection=None):
+        """
+        Join/prefetch everything TaskListSerializer reads, so a page costs a
+        fixed number of queries; a FieldSelection drops the relations it collapses.
+        """
+        from projects.models import Project
+        queryset = self
+        if expands(selection, 'assigned_to'):
+            queryset = queryset.select_related('assigned_to')
+        if expands(selection, 'project'):
+            queryset = queryset.prefetch_related(
+                Prefetch('project', queryset=Project.objects.with_list_relations(nested(selection, 'project')))
+            )
+        return queryset
+    
+    def with_detail_relations(self, selection=None):
+        """
+        with_list_relations plus what TaskSerializer reads: the creator, the
+        newest DETAIL_COMMENTS comments and DETAIL_ATTACHMENTS attachments
+        (one windowed query each, however long the history) and their totals.
+        """
+        queryset = self.with_list_relations(selection)
+        if expands(selection, 'created_by'):
+            queryset = queryset.select_related('created_by')
+        for name, model, user_field, limit in (
+            ('comments', TaskComment, 'user', Task.DETAIL_COMMENTS),
+            ('attachments', TaskAttachment, 'uploaded_by', Task.DETAIL_ATTACHMENTS),
+        ):
+            if includes(selection, name):
+                latest = model.objects.order_by(*model.NEWEST_FIRST)
+                if expands(nested(selection, name), user_field):
+                    latest = latest.select_related(user_field)
+                queryset = queryset.prefetch_related(Prefetch(name, queryset=latest[:limit], to_attr=f'_latest_{name}'))
+            if includes(selection, f'{name}_count'):
+                queryset = queryset.annotate(**{f'_{name}_count': related_count(model)})
+        return queryset
+
+
+def related_count(model):
+    """Per-task row count of ``model`` as a subquery, so several counts never multiply"""
+    rows = model.objects.filter(task=OuterRef('pk')).order_by().values('task').annotate(count=Count('id'))
+    return Coalesce(Subquery(rows.values('count')), 0)
+
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ('todo', 'To Do'),
@@ -14,6 +96,13 @@ class Task(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses that still count towards overdue work
+    OPEN_STATUSES = ['todo', 'in_progress', 'review']
+    
+    # Newest comments/attachments embedded in the task detail; the rest are paged
+    DETAIL_COMMENTS = 20
+    DETAIL_ATTACHMENTS = 20
+    
     PRIORITY_CHOICES = [
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -35,21 +124,227 @@ class Task(models.Model):
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='tasks')
     assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assigned_tasks')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tasks')
+    # Set on every write and by the overdue sweeper (tasks.overdue), so it can
+    # lag the clock by one sweep interval (sweep_overdue --interval, 60s by
+    # default); feeds Project.overdue_tasks. Use is_overdue / overdue() to read.
+    overdue = models.BooleanField(default=False, editable=False)
+    # Bumped on every write so clients can order WebSocket deltas
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TaskQuerySet.as_manager()
+    
+    # Fields whose before/after values drive the denormalized bookkeeping in tasks.changes
+    SNAPSHOT_FIELDS = (
+        'id', 'project_id', 'assigned_to_id', 'created_by_id', 'status', 'overdue',
+        'due_date', 'estimated_hours', 'actual_hours', 'version', 'updated_at',
+    )
+    
+    # Editable fields reported as changed_fields in task notifications
+    NOTIFY_FIELDS = (
+        'title', 'description', 'status', 'priority', 'due_date', 'estimated_hours',
+        'actual_hours', 'progress', 'project_id', 'assigned_to_id',
+    )
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            # One per list filter; see tasks.filters
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            models.Index(fields=['priority', 'status'], name='task_priority_status_idx'),
+            models.Index(fields=['due_date'], name='task_due_idx'),
+            models.Index(fields=['updated_at', 'id'], name='task_updated_id_idx'),
+            models.Index(fields=['title', 'id'], name='task_title_id_idx'),
+            # Open (OPEN_STATUSES) tasks not yet flagged overdue: what the sweeper scans
+            models.Index(
+                fields=['due_date'],
+                condition=Q(status__in=['todo', 'in_progress', 'review'], overdue=False),
+                name='task_due_open_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.project.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.SNAPSHOT_FIELDS).issubset(field_names):
+            instance._loaded_state = instance.snapshot()
+        if set(cls.NOTIFY_FIELDS).issubset(field_names):
+            instance._loaded_values = instance.notify_values()
+        return instance
+    
+    def snapshot(self):
+        return {field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}
+    
+    def notify_values(self):
+        return {field: getattr(self, field) for field in self.NOTIFY_FIELDS}
+    
+    def changed_fields(self):
+        """NOTIFY_FIELDS that differ from the loaded row, or None if it was never loaded"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [field for field in self.NOTIFY_FIELDS if loaded[field] != getattr(self, field)]
+    
+    def compute_overdue(self, now=None):
+        if not self.due_date or self.status not in self.OPEN_STATUSES:
+            return False
+        return self.due_date < (now or timezone.now())
+    
+    def save(self, *args, **kwargs):
+        # The post_save receivers write counters, rollups, status events and the
+        # outbox; they commit or roll back together with the row
+        with transaction.atomic():
+            if not self._state.adding and (
+                getattr(self, '_loaded_state', None) is None or getattr(self, '_loaded_values', None) is None
+            ):
+                row = Task.objects.filter(pk=self.pk).values(*{*self.SNAPSHOT_FIELDS, *self.NOTIFY_FIELDS}).first()
+                if row is not None:
+                    self._loaded_state = {field: row[field] for field in self.SNAPSHOT_FIELDS}
+                    self._loaded_values = {field: row[field] for field in self.NOTIFY_FIELDS}
+            self.overdue = self.compute_overdue()
+            if not self._state.adding and getattr(self, '_loaded_state', None) is not None:
+                self.version = self._loaded_state['version'] + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'overdue', 'version'}
+            super().save(*args, **kwargs)
+        self._loaded_state = self.snapshot()
+        self._loaded_values = self.notify_values()
+    
     @property
     def is_overdue(self):
-        if not self.due_date:
-            return False
-        from django.utils import timezone
-        return self.due_date < timezone.now() and self.status != 'completed'
+        # Also true before the sweeper has caught up
+        return self.overdue or self.compute_overdue()
+    
+    def _latest(self, name, model, limit):
+        # Prefetched by with_detail_relations; loaded here for a task fetched without it
+        if not hasattr(self, f'_latest_{name}'):
+            setattr(self, f'_latest_{name}', list(getattr(self, name).order_by(*model.NEWEST_FIRST)[:limit]))
+        return getattr(self, f'_latest_{name}')[::-1]
+    
+    def _count(self, name):
+        if not hasattr(self, f'_{name}_count'):
+            setattr(self, f'_{name}_count', getattr(self, name).count())
+        return getattr(self, f'_{name}_count')
+    
+    @property
+    def latest_comments(self):
+        """The newest DETAIL_COMMENTS comments, oldest first"""
+        return self._latest('comments', TaskComment, self.DETAIL_COMMENTS)
+    
+    @property
+    def latest_attachments(self):
+        """The newest DETAIL_ATTACHMENTS attachments, oldest first"""
+        return self._latest('attachments', TaskAttachment, self.DETAIL_ATTACHMENTS)
+    
+    @property
+    def comments_count(self):
+        return self._count('comments')
+    
+    @property
+    def attachments_count(self):
+        return self._count('attachments')
+
+
+class TaskVisibility(models.Model):
+    """
+    One row per (user, task) where the user is the task's assignee, creator,
+    or the creator of its project. Maintained by tasks.visibility so manager
+    scoping is a single indexed semi-join instead of an OR across a join.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_tasks')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='visibility')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'task'], name='unique_task_visibility'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} can see {self.task.title}"
+
+
+class TaskStatusEventQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Events for the tasks Task.objects.visible_to(user) returns"""
+        if user.is_admin:
+            return self
+        if user.is_manager:
+            return self.filter(
+                task_id__in=TaskVisibility.objects.filter(user=user).values('task_id')
+            )
+        return self.filter(task__assigned_to=user)
+
+
+class TaskStatusEvent(models.Model):
+    """
+    Append-only log of status transitions. ``from_status`` is blank for the
+    event recorded when a task is created.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    changed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    objects = TaskStatusEventQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='status_event_ts_idx'),
+            models.Index(fields=['to_status', 'timestamp'], name='status_event_to_ts_idx'),
+            models.Index(fields=['task', 'timestamp'], name='status_event_task_ts_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    A channel-layer message waiting to be sent. Rows are written in the same
+    transaction as the change they describe and drained by
+    tasks.notifications.dispatch_pending; sent rows are deleted.
+    """
+    group = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set once the message has used up its retries; failed rows are kept for inspection
+    failed_at = models.DateTimeField(null=True, blank=True)
+    # Messages with the same group and key merge while waiting out the coalescing window
+    coalesce_key = models.CharField(max_length=100, blank=True)
+    merged_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                name='outbox_pending_idx',
+                condition=Q(failed_at__isnull=True),
+            ),
+            models.Index(
+                fields=['group', 'coalesce_key'],
+                name='outbox_coalesce_idx',
+                condition=Q(attempts=0) & ~Q(coalesce_key=''),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.payload.get('type')} for {self.group}"
 
 
 class TaskComment(models.Model):
@@ -58,8 +353,13 @@ class TaskComment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     
+    NEWEST_FIRST = ('-created_at', '-id')
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on {self.task.title}"
@@ -67,13 +367,47 @@ class TaskComment(models.Model):
 
 class TaskAttachment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to='task_attachments/')
+    file = models.FileField(upload_to='task_attachments/', storage=blob_storage)
     filename = models.CharField(max_length=255)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    NEWEST_FIRST = ('-uploaded_at', '-id')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'uploaded_at', 'id'], name='attachment_task_uploaded_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.filename} - {self.task.title}"
 
 
+class AttachmentUpload(models.Model):
+    """
+    A resumable upload in progress (tasks.uploads). Chunks are written into
+    a part file at ``offset``; completing the upload turns it into a
+    TaskAttachment and deletes this row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='uploads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attachment_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Bytes received so far; the next chunk must start here
+    offset = models.PositiveBigIntegerField(default=0)
+    # SHA-256 the client expects, checked on completion (optional)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size}) - {self.task_id}"
+
+
 
@@ -0,0 +1,276 @@
+"""
+Transactional outbox for WebSocket notifications.
+
+Writers call ``enqueue`` inside the transaction that makes the change, so a
+rolled-back write never notifies and the request never waits on the channel
+layer. ``dispatch_pending`` (run by the ``dispatch_notifications`` command, or by
+one dispatcher thread per process that each commit wakes when
+NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT is set) drains the table in batches
+and retries failures with backoff. Sends happen after the claiming
+transaction commits, so delivery is at least once.
+
+Messages about a single task are held for NOTIFICATION_COALESCE_SECONDS;
+further messages for the same (recipient group, task) inside that window
+are merged into the waiting row, which ends up carrying the final state and
+the union of ``changed_fields``.
+"""
+
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Sum
+from django.utils import timezone
+
+from .deltas import merge_deltas
+from .models import NotificationOutbox
+
+# Attempts before a message is parked with failed_at set
+MAX_ATTEMPTS = 8
+
+# Retry delay doubles per attempt up to this many seconds
+MAX_BACKOFF_SECONDS = 300
+
+# Seconds a dispatcher has to send the rows it claimed before another may retry them
+CLAIM_SECONDS = 30
+
+# Per-process counters: enqueued/merged on the writing side, sent/failed/merged_sent in dispatchers
+stats = Counter()
+
+# The per-process dispatcher thread started by dispatch_in_background, and its wake-up call
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def coalesce_window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_SECONDS', 2))
+
+
+def coalesce_key(payload):
+    task_id = payload.get('task_id')
+    return f"{payload['type']}:{task_id}" if task_id is not None else ''
+
+
+def merge_payloads(current, incoming):
+    """Later state wins; a delete or an unsent create keeps its action"""
+    if incoming['type'] == 'task_delta':
+        return dict(incoming, deltas=merge_deltas(current['deltas'], incoming['deltas']))
+    merged = dict(incoming)
+    actions = {current.get('action'), incoming.get('action')}
+    if 'deleted' in actions:
+        merged['action'] = 'deleted'
+    elif current.get('action') == 'created':
+        merged['action'] = 'created'
+    merged['changed_fields'] = sorted({*current.get('changed_fields', ()), *incoming.get('changed_fields', ())})
+    merged['merged_count'] = current.get('merged_count', 0) + 1
+    return merged
+
+
+def enqueue(messages):
+    """Store ``(group, payload)`` pairs; they are sent after the transaction commits"""
+    if not messages:
+        return
+    now = timezone.now()
+    window = coalesce_window()
+    keyed = [(group, payload, coalesce_key(payload) if window else '') for group, payload in messages]
+    
+    # Rows still inside their window; ones a dispatcher has locked are left alone
+    waiting = {}
+    keys = {key for _, _, key in keyed if key}
+    if keys:
+        waiting = {
+            (row.group, row.coalesce_key): row
+            for row in NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                group__in={group for group, _, key in keyed if key},
+                coalesce_key__in=keys,
+                attempts=0,
+                failed_at__isnull=True,
+                available_at__gt=now,
+            )
+        }
+    
+    created, merged = [], {}
+    for group, payload, key in keyed:
+        row = waiting.get((group, key)) if key else None
+        if row is None:
+            row = NotificationOutbox(
+                group=group, payload=payload, coalesce_key=key,
+                created_at=now, available_at=now + window if key else now,
+            )
+            created.append(row)
+            if key:
+                waiting[(group, key)] = row
+            continue
+        row.payload = merge_payloads(row.payload, payload)
+        row.merged_count += 1
+        if row.pk:
+            merged[row.pk] = row
+    
+    if merged:
+        NotificationOutbox.objects.bulk_update(merged.values(), ['payload', 'merged_count'])
+    NotificationOutbox.objects.bulk_create(created)
+    stats['enqueued'] += len(messages)
+    stats['merged'] += len(messages) - len(created)
+    if getattr(settings, 'NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT', False):
+        transaction.on_commit(dispatch_in_background)
+
+
+def dispatch_in_background():
+    """Wake this process's dispatcher thread, starting it on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(target=_dispatch_forever, name='outbox-dispatcher', daemon=True)
+            _dispatcher.start()
+    _wakeup.set()
+
+
+def _dispatch_forever():
+    # One thread per process; commits only wake it, however many there are
+    timeout = None
+    while True:
+        _wakeup.wait(timeout)
+        _wakeup.clear()
+        try:
+            timeout = _drain()
+        except Exception as e:
+            if settings.DEBUG:
+                print(f"Outbox dispatcher error: {type(e).__name__}: {e}")
+            timeout = 1.0
+        finally:
+            connection.close()
+
+
+def _drain():
+    """Send what is due; returns seconds until the next pending row is due, or None"""
+    while dispatch_pending()[0]:
+        pass
+    next_due = NotificationOutbox.objects.filter(
+        failed_at__isnull=True
+    ).aggregate(next_due=Min('available_at'))['next_due']
+    if next_due is None:
+        return None
+    return min(max((next_due - timezone.now()).total_seconds(), 0.05), 60)
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(2 ** attempts, MAX_BACKOFF_SECONDS))
+
+
+async def _send_batch(channel_layer, rows):
+    errors = {}
+    for row in rows:
+        try:
+            await channel_layer.group_send(row.group, row.payload)
+        except Exception as e:
+            errors[row.id] = f"{type(e).__name__}: {e}"
+    return errors
+
+
+def _claim(batch_size, now):
+    """Due rows, counted as attempted and leased for CLAIM_SECONDS; no lock outlives this"""
+    from .changes import DEFERRED_GROUP
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(failed_at__isnull=True, available_at__lte=now)
+            .exclude(group=DEFERRED_GROUP)
+            .order_by('id')[:batch_size]
+        )
+        if rows:
+            # attempts > 0 also keeps enqueue from merging into a row that is being sent
+            NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                attempts=F('attempts') + 1, available_at=now + timedelta(seconds=CLAIM_SECONDS)
+            )
+    for row in rows:
+        row.attempts += 1
+    return rows
+
+
+def _apply_deferred(batch_size):
+    """Apply due deferred task changes (tasks.changes.defer_task_changes); returns ``(applied, failed)``"""
+    from .changes import DEFERRED_GROUP, apply_deferred_changes
+    now = timezone.now()
+    deferred = NotificationOutbox.objects.filter(group=DEFERRED_GROUP, failed_at__isnull=True, available_at__lte=now)
+    try:
+        # Applied and removed in one transaction, so each change counts exactly once
+        with transaction.atomic():
+            rows = list(deferred.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+            apply_deferred_changes([row.payload for row in rows])
+            NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).delete()
+        return len(rows), 0
+    except Exception as e:
+        rows = list(deferred.order_by('id')[:batch_size])
+        for row in rows:
+            row.attempts += 1
+            row.last_error = f"{type(e).__name__}: {e}"
+            row.available_at = now + backoff(row.attempts)
+            if row.attempts >= MAX_ATTEMPTS:
+                row.failed_at = now
+        NotificationOutbox.objects.bulk_update(rows, ['attempts', 'last_error', 'available_at', 'failed_at'])
+        return 0, len(rows)
+
+
+def dispatch_pending(batch_size=100, channel_layer=None):
+    """
+    Apply deferred task changes, then send up to ``batch_size`` due
+    messages. Returns ``(sent, failed)``, counting applied changes as sent.
+    Rows are claimed in a short transaction and sent after it commits, so no
+    row lock is held while the channel layer is slow; concurrent dispatchers
+    skip each other's claims.
+    """
+    channel_layer = channel_layer or get_channel_layer()
+    applied, failed_changes = _apply_deferred(batch_size)
+    # After applying, so deltas queued without a coalescing window go out now
+    now = timezone.now()
+    rows = _claim(batch_size, now)
+    if not rows:
+        return applied, failed_changes
+    if channel_layer is None:
+        errors = dict.fromkeys((row.id for row in rows), 'No channel layer configured')
+    else:
+        errors = async_to_sync(_send_batch)(channel_layer, rows)
+
+    sent = [row for row in rows if row.id not in errors]
+    NotificationOutbox.objects.filter(id__in=[row.id for row in sent]).delete()
+    retry = []
+    for row in rows:
+        if row.id not in errors:
+            continue
+        row.last_error = errors[row.id]
+        row.available_at = now + backoff(row.attempts)
+        if row.attempts >= MAX_ATTEMPTS:
+            row.failed_at = now
+        retry.append(row)
+    if retry:
+        NotificationOutbox.objects.bulk_update(retry, ['last_error', 'available_at', 'failed_at'])
+
+    stats['sent'] += len(sent)
+    stats['failed'] += len(errors)
+    stats['merged_sent'] += sum(row.merged_count for row in sent)
+    if errors and settings.DEBUG:
+        print(f"Error sending {len(errors)} WebSocket notification(s)")
+    return applied + len(sent), failed_changes + len(errors)
+
+
+def outbox_lag(now=None):
+    """
+    Pending/failed counts, events already merged into pending rows, and the
+    age in seconds of the oldest pending message
+    """
+    now = now or timezone.now()
+    pending = NotificationOutbox.objects.filter(failed_at__isnull=True).aggregate(
+        oldest=Min('created_at'), merged=Sum('merged_count')
+    )
+    oldest = pending['oldest']
+    return {
+        'pending': NotificationOutbox.objects.filter(failed_at__isnull=True).count(),
+        'failed': NotificationOutbox.objects.filter(failed_at__isnull=False).count(),
+        'merged_pending': pending['merged'] or 0,
+        'lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
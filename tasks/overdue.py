@@ -0,0 +1,96 @@
+"""
+Periodic sweep that flags tasks which have passed their due date.
+
+Writes keep ``Task.overdue`` current for the row they touch, but a task
+also becomes overdue just by time passing. ``sweep_overdue`` (run by the
+``sweep_overdue`` command) finds those through ``task_due_open_idx``, a
+partial index holding only open tasks that are not yet flagged. Every row it
+returns has crossed its due date since the previous sweep, so no
+last-run marker is needed. Each batch is flagged with one UPDATE, goes
+through tasks.changes like any other write, and each assignee gets one
+notification listing their newly overdue tasks.
+
+Between sweeps the flag trails the clock by up to the sweep interval, which
+also bounds how late Project.overdue_tasks and the overdue deltas are.
+Reads that must be exact (Task.is_overdue, the ``?overdue=`` filter and the
+analytics counts) compare the due dates themselves. A cached or
+conditional (ETag) response of theirs is only invalidated when the sweep
+bumps the version stamps, so it can lag by the same interval.
+"""
+
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .changes import apply_task_changes
+from .models import Task
+from .notifications import enqueue
+
+SWEEP_BATCH_SIZE = 500
+
+
+def candidate_ids(now, limit):
+    """
+    Ids of open, unflagged tasks due before ``now``, earliest first. Spelled
+    with the index predicate's literal statuses, since SQLite cannot match a
+    partial index against bound parameters; without statistics SQLite would
+    also prefer (status, due_date), hence the INDEXED BY.
+    """
+    statuses = ', '.join(f"'{status}'" for status in Task.OPEN_STATUSES)
+    lock = ' FOR UPDATE SKIP LOCKED' if connection.features.has_select_for_update_skip_locked else ''
+    hint = ' INDEXED BY task_due_open_idx' if connection.vendor == 'sqlite' else ''
+    sql = f"""
+        SELECT id FROM {Task._meta.db_table}{hint}
+        WHERE status IN ({statuses}) AND NOT overdue AND due_date < %s
+        ORDER BY due_date
+        LIMIT %s{lock}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [now, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def sweep_batch(now, batch_size=SWEEP_BATCH_SIZE):
+    """Flag up to ``batch_size`` newly overdue tasks; returns how many were flagged"""
+    with transaction.atomic():
+        ids = candidate_ids(now, batch_size)
+        if not ids:
+            return 0
+        before = list(Task.objects.filter(id__in=ids).order_by('id').values(*Task.SNAPSHOT_FIELDS))
+        # A system-side flag: updated_at stays the user's last edit (list filters, rollup day)
+        Task.objects.filter(id__in=ids).update(overdue=True, version=F('version') + 1)
+
+        changes = [(state, dict(state, overdue=True, version=state['version'] + 1)) for state in before]
+        apply_task_changes(changes)
+        notify_overdue([after for _, after in changes])
+    return len(changes)
+
+
+def sweep_overdue(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """Flag every task that is overdue as of ``now``; returns the total flagged"""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        flagged = sweep_batch(now, batch_size)
+        total += flagged
+        if flagged < batch_size:
+            return total
+
+
+def notify_overdue(states):
+    """One ``task_notification`` per assignee covering all their newly overdue tasks"""
+    task_ids = defaultdict(list)
+    for state in states:
+        task_ids[state['assigned_to_id']].append(state['id'])
+
+    enqueue([
+        (f"user_{user_id}", {
+            'type': 'task_notification',
+            'message': f"{len(ids)} of your task(s) became overdue",
+            'task_ids': ids,
+            'action': 'overdue',
+        })
+        for user_id, ids in task_ids.items()
+    ])
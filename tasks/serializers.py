@@ -1,11 +1,20 @@
+import os
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Task, TaskComment, TaskAttachment
+from .models import AttachmentUpload, Task, TaskComment, TaskAttachment
 from accounts.serializers import UserSerializer
 from projects.serializers import ProjectListSerializer
+from taskmanager.fieldsets import SparseFieldsetMixin
+from taskmanager.pagination import OldestFirstPagination
+from .filters import ORDERING_CHOICES
 
 
-class TaskAttachmentSerializer(serializers.ModelSerializer):
+class TaskAttachmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
+    expandable_fields = {'uploaded_by': 'uploaded_by_id'}
     
     class Meta:
         model = TaskAttachment
@@ -13,8 +22,38 @@ class TaskAttachmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'uploaded_by', 'uploaded_at']
 
 
-class TaskCommentSerializer(serializers.ModelSerializer):
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'filename', 'size', 'offset', 'sha256', 'chunk_size', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'updated_at']
+    
+    def get_chunk_size(self, obj):
+        return settings.ATTACHMENT_CHUNK_SIZE
+    
+    def validate_filename(self, value):
+        # Client paths are not trusted; keep the last component only
+        value = os.path.basename(value.replace('\\', '/'))
+        if not value:
+            raise serializers.ValidationError("A file name is required")
+        return value
+    
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Size must be at least one byte")
+        return value
+    
+    def validate_sha256(self, value):
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value.lower())):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value.lower()
+
+
+class TaskCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    expandable_fields = {'user': 'user_id'}
     
     class Meta:
         model = TaskComment
@@ -22,7 +61,7 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     assigned_to = UserSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
     project = ProjectListSerializer(read_only=True)
@@ -36,39 +75,112 @@ class TaskSerializer(serializers.ModelSerializer):
         queryset=Task._meta.get_field('project').related_model.objects.all(),
         source='project'
     )
-    comments = TaskCommentSerializer(many=True, read_only=True)
-    attachments = TaskAttachmentSerializer(many=True, read_only=True)
+    # Only the newest Task.DETAIL_COMMENTS / DETAIL_ATTACHMENTS; comments_next pages back from there
+    comments = TaskCommentSerializer(many=True, read_only=True, source='latest_comments')
+    comments_count = serializers.ReadOnlyField()
+    comments_next = serializers.SerializerMethodField()
+    attachments = TaskAttachmentSerializer(many=True, read_only=True, source='latest_attachments')
+    attachments_count = serializers.ReadOnlyField()
     is_overdue = serializers.ReadOnlyField()
+    expandable_fields = {
+        'assigned_to': 'assigned_to_id', 'created_by': 'created_by_id', 'project': 'project_id',
+        'comments': None, 'attachments': None,
+    }
     
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'description', 'status', 'priority', 'due_date',
             'estimated_hours', 'actual_hours', 'progress', 'project', 'project_id',
-            'assigned_to', 'assigned_to_id', 'created_by', 'comments', 'attachments',
-            'is_overdue', 'created_at', 'updated_at'
+            'assigned_to', 'assigned_to_id', 'created_by', 'comments', 'comments_count',
+            'comments_next', 'attachments', 'attachments_count',
+            'is_overdue', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_by', 'version', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
+    
+    def get_comments_next(self, obj):
+        """Link to the page of comments just before the embedded ones, if there are any"""
+        comments = obj.latest_comments
+        if not comments or len(comments) >= obj.comments_count:
+            return None
+        pagination = OldestFirstPagination()
+        url = reverse('task-comments', kwargs={'task_id': obj.pk})
+        url = f"{url}?{urlencode({pagination.cursor_query_param: pagination.encode_cursor(comments[0], reverse=True)})}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     assigned_to = UserSerializer(read_only=True)
     project = ProjectListSerializer(read_only=True)
     is_overdue = serializers.ReadOnlyField()
+    expandable_fields = {'assigned_to': 'assigned_to_id', 'project': 'project_id'}
     
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'description', 'status', 'priority', 'due_date',
             'estimated_hours', 'actual_hours', 'progress', 'project',
-            'assigned_to', 'is_overdue', 'created_at', 'updated_at'
+            'assigned_to', 'is_overdue', 'version', 'created_at', 'updated_at'
+        ]
+
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    One row of a bulk create/update. Foreign keys are plain ids so a batch
+    can be checked with one query per relation instead of one per row.
+    """
+    id = serializers.IntegerField(required=False)
+    project_id = serializers.IntegerField()
+    assigned_to_id = serializers.IntegerField()
+    
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'description', 'status', 'priority', 'due_date',
+            'estimated_hours', 'actual_hours', 'progress', 'project_id', 'assigned_to_id'
         ]
 
 
+class TaskBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES)
+
+
+class CommaSeparatedListField(serializers.ListField):
+    """A list given as one comma-separated query parameter"""
+    
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [item for item in data.split(',') if item]
+        return super().to_internal_value(data)
+
+
+class TaskFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the task list endpoints; see tasks.filters"""
+    status = CommaSeparatedListField(child=serializers.ChoiceField(choices=Task.STATUS_CHOICES), required=False)
+    priority = CommaSeparatedListField(child=serializers.ChoiceField(choices=Task.PRIORITY_CHOICES), required=False)
+    project = CommaSeparatedListField(child=serializers.IntegerField(min_value=1), required=False)
+    assigned_to = serializers.CharField(required=False)
+    due_after = serializers.DateTimeField(required=False)
+    due_before = serializers.DateTimeField(required=False)
+    overdue = serializers.BooleanField(required=False)
+    updated_since = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, required=False)
+    
+    def validate_assigned_to(self, value):
+        if value == 'me':
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            raise serializers.ValidationError("Must be a user id or 'me'")
+
+
 class TaskCommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskComment
@@ -1,80 +1,111 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from projects.models import Project
+from taskmanager.versions import bump, scoped
 from .models import Task
+from .changes import apply_task_changes
+from .notifications import enqueue
+from .visibility import sync_task_instance, sync_project_visibility
 
 
 @receiver(post_save, sender=Task)
 def task_created_or_updated(sender, instance, created, **kwargs):
     """Signal handler for when a task is created or updated"""
+    before = None if created else getattr(instance, '_loaded_state', None)
+    actor = getattr(instance, '_changed_by', None) or (instance.created_by_id if created else None)
+    apply_task_changes([(before, instance.snapshot())], actor=actor)
+    sync_task_instance(instance)
+    
+    action = "created" if created else "updated"
     if settings.DEBUG:
-        action = "created" if created else "updated"
         print(f"Task {action}: {instance.title}")
         print(f"  - Assigned to: {instance.assigned_to.username}")
         print(f"  - Status: {instance.status}")
         print(f"  - Project: {instance.project.title}")
     
-    # Send WebSocket notification
-    try:
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Notify the assigned user
-            if instance.assigned_to:
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{instance.assigned_to.id}",
-                    {
-                        'type': 'task_notification',
-                        'message': f"Task '{instance.title}' was {action}",
-                        'task_id': instance.id,
-                        'task_title': instance.title,
-                        'status': instance.status,
-                        'action': action
-                    }
-                )
-            
-            # Notify the project creator (if different from assigned user)
-            if instance.project.created_by and instance.project.created_by != instance.assigned_to:
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{instance.project.created_by.id}",
-                    {
-                        'type': 'task_notification',
-                        'message': f"Task '{instance.title}' was {action} in project '{instance.project.title}'",
-                        'task_id': instance.id,
-                        'task_title': instance.title,
-                        'status': instance.status,
-                        'action': action
-                    }
-                )
-    except Exception as e:
-        if settings.DEBUG:
-            print(f"Error sending WebSocket notification: {e}")
+    # Queue WebSocket notifications; they go out once the write commits
+    message = {
+        'type': 'task_notification',
+        'task_id': instance.id,
+        'task_title': instance.title,
+        'status': instance.status,
+        'action': action,
+        'changed_fields': list(Task.NOTIFY_FIELDS) if created else (instance.changed_fields() or []),
+    }
+    messages = []
+    # Notify the assigned user
+    if instance.assigned_to_id:
+        messages.append((f"user_{instance.assigned_to_id}", {
+            **message, 'message': f"Task '{instance.title}' was {action}"
+        }))
+    
+    # Notify the project creator (if different from assigned user)
+    project = instance.project
+    if project.created_by_id and project.created_by_id != instance.assigned_to_id:
+        messages.append((f"user_{project.created_by_id}", {
+            **message, 'message': f"Task '{instance.title}' was {action} in project '{project.title}'"
+        }))
+    enqueue(messages)
 
 
 @receiver(post_delete, sender=Task)
 def task_deleted(sender, instance, **kwargs):
     """Signal handler for when a task is deleted"""
+    before = getattr(instance, '_loaded_state', None) or instance.snapshot()
+    apply_task_changes([(before, None)])
+    
     if settings.DEBUG:
         print(f"Task deleted: {instance.title}")
         print(f"  - Was assigned to: {instance.assigned_to.username}")
     
-    # Send WebSocket notification
-    try:
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Notify the assigned user
-            if instance.assigned_to:
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{instance.assigned_to.id}",
-                    {
-                        'type': 'task_notification',
-                        'message': f"Task '{instance.title}' was deleted",
-                        'task_id': instance.id,
-                        'task_title': instance.title,
-                        'action': 'deleted'
-                    }
-                )
-    except Exception as e:
-        if settings.DEBUG:
-            print(f"Error sending WebSocket notification: {e}")
+    # Notify the assigned user
+    if instance.assigned_to_id:
+        enqueue([(f"user_{instance.assigned_to_id}", {
+            'type': 'task_notification',
+            'message': f"Task '{instance.title}' was deleted",
+            'task_id': instance.id,
+            'task_title': instance.title,
+            'action': 'deleted'
+        })])
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    """Keep task visibility in step when a project changes owner"""
+    if created:
+        return
+    before = getattr(instance, '_loaded_state', None)
+    if before is None or before['created_by_id'] != instance.created_by_id:
+        sync_project_visibility(instance)
+        if before is not None:
+            revoke_project_access([before['created_by_id']], [instance.id])
+            # The project's tasks move from the old owner's lists to the new owner's
+            bump(*scoped('tasks', [before['created_by_id'], instance.created_by_id]))
+
+
+def revoke_project_access(user_ids, project_ids):
+    """Have these users' sockets recheck, and drop, their subscriptions to these project topics"""
+    enqueue([
+        (f"user_{user_id}", {'type': 'project_access_changed', 'project_ids': sorted(project_ids)})
+        for user_id in sorted(user_ids)
+    ])
+
+
+@receiver(m2m_changed, sender=Project.assigned_to.through)
+def project_members_removed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # The cleared side is gone by post_clear
+        related = instance.assigned_projects if reverse else instance.assigned_to
+        instance._cleared_ids = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_ids', set())
+    elif action != 'post_remove':
+        return
+    if not pk_set:
+        return
+    if reverse:
+        revoke_project_access([instance.pk], pk_set)
+    else:
+        revoke_project_access(pk_set, [instance.pk])
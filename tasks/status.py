@@ -0,0 +1,114 @@
+"""
+Single-task status changes for the WebSocket drag-and-drop path.
+
+On PostgreSQL ``set_task_status`` is one ``UPDATE ... FROM ... RETURNING``
+statement: the permission scope, the old values (for the counter/rollup/event
+bookkeeping) and the project creator (for the broadcast) all come back from
+the write itself. Other backends read the scoped row first and then issue a
+conditional UPDATE.
+
+The before/after snapshots built from the returned row go into the outbox in
+the same transaction (tasks.changes.defer_task_changes); the dispatcher
+applies the bookkeeping and sends the deltas, so none of that, nor the
+re-serialized task row, is on the acknowledgement's path.
+"""
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from projects.models import Project
+from taskmanager.versions import bump, scoped
+from .changes import defer_task_changes, task_viewers
+from .models import Task
+
+# Columns the write returns, in order; ``old_*`` are the values before the update
+RETURNED_COLUMNS = (
+    'id', 'title', 'project_id', 'assigned_to_id', 'created_by_id', 'due_date',
+    'estimated_hours', 'actual_hours', 'old_status', 'old_overdue', 'old_updated_at',
+    'overdue', 'version', 'project_created_by_id',
+)
+
+
+def _update_returning(scope, new_status, now):
+    scope_sql, scope_params = scope.values('id').order_by().query.sql_with_params()
+    sql = f"""
+        UPDATE {Task._meta.db_table} AS t
+        SET status = %s,
+            overdue = (%s AND t.due_date IS NOT NULL AND t.due_date < %s),
+            version = t.version + 1,
+            updated_at = %s
+        FROM (
+            -- Locking here makes old.* the committed values this UPDATE replaces
+            SELECT id, status, overdue, updated_at FROM {Task._meta.db_table}
+            WHERE id IN ({scope_sql})
+            FOR UPDATE
+        ) AS old, {Project._meta.db_table} AS p
+        WHERE t.id = old.id AND p.id = t.project_id AND t.status <> %s
+        RETURNING t.id, t.title, t.project_id, t.assigned_to_id, t.created_by_id, t.due_date,
+            t.estimated_hours, t.actual_hours, old.status, old.overdue, old.updated_at,
+            t.overdue, t.version, p.created_by_id
+    """
+    params = [new_status, new_status in Task.OPEN_STATUSES, now, now, *scope_params, new_status]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return dict(zip(RETURNED_COLUMNS, row)) if row else None
+
+
+def _read_then_update(scope, new_status, now):
+    row = scope.exclude(status=new_status).values(
+        'id', 'title', 'project_id', 'assigned_to_id', 'created_by_id', 'due_date',
+        'estimated_hours', 'actual_hours', 'status', 'overdue', 'version', 'updated_at', 'project__created_by_id',
+    ).first()
+    if row is None:
+        return None
+    overdue = bool(new_status in Task.OPEN_STATUSES and row['due_date'] and row['due_date'] < now)
+    updated = Task.objects.filter(id=row['id'], status=row['status']).update(
+        status=new_status, overdue=overdue, version=F('version') + 1, updated_at=now
+    )
+    if not updated:
+        return None
+    row.update(
+        old_status=row.pop('status'), old_overdue=row.pop('overdue'), old_updated_at=row.pop('updated_at'),
+        overdue=overdue, version=row['version'] + 1, project_created_by_id=row.pop('project__created_by_id'),
+    )
+    return row
+
+
+def set_task_status(task_id, new_status, user):
+    """
+    Move one task the user can see to ``new_status``. Returns the broadcast
+    payload, or None when the task is out of scope or already in that status.
+    """
+    now = timezone.now()
+    scope = Task.objects.visible_to(user).filter(id=task_id)
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            row = _update_returning(scope, new_status, now)
+        else:
+            row = _read_then_update(scope, new_status, now)
+        if row is None:
+            return None
+
+        before = {field: row.get(field) for field in Task.SNAPSHOT_FIELDS}
+        before.update(
+            status=row['old_status'], overdue=row['old_overdue'],
+            version=row['version'] - 1, updated_at=row['old_updated_at'],
+        )
+        after = dict(before, status=new_status, overdue=row['overdue'], version=row['version'], updated_at=now)
+        # Counters, rollups, the status event and the deltas are applied by the
+        # outbox dispatcher; the ack only waits for the write and this INSERT
+        defer_task_changes([(before, after)], actor=user)
+        # Only the task lists; the dispatcher bumps the projects with their counters
+        bump(*scoped('tasks', task_viewers([after], {row['project_id']: row['project_created_by_id']})))
+
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'status': new_status,
+        'version': row['version'],
+        'assigned_to_id': row['assigned_to_id'],
+        'project_id': row['project_id'],
+        'project_created_by_id': row['project_created_by_id'],
+    }
@@ -0,0 +1,1368 @@
+from datetime import date, timedelta
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.testing import WebsocketCommunicator
+
+from analytics.rollups import find_rollup_drift
+from chatbot.models import ChatSession
+from projects.models import Project
+from taskmanager import response_cache, versions
+from taskmanager.compiled import CompiledSerializer
+from taskmanager.fieldsets import FieldSelection, parse_paths
+from taskmanager.testing import create_project, create_user
+from .filters import filter_tasks, order_tasks
+from . import notifications, uploads
+from .models import AttachmentUpload, NotificationOutbox, Task, TaskAttachment, TaskComment, TaskStatusEvent
+from .notifications import dispatch_pending, outbox_lag
+from .overdue import candidate_ids, sweep_overdue
+from .serializers import TaskListSerializer
+from .status import set_task_status
+
+
+class TaskListQueryCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+
+    def create_tasks(self, count):
+        # Run the commit hooks so cached responses are invalidated as in production
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                project = create_project(self.manager, f"Project {i}")
+                project.assigned_to.add(self.manager, self.intern)
+                Task.objects.create(
+                    title=f"Task {i}",
+                    project=project,
+                    assigned_to=self.intern,
+                    created_by=self.manager,
+                    status='completed' if i % 2 else 'todo',
+                )
+
+    def count_queries(self, user, url):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_task_list_query_count_is_flat(self):
+        self.create_tasks(1)
+        baseline, _ = self.count_queries(self.manager, '/api/tasks/')
+
+        self.create_tasks(19)
+        queries, response = self.count_queries(self.manager, '/api/tasks/')
+
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(queries, baseline)
+
+    def test_my_tasks_query_count_is_flat(self):
+        self.create_tasks(1)
+        baseline, _ = self.count_queries(self.intern, '/api/tasks/my-tasks/')
+
+        self.create_tasks(19)
+        queries, response = self.count_queries(self.intern, '/api/tasks/my-tasks/')
+
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(queries, baseline)
+
+    def test_sparse_fields_skip_unrequested_relations(self):
+        self.create_tasks(5)
+        full, _ = self.count_queries(self.manager, '/api/tasks/')
+        queries, response = self.count_queries(self.manager, '/api/tasks/?fields=id,title,status')
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status'})
+        # Neither the project prefetch nor its members prefetch runs
+        self.assertEqual(queries, full - 2)
+
+    def test_relations_collapse_to_ids_unless_expanded(self):
+        self.create_tasks(3)
+        task = Task.objects.order_by('-created_at', '-id').first()
+
+        _, response = self.count_queries(self.manager, '/api/tasks/?fields=id,project,assigned_to')
+        row = response.data['results'][0]
+        self.assertEqual(row, {'id': task.id, 'project': task.project_id, 'assigned_to': self.intern.id})
+
+        _, response = self.count_queries(self.intern, '/api/tasks/my-tasks/?fields=id,project.title')
+        self.assertEqual(response.data[0]['project'], {'title': task.project.title})
+
+        baseline, _ = self.count_queries(self.manager, '/api/tasks/?expand=project')
+        self.create_tasks(5)
+        queries, response = self.count_queries(self.manager, '/api/tasks/?expand=project')
+        project = response.data['results'][0]['project']
+        self.assertEqual(project['created_by'], self.manager.id)
+        self.assertEqual(sorted(project['assigned_to']), sorted([self.manager.id, self.intern.id]))
+        self.assertEqual(response.data['results'][0]['assigned_to'], self.intern.id)
+        self.assertEqual(queries, baseline)
+
+    def test_compiled_serializer_renders_identical_json(self):
+        self.create_tasks(3)
+        Task.objects.filter(title='Task 1').update(due_date=timezone.now(), estimated_hours=Decimal('2.50'))
+        Project.objects.filter(title='Project 2').update(budget=Decimal('99.90'))
+        tasks = list(Task.objects.with_list_relations())
+        renderer = JSONRenderer()
+
+        for selection in (None, FieldSelection(parse_paths('id,due_date,project.budget'), {}), FieldSelection()):
+            context = {'selection': selection}
+            self.assertEqual(
+                renderer.render(CompiledSerializer(TaskListSerializer, tasks, many=True, context=context).data),
+                renderer.render(TaskListSerializer(tasks, many=True, context=context).data),
+            )
+
+    def test_unknown_fields_are_rejected(self):
+        self.create_tasks(1)
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/tasks/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+
+class TaskAnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+        self.client.force_authenticate(self.manager)
+
+    def create_tasks(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                Task.objects.create(
+                    title=f"Task {i}", project=self.project, assigned_to=self.intern, created_by=self.manager,
+                    status=('todo', 'in_progress', 'completed')[i % 3], priority=('low', 'high')[i % 2],
+                    due_date=timezone.now() - timedelta(days=1) if i % 3 == 0 else None,
+                )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_scalar_metrics_and_distributions(self):
+        self.create_tasks(6)
+        response, _ = self.get('/api/tasks/analytics/')
+        self.assertEqual(response.data['total_tasks'], 6)
+        self.assertEqual(response.data['completed_tasks'], 2)
+        self.assertEqual(response.data['in_progress_tasks'], 2)
+        self.assertEqual(response.data['overdue_tasks'], 2)
+        self.assertEqual(response.data['completion_rate'], 33.33)
+        self.assertEqual(
+            {row['status']: row['count'] for row in response.data['status_distribution']},
+            {'todo': 2, 'in_progress': 2, 'completed': 2},
+        )
+        self.assertEqual(
+            {row['priority']: row['count'] for row in response.data['priority_distribution']},
+            {'low': 3, 'high': 3},
+        )
+        self.assertEqual(response.data['workload_distribution'], [{'assigned_to__username': 'intern', 'count': 6}])
+
+    def test_include_selects_dimensions(self):
+        self.create_tasks(3)
+        response, _ = self.get('/api/tasks/analytics/?include=priority')
+        self.assertIn('priority_distribution', response.data)
+        for key in ('status_distribution', 'workload_distribution', 'daily_completions', 'time_in_status'):
+            self.assertNotIn(key, response.data)
+        self.assertEqual(response.data['total_tasks'], 3)
+
+    def test_unknown_dimension_is_rejected(self):
+        response = self.client.get('/api/tasks/analytics/?include=status,bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Unknown analytics dimension(s): bogus'})
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        self.create_tasks(3)
+        _, baseline = self.get('/api/tasks/analytics/')
+        self.create_tasks(30)
+        response, queries = self.get('/api/tasks/analytics/')
+        self.assertEqual(response.data['total_tasks'], 33)
+        self.assertEqual(queries, baseline)
+        # Scalars and each selected distribution take a fixed number of grouped queries
+        _, scalars_only = self.get('/api/tasks/analytics/?include=')
+        self.assertLessEqual(scalars_only, 3)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        self.create_tasks(3)
+        first, _ = self.get('/api/tasks/analytics/')
+        second, queries = self.get('/api/tasks/analytics/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(queries, 0)
+
+
+class TaskKeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        project = create_project(self.manager)
+        self.tasks = [
+            Task.objects.create(title=f"Task {i}", project=project, assigned_to=self.manager, created_by=self.manager)
+            for i in range(45)
+        ]
+        # Identical timestamps must still page deterministically on id
+        Task.objects.filter(id__in=[t.id for t in self.tasks[10:30]]).update(created_at=self.tasks[10].created_at)
+        self.client.force_authenticate(self.manager)
+
+    def test_walks_every_task_once_in_both_directions(self):
+        seen, pages = [], []
+        url = '/api/tasks/?cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = self.client.get(pages[-1]['previous'])
+        self.assertEqual(previous.data['results'], pages[1]['results'])
+
+    def test_page_number_pagination_is_still_the_default(self):
+        response = self.client.get('/api/tasks/?page=2')
+        self.assertEqual(response.data['count'], 45)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/tasks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'cursor': ['Invalid cursor']})
+
+
+class TaskVisibilityTests(APITestCase):
+    def setUp(self):
+        self.owner = create_user('owner', 'manager')
+        self.other = create_user('other', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.owner)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.intern
+        )
+
+    def test_manager_scope_follows_project_and_assignment_changes(self):
+        self.assertEqual(list(Task.objects.visible_to(self.owner)), [self.task])
+        self.assertFalse(Task.objects.visible_to(self.other).exists())
+
+        self.task.assigned_to = self.other
+        self.task.save()
+        self.assertEqual(list(Task.objects.visible_to(self.other)), [self.task])
+        self.assertFalse(Task.objects.visible_to(self.intern).exists())
+
+        project = Project.objects.get(pk=self.project.pk)
+        project.created_by = self.intern
+        project.save()
+        self.assertFalse(Task.objects.visible_to(self.owner).exists())
+        self.assertEqual(
+            set(self.task.visibility.values_list('user_id', flat=True)),
+            {self.other.id, self.intern.id},
+        )
+
+    def test_detail_view_uses_shared_scope(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task.id}/').status_code, 404)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task.id}/').status_code, 200)
+
+
+class TaskListFilterTests(APITestCase):
+    def setUp(self):
+        self.admin = create_user('admin', 'admin')
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.projects = [
+            create_project(self.manager, f"Project {i}")
+            for i in range(2)
+        ]
+        now = timezone.now()
+        self.late = Task.objects.create(
+            title='Late', status='in_progress', priority='high', due_date=now - timedelta(days=2),
+            project=self.projects[0], assigned_to=self.intern, created_by=self.manager,
+        )
+        self.done = Task.objects.create(
+            title='Done', status='completed', priority='high', due_date=now - timedelta(days=2),
+            project=self.projects[0], assigned_to=self.intern, created_by=self.manager,
+        )
+        self.upcoming = Task.objects.create(
+            title='Upcoming', priority='low', due_date=now + timedelta(days=5),
+            project=self.projects[1], assigned_to=self.manager, created_by=self.manager,
+        )
+        self.undated = Task.objects.create(
+            title='Undated', project=self.projects[1], assigned_to=self.intern, created_by=self.manager,
+        )
+
+    def ids(self, url, user=None):
+        self.client.force_authenticate(user or self.manager)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [task['id'] for task in results]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('/api/tasks/?overdue=true&priority=high'), [self.late.id])
+        self.assertEqual(
+            self.ids('/api/tasks/?overdue=false'), [self.undated.id, self.upcoming.id, self.done.id]
+        )
+        self.assertEqual(
+            self.ids(f'/api/tasks/?project={self.projects[0].id}&status=todo,completed'), [self.done.id]
+        )
+        self.assertEqual(self.ids('/api/tasks/?assigned_to=me'), [self.upcoming.id])
+        self.assertEqual(self.ids(f'/api/tasks/?assigned_to={self.intern.id}&status=todo'), [self.undated.id])
+        self.assertEqual(
+            self.ids(f'/api/tasks/?due_after={date.today()}&due_before={date.today() + timedelta(days=30)}'),
+            [self.upcoming.id],
+        )
+
+        Task.objects.filter(id=self.done.id).update(updated_at=timezone.now() + timedelta(hours=1))
+        since = (timezone.now() + timedelta(minutes=30)).isoformat()
+        self.assertEqual(self.ids(f'/api/tasks/?{urlencode({"updated_since": since})}'), [self.done.id])
+
+        # Filters narrow the caller's scope, never widen it
+        self.assertEqual(self.ids('/api/tasks/?priority=low', self.intern), [])
+        self.assertEqual(self.ids('/api/tasks/my-tasks/?overdue=true', self.intern), [self.late.id])
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.ids('/api/tasks/?ordering=due_date&status=in_progress,completed,todo&due_after=2000-01-01'),
+            [self.late.id, self.done.id, self.upcoming.id],
+        )
+        self.assertEqual(
+            self.ids('/api/tasks/my-tasks/?ordering=title', self.intern), [self.done.id, self.late.id, self.undated.id]
+        )
+
+    def test_invalid_parameters(self):
+        self.client.force_authenticate(self.manager)
+        for query in ('status=lost', 'project=x', 'assigned_to=someone', 'due_after=soon', 'ordering=password'):
+            response = self.client.get(f'/api/tasks/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+        self.assertEqual(self.client.get('/api/tasks/?cursor=&ordering=title').status_code, 400)
+
+    def assert_uses_index(self, filters, user, ordering=None, plan=None):
+        """
+        ``plan`` is the access the admin query must get on SQLite: ``SEARCH
+        <index>``, or ``SCAN <index>`` when the index supplies the order
+        """
+        queryset = order_tasks(filter_tasks(Task.objects.visible_to(user), filters, user), ordering)
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    # Tiny test tables would otherwise always be scanned
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            explained = queryset.explain()
+        message = f"{filters} as {user.role}:\n{explained}"
+        if connection.vendor != 'sqlite':
+            self.assertNotRegex(explained, r'Seq Scan on tasks_task\b', message)
+        elif plan:
+            access, index = plan.split()
+            self.assertRegex(explained, rf'\b{access} tasks_task USING (?:COVERING )?INDEX {index}\b', message)
+        elif user.is_manager:
+            # Through the TaskVisibility subquery, or a filter's index
+            self.assertRegex(explained, r'\bSEARCH tasks_task USING (?:(?:COVERING )?INDEX|INTEGER PRIMARY KEY)', message)
+        else:
+            self.assertRegex(explained, r'\bSEARCH tasks_task USING (?:COVERING )?INDEX', message)
+
+    def test_filter_combinations_use_indexes(self):
+        now = timezone.now()
+        combinations = [
+            ({'status': ['todo']}, None, 'SEARCH task_status_due_idx'),
+            ({'priority': ['high']}, None, 'SEARCH task_priority_status_idx'),
+            # The foreign keys' own indexes
+            ({'project': [1]}, None, 'SEARCH tasks_task_project_id_[0-9a-f]+'),
+            ({'assigned_to': self.intern.id}, None, 'SEARCH tasks_task_assigned_to_id_[0-9a-f]+'),
+            ({'project': [1], 'status': ['todo']}, None, 'SEARCH task_project_status_idx'),
+            ({'assigned_to': self.intern.id, 'status': ['todo'], 'due_before': now}, None,
+             'SEARCH task_assignee_status_due_idx'),
+            ({'overdue': True}, None, 'SEARCH task_status_due_idx'),
+            ({'overdue': True}, 'due_date', 'SEARCH task_status_due_idx'),
+            # Most tasks match: reading in page order stops after one page
+            ({'overdue': False}, None, 'SCAN task_created_id_idx'),
+            ({'priority': ['high'], 'overdue': True}, None, 'SEARCH task_priority_status_idx'),
+            ({'due_after': now, 'due_before': now + timedelta(days=7)}, None, 'SEARCH task_due_idx'),
+            ({'due_after': now}, 'due_date', 'SEARCH task_due_idx'),
+            ({'due_after': now}, None, 'SEARCH task_due_idx'),
+            ({'due_before': now}, None, 'SEARCH task_due_idx'),
+            ({'updated_since': now}, '-updated_at', 'SEARCH task_updated_id_idx'),
+            ({}, 'title', 'SCAN task_title_id_idx'),
+            ({}, '-title', 'SCAN task_title_id_idx'),
+        ]
+        for filters, ordering, plan in combinations:
+            with self.subTest(filters=filters, ordering=ordering):
+                self.assert_uses_index(filters, self.admin, ordering, plan)
+                self.assert_uses_index(filters, self.manager, ordering)
+                self.assert_uses_index(filters, self.intern, ordering)
+        self.assert_uses_index({'status': ['todo']}, self.intern, plan='SEARCH task_assignee_status_due_idx')
+
+
+class ProjectCounterTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.first = create_project(self.manager, 'First')
+        self.second = create_project(self.manager, 'Second')
+        self.past = timezone.now() - timedelta(days=30)
+
+    def create_task(self, project, **kwargs):
+        return Task.objects.create(
+            title='Task', project=project, assigned_to=self.manager, created_by=self.manager, **kwargs
+        )
+
+    def counters(self, project):
+        project.refresh_from_db()
+        return {field: getattr(project, field) for field in Project.COUNTER_FIELDS}
+
+    def test_counters_follow_status_changes_moves_and_deletes(self):
+        task = self.create_task(self.first, estimated_hours=Decimal('4.5'), actual_hours=Decimal('1'))
+        self.create_task(self.first, status='completed', due_date=self.past)
+        overdue = self.create_task(self.first, due_date=self.past)
+        self.assertEqual(self.counters(self.first), {
+            'total_tasks': 3, 'completed_tasks': 1, 'overdue_tasks': 1,
+            'estimated_hours_total': Decimal('4.5'), 'actual_hours_total': Decimal('1'),
+        })
+
+        task.status = 'completed'
+        task.save()
+        overdue.status = 'completed'
+        overdue.save()
+        self.assertEqual(self.counters(self.first)['completed_tasks'], 3)
+        self.assertEqual(self.counters(self.first)['overdue_tasks'], 0)
+
+        task.project = self.second
+        task.save()
+        self.assertEqual(self.counters(self.first)['total_tasks'], 2)
+        self.assertEqual(self.counters(self.second), {
+            'total_tasks': 1, 'completed_tasks': 1, 'overdue_tasks': 0,
+            'estimated_hours_total': Decimal('4.5'), 'actual_hours_total': Decimal('1'),
+        })
+
+        Task.objects.get(pk=task.pk).delete()
+        self.assertEqual(self.counters(self.second)['total_tasks'], 0)
+        self.assertEqual(self.counters(self.second)['estimated_hours_total'], 0)
+
+    def test_project_save_does_not_clobber_counters(self):
+        stale = Project.objects.get(pk=self.first.pk)
+        self.create_task(self.first)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.counters(self.first)['total_tasks'], 1)
+
+    def test_rebuild_command_reports_and_fixes_drift(self):
+        self.create_task(self.first, status='completed')
+        Project.objects.filter(pk=self.first.pk).update(total_tasks=7)
+
+        out = StringIO()
+        call_command('rebuild_project_counters', '--dry-run', stdout=out)
+        self.assertIn(f"Project {self.first.pk}: total_tasks is 7, expected 1", out.getvalue())
+        self.assertEqual(self.counters(self.first)['total_tasks'], 7)
+
+        call_command('rebuild_project_counters', stdout=StringIO())
+        self.assertEqual(self.counters(self.first)['total_tasks'], 1)
+
+
+class TaskStatusEventTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=project, assigned_to=self.manager, created_by=self.manager
+        )
+        self.client.force_authenticate(self.manager)
+
+    def test_transitions_are_logged_and_later_edits_do_not_move_completion(self):
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'in_progress'})
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'completed'})
+        TaskStatusEvent.objects.update(timestamp=F('timestamp') - timedelta(days=3))
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'title': 'Renamed'})
+
+        events = list(self.task.status_events.order_by('id').values_list('from_status', 'to_status', 'changed_by_id'))
+        self.assertEqual(events, [
+            ('', 'todo', self.manager.id),
+            ('todo', 'in_progress', self.manager.id),
+            ('in_progress', 'completed', self.manager.id),
+        ])
+
+        response = self.client.get('/api/tasks/analytics/?include=daily,time_in_status')
+        self.assertEqual(response.data['daily_completions'], [
+            {'day': timezone.localdate() - timedelta(days=3), 'count': 1}
+        ])
+        self.assertEqual(
+            [row['status'] for row in response.data['time_in_status']],
+            ['in_progress', 'todo'],
+        )
+
+
+class TaskBulkTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.other = create_user('other', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+        self.client.force_authenticate(self.manager)
+
+    def bulk_create(self, count):
+        rows = [
+            {'title': f"Task {i}", 'project_id': self.project.id, 'assigned_to_id': self.intern.id}
+            for i in range(count)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/tasks/bulk/', {'tasks': rows}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['ids'], len(context.captured_queries)
+
+    def test_create_and_status_change_cost_a_flat_number_of_queries(self):
+        _, baseline = self.bulk_create(2)
+        ids, queries = self.bulk_create(50)
+        self.assertEqual(queries, baseline)
+        self.assertTrue(set(ids) <= set(Task.objects.visible_to(self.intern).values_list('id', flat=True)))
+
+        NotificationOutbox.objects.all().delete()
+        response = self.client.post('/api/tasks/bulk/status/', {'ids': ids, 'status': 'completed'}, format='json')
+        self.assertEqual(response.data, {'updated': 50})
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.total_tasks, self.project.completed_tasks), (52, 50))
+        self.assertEqual(TaskStatusEvent.objects.filter(to_status='completed', changed_by=self.manager).count(), 50)
+
+        # One message each for the assignee and the project creator
+        messages = list(NotificationOutbox.objects.filter(payload__type='task_notification'))
+        self.assertEqual({m.group for m in messages}, {f"user_{self.intern.id}", f"user_{self.manager.id}"})
+        self.assertEqual(len(messages[0].payload['task_ids']), 50)
+
+    def test_partial_update_moves_tasks_and_visibility(self):
+        ids, _ = self.bulk_create(3)
+        response = self.client.patch('/api/tasks/bulk/', {'tasks': [
+            {'id': ids[0], 'assigned_to_id': self.other.id, 'due_date': '2020-01-01T00:00:00Z'},
+            {'id': ids[1], 'status': 'review'},
+        ]}, format='json')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(list(Task.objects.visible_to(self.other).values_list('id', flat=True)), [ids[0]])
+        self.assertEqual(Task.objects.get(id=ids[1]).status, 'review')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.overdue_tasks, 1)
+
+    def test_whole_batch_is_rejected_when_any_task_is_out_of_scope(self):
+        ids, _ = self.bulk_create(2)
+        self.client.force_authenticate(self.other)
+        response = self.client.post('/api/tasks/bulk/status/', {'ids': ids, 'status': 'completed'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Task.objects.filter(status='completed').exists())
+
+        response = self.client.post('/api/tasks/bulk/', {'tasks': [
+            {'title': 'Task', 'project_id': self.project.id, 'assigned_to_id': self.other.id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BrokenChannelLayer:
+    async def group_send(self, group, message):
+        raise ConnectionError('channel layer is down')
+
+
+class NotificationOutboxTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+
+    def create_task(self):
+        return Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.manager
+        )
+
+    def notifications(self, **filters):
+        return NotificationOutbox.objects.filter(payload__type='task_notification', **filters)
+
+    def test_rolled_back_writes_do_not_notify(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.create_task()
+                raise RuntimeError
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_failed_bookkeeping_rolls_back_the_write(self):
+        task = self.create_task()
+        with mock.patch('tasks.changes.enqueue', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_task()
+            task.status = 'completed'
+            with self.assertRaises(RuntimeError):
+                task.save()
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(Task.objects.get().status, 'todo')
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.total_tasks, self.project.completed_tasks), (1, 0))
+        self.assertEqual(TaskStatusEvent.objects.count(), 1)
+        self.assertEqual(find_rollup_drift('task'), [])
+
+    def test_dispatcher_delivers_and_retries(self):
+        self.create_task()
+        NotificationOutbox.objects.filter(payload__type='task_delta').delete()
+        self.assertEqual(outbox_lag()['pending'], 2)
+        # Still inside the coalescing window
+        self.assertEqual(dispatch_pending(channel_layer=InMemoryChannelLayer()), (0, 0))
+
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        self.assertEqual(dispatch_pending(channel_layer=BrokenChannelLayer()), (0, 2))
+        row = NotificationOutbox.objects.first()
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('ConnectionError', row.last_error)
+        # Backed off, so nothing is due yet
+        self.assertEqual(dispatch_pending(channel_layer=InMemoryChannelLayer()), (0, 0))
+
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        layer = InMemoryChannelLayer()
+        async_to_sync(layer.group_add)(f"user_{self.intern.id}", 'intern-channel')
+        self.assertEqual(dispatch_pending(channel_layer=layer), (2, 0))
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+        message = async_to_sync(layer.receive)('intern-channel')
+        self.assertEqual(message['action'], 'created')
+
+    def test_changes_to_one_task_merge_per_recipient(self):
+        task = self.create_task()
+        task = Task.objects.get(pk=task.pk)
+        task.title = 'Renamed'
+        task.save()
+        task.status = 'review'
+        task.save()
+
+        row = self.notifications().get(group=f"user_{self.intern.id}")
+        self.assertEqual(row.merged_count, 2)
+        self.assertEqual(row.payload['action'], 'created')
+        self.assertEqual(row.payload['status'], 'review')
+        self.assertEqual(row.payload['task_title'], 'Renamed')
+        # Two merges per notification (intern, manager) and per delta (intern, manager, admins, project topic)
+        self.assertEqual(outbox_lag()['merged_pending'], 12)
+
+        other = self.create_task()
+        Task.objects.get(pk=other.pk).delete()
+        self.assertEqual(
+            self.notifications().get(group=f"user_{self.intern.id}", coalesce_key=f"task_notification:{other.pk}").payload['action'],
+            'deleted'
+        )
+
+    def test_changed_fields_are_unioned(self):
+        task = self.create_task()
+        NotificationOutbox.objects.all().delete()
+        task = Task.objects.get(pk=task.pk)
+        task.title = 'Renamed'
+        task.save()
+        task.priority = 'high'
+        task.save()
+        row = self.notifications().get(group=f"user_{self.intern.id}")
+        self.assertEqual(row.payload['changed_fields'], ['priority', 'title'])
+        self.assertEqual(row.payload['action'], 'updated')
+
+    def test_commits_wake_a_single_dispatcher_thread(self):
+        drained = threading.Event()
+        with mock.patch('tasks.notifications._drain', side_effect=lambda: drained.set()):
+            for _ in range(5):
+                notifications.dispatch_in_background()
+            self.assertTrue(drained.wait(5))
+        dispatchers = [thread for thread in threading.enumerate() if thread.name == 'outbox-dispatcher']
+        self.assertEqual(len(dispatchers), 1)
+
+    def test_rows_are_claimed_before_sending(self):
+        self.create_task()
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        claims = []
+
+        class RecordingLayer(InMemoryChannelLayer):
+            async def group_send(self, group, message):
+                # The claim (counted attempt) is written before anything is sent
+                claims.append(await database_sync_to_async(
+                    lambda: NotificationOutbox.objects.filter(attempts=1).count()
+                )())
+
+        sent, _ = dispatch_pending(channel_layer=RecordingLayer())
+        self.assertEqual(sent, len(claims))
+        self.assertEqual(set(claims), {sent})
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATION_COALESCE_SECONDS=0)
+    def test_zero_window_disables_coalescing(self):
+        task = self.create_task()
+        task.status = 'review'
+        task.save()
+        self.assertEqual(self.notifications(group=f"user_{self.intern.id}").count(), 2)
+        queued = NotificationOutbox.objects.count()
+        self.assertEqual(dispatch_pending(channel_layer=InMemoryChannelLayer()), (queued, 0))
+
+
+class TaskStatusFastPathTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.outsider = create_user('outsider', 'intern')
+        self.project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.manager,
+            due_date=timezone.now() - timedelta(days=1),
+        )
+
+    def test_scoped_update_keeps_bookkeeping_in_step(self):
+        self.assertIsNone(set_task_status(self.task.id, 'completed', self.outsider))
+
+        NotificationOutbox.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            data = set_task_status(self.task.id, 'completed', self.intern)
+        # The scoped read, the UPDATE and one outbox INSERT (plus the savepoint)
+        self.assertEqual(
+            [q['sql'].split()[0] for q in queries.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))],
+            ['SELECT', 'UPDATE', 'INSERT'],
+        )
+        self.assertEqual(data['project_created_by_id'], self.manager.id)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.overdue), ('completed', False))
+
+        # The bookkeeping follows once the dispatcher has applied the deferred change
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.completed_tasks, self.project.overdue_tasks), (0, 1))
+        dispatch_pending(channel_layer=InMemoryChannelLayer())
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.completed_tasks, self.project.overdue_tasks), (1, 0))
+        self.assertTrue(self.task.status_events.filter(from_status='todo', changed_by=self.intern).exists())
+        self.assertEqual(find_rollup_drift('task'), [])
+        self.assertTrue(NotificationOutbox.objects.filter(payload__type='task_delta').exists())
+
+        # Already there: nothing to write
+        self.assertIsNone(set_task_status(self.task.id, 'completed', self.intern))
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    NOTIFICATION_COALESCE_SECONDS=0, NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT=False,
+)
+class TaskConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.manager, created_by=self.manager
+        )
+        NotificationOutbox.objects.all().delete()
+
+    async def connect(self, user):
+        from taskmanager.asgi import application
+        token = AccessToken.for_user(user)
+        communicator = WebsocketCommunicator(application, f"/ws/tasks/?token={token}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def exchange(self, *messages):
+        communicator = await self.connect(self.manager)
+        for message in messages:
+            await communicator.send_json_to(message)
+        received = []
+        while not await communicator.receive_nothing(timeout=0.2):
+            received.append(await communicator.receive_json_from())
+        await database_sync_to_async(dispatch_pending)()
+        while not await communicator.receive_nothing(timeout=0.2):
+            received.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        replies = [m for m in received if m['type'] == 'task_update_ack']
+        return replies, [m for m in received if m['type'] != 'task_update_ack']
+
+    def test_update_is_acknowledged_and_broadcast_once(self):
+        replies, broadcasts = async_to_sync(self.exchange)(
+            {'type': 'task_update', 'task_id': self.task.id, 'status': 'review', 'request_id': 'r1'},
+            {'type': 'task_update', 'task_id': self.task.id + 1, 'status': 'review', 'request_id': 'r2'},
+        )
+        self.assertEqual(replies[0]['type'], 'task_update_ack')
+        self.assertEqual((replies[0]['request_id'], replies[0]['ok'], replies[0]['changed']), ('r1', True, True))
+        self.assertEqual((replies[1]['request_id'], replies[1]['ok']), ('r2', False))
+
+        # Assignee and project creator are the same user: one delta, no topic subscribers
+        self.assertEqual([b['type'] for b in broadcasts], ['task_delta'])
+        self.assertEqual([delta['task']['status'] for delta in broadcasts[0]['deltas']], ['review'])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, 'review')
+
+    async def subscribe_and_listen(self, member, outsider):
+        listener = await self.connect(member)
+        await listener.send_json_to({'type': 'subscribe', 'project_id': self.project.id})
+        self.assertEqual((await listener.receive_json_from())['type'], 'subscribed')
+
+        stranger = await self.connect(outsider)
+        await stranger.send_json_to({'type': 'subscribe', 'project_id': self.project.id})
+        self.assertEqual((await stranger.receive_json_from())['type'], 'error')
+
+        _, broadcasts = await self.exchange(
+            {'type': 'task_update', 'task_id': self.task.id, 'status': 'review', 'request_id': 'r1'},
+        )
+        received = await listener.receive_json_from()
+        self.assertTrue(await stranger.receive_nothing(timeout=0.2))
+        await listener.disconnect()
+        await stranger.disconnect()
+        return received
+
+    def test_project_members_receive_topic_events(self):
+        member = create_user('member', 'intern')
+        outsider = create_user('outsider', 'intern')
+        self.project.assigned_to.add(member)
+
+        received = async_to_sync(self.subscribe_and_listen)(member, outsider)
+        self.assertEqual((received['type'], received['deltas'][0]['task_id']), ('task_delta', self.task.id))
+        # The task is not the member's to see: counters only, no row
+        self.assertNotIn('task', received['deltas'][0])
+
+    async def listen_through_removal(self, member):
+        listener = await self.connect(member)
+        await listener.send_json_to({'type': 'subscribe', 'project_id': self.project.id})
+        self.assertEqual((await listener.receive_json_from())['type'], 'subscribed')
+
+        await database_sync_to_async(self.project.assigned_to.remove)(member)
+        await database_sync_to_async(dispatch_pending)()
+        revoked = await listener.receive_json_from()
+
+        await self.exchange(
+            {'type': 'task_update', 'task_id': self.task.id, 'status': 'review', 'request_id': 'r1'},
+        )
+        self.assertTrue(await listener.receive_nothing(timeout=0.2))
+        await listener.disconnect()
+        return revoked
+
+    def test_removed_members_lose_their_topic_subscription(self):
+        member = create_user('member', 'intern')
+        self.project.assigned_to.add(member)
+        NotificationOutbox.objects.all().delete()
+
+        revoked = async_to_sync(self.listen_through_removal)(member)
+        self.assertEqual(
+            (revoked['type'], revoked['project_id'], revoked['reason']),
+            ('unsubscribed', self.project.id, 'access_revoked'),
+        )
+
+
+
+class BenchWebsocketsTests(TransactionTestCase):
+    def test_small_run_reports_fanout_without_acks(self):
+        from .management.commands.bench_websockets import Command
+        command = Command()
+        options = vars(command.create_parser('manage.py', 'bench_websockets').parse_args([
+            '--connections', '6', '--users', '6', '--projects', '2', '--tasks-per-project', '2',
+            '--operations', '6', '--status-ratio', '1', '--subscribe', '--settle-ms', '20',
+        ]))
+        report = command.benchmark(options)
+
+        self.assertEqual((report['connect']['opened'], report['connect']['failed']), (6, 0))
+        fanout = report['fanout']
+        self.assertEqual(fanout['messages'], sum(kind['messages'] for kind in fanout['by_operation'].values()))
+        self.assertGreater(fanout['acks'], 0)
+        self.assertGreater(fanout['by_operation']['status']['messages'], 0)
+        self.assertEqual(fanout['latency']['samples'], fanout['messages'])
+
+class TaskDeltaTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.other = create_user('other', 'intern')
+        self.project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.manager
+        )
+
+    def deltas(self, group):
+        row = NotificationOutbox.objects.get(payload__type='task_delta', group=group)
+        return row.payload['deltas']
+
+    def test_reassignment_sends_upserts_deletes_and_analytics(self):
+        NotificationOutbox.objects.all().delete()
+        task = Task.objects.get(pk=self.task.pk)
+        task.assigned_to = self.other
+        task.status = 'completed'
+        task.save()
+
+        [gone] = self.deltas(f"user_{self.intern.id}")
+        self.assertEqual((gone['op'], gone['version']), ('delete', 2))
+        self.assertEqual(gone['analytics'], {'total_tasks': -1, 'status_distribution': {'todo': -1}})
+
+        [new] = self.deltas(f"user_{self.other.id}")
+        self.assertEqual((new['op'], new['task']['status'], new['task']['version']), ('upsert', 'completed', 2))
+        self.assertEqual(new['analytics']['completed_tasks'], 1)
+
+        [moved] = self.deltas(f"user_{self.manager.id}")
+        self.assertEqual(moved['analytics'], {
+            'completed_tasks': 1, 'status_distribution': {'todo': -1, 'completed': 1},
+        })
+        self.assertEqual(moved['projects'], [{
+            'id': self.project.id, 'total_tasks': 1, 'completed_tasks': 1,
+            'overdue_tasks': 0, 'completion_percentage': 100.0,
+        }])
+
+    def test_coalesced_deltas_sum_their_analytics(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.status = 'in_progress'
+        task.save()
+        task.delete()
+        [delta] = self.deltas('role_admin')
+        self.assertEqual(delta['op'], 'delete')
+        self.assertEqual(delta['analytics'], {})
+
+    def test_project_topics_get_one_delta_per_change(self):
+        second = create_project(self.manager, 'Second')
+        NotificationOutbox.objects.all().delete()
+        task = Task.objects.get(pk=self.task.pk)
+        task.project = second
+        task.save()
+
+        [left] = self.deltas(f"project_{self.project.id}")
+        [joined] = self.deltas(f"project_{second.id}")
+        self.assertEqual((left['op'], joined['op']), ('delete', 'upsert'))
+        self.assertEqual(joined['projects'][0]['total_tasks'], 1)
+        # Topic members may not see the task itself
+        self.assertNotIn('task', joined)
+
+    def test_membership_removal_revokes_topic_access(self):
+        self.project.assigned_to.add(self.intern, self.other)
+        NotificationOutbox.objects.all().delete()
+        self.project.assigned_to.remove(self.other)
+        self.intern.assigned_projects.clear()
+
+        revoked = {
+            row.group: row.payload['project_ids']
+            for row in NotificationOutbox.objects.filter(payload__type='project_access_changed')
+        }
+        self.assertEqual(revoked, {f"user_{self.other.id}": [self.project.id], f"user_{self.intern.id}": [self.project.id]})
+
+
+class OverdueSweepTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+        now = timezone.now()
+        self.soon = [
+            self.create_task(due_date=now + timedelta(hours=hours), assigned_to=assignee)
+            for hours, assignee in ((1, self.intern), (2, self.intern), (3, self.manager))
+        ]
+        self.finished = self.create_task(due_date=now + timedelta(hours=1), status='completed')
+        self.later = self.create_task(due_date=now + timedelta(days=3))
+        self.tomorrow = now + timedelta(days=1)
+        NotificationOutbox.objects.all().delete()
+
+    def create_task(self, **fields):
+        fields.setdefault('assigned_to', self.intern)
+        return Task.objects.create(title='Task', project=self.project, created_by=self.manager, **fields)
+
+    def test_flags_crossed_tasks_once_and_notifies_each_assignee(self):
+        last_edits = dict(Task.objects.values_list('id', 'updated_at'))
+        self.assertEqual(sweep_overdue(self.tomorrow, batch_size=2), 3)
+        flagged = Task.objects.filter(overdue=True)
+        self.assertEqual({task.id for task in flagged}, {task.id for task in self.soon})
+        self.assertEqual({task.version for task in flagged}, {2})
+        # Flagging is not an edit
+        self.assertEqual(dict(Task.objects.values_list('id', 'updated_at')), last_edits)
+        self.assertEqual(find_rollup_drift('task'), [])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.overdue_tasks, 3)
+
+        notices = {
+            row.group: row.payload for row in NotificationOutbox.objects.filter(payload__type='task_notification')
+        }
+        self.assertEqual(set(notices), {f"user_{self.intern.id}", f"user_{self.manager.id}"})
+        self.assertEqual(sorted(notices[f"user_{self.intern.id}"]['task_ids']), [self.soon[0].id, self.soon[1].id])
+        self.assertTrue(NotificationOutbox.objects.filter(payload__type='task_delta').exists())
+
+        self.assertEqual(sweep_overdue(self.tomorrow), 0)
+
+        self.client.force_authenticate(self.manager)
+        self.assertTrue(self.client.get(f'/api/tasks/{self.soon[0].id}/').data['is_overdue'])
+        # Counts compare the due dates with the real clock, which has not reached them
+        self.assertEqual(self.client.get('/api/tasks/analytics/').data['overdue_tasks'], 0)
+
+    def test_reads_do_not_wait_for_the_sweep(self):
+        # Crossed its due date since the last sweep
+        Task.objects.filter(id=self.soon[0].id).update(due_date=timezone.now() - timedelta(minutes=5))
+        self.assertFalse(Task.objects.filter(overdue=True).exists())
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.get('/api/tasks/?overdue=true')
+        self.assertEqual([task['id'] for task in response.data['results']], [self.soon[0].id])
+        self.assertTrue(response.data['results'][0]['is_overdue'])
+        response = self.client.get('/api/tasks/?overdue=false')
+        self.assertNotIn(self.soon[0].id, [task['id'] for task in response.data['results']])
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(self.client.get('/api/tasks/analytics/').data['overdue_tasks'], 1)
+
+    def test_candidates_come_from_the_partial_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            candidate_ids(self.tomorrow, 10)
+        sql = queries.captured_queries[0]['sql']
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f"EXPLAIN {'QUERY PLAN ' if connection.vendor == 'sqlite' else ''}{sql}")
+                plan = str(cursor.fetchall())
+        self.assertIn('task_due_open_idx', plan)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('sweep_overdue', '--once', stdout=out)
+        self.assertIn('Flagged 0 overdue task(s) in total', out.getvalue())
+
+
+@override_settings(NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT=False)
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = create_user('manager', 'manager')
+        self.intern = create_user('intern', 'intern')
+        self.project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=self.project, assigned_to=self.intern, created_by=self.manager,
+        )
+
+    def get(self, url, user=None, **headers):
+        self.client.force_authenticate(user or self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        return response, len(queries)
+
+    def test_unchanged_data_is_not_rebuilt(self):
+        for url in ('/api/tasks/', '/api/projects/', '/api/tasks/analytics/', '/api/projects/analytics/'):
+            response, _ = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+
+            response, queries = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(queries, 0)
+
+            # Second-resolution dates could hide a write made in the same second
+            self.assertNotIn('Last-Modified', response)
+            response, _ = self.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_writes_and_other_users_change_the_etag(self):
+        etag = self.get('/api/tasks/')[0]['ETag']
+        self.assertNotEqual(self.get('/api/tasks/', self.intern)[0]['ETag'], etag)
+        self.assertEqual(self.get('/api/tasks/?status=todo', HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = 'in_progress'
+            self.task.save()
+        response, _ = self.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], 'in_progress')
+
+        etag = self.get('/api/projects/')[0]['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.assigned_to.add(self.intern)
+        self.assertEqual(self.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+
+@override_settings(RESPONSE_CACHE_TTL=60, NOTIFICATION_OUTBOX_DISPATCH_ON_COMMIT=False)
+class ResponseCacheTests(ConditionalGetTests):
+    def setUp(self):
+        super().setUp()
+        response_cache.stats.clear()
+        versions.bumps.clear()
+
+    def test_hits_skip_the_database(self):
+        for url in ('/api/tasks/', '/api/projects/', '/api/auth/users/', '/api/chatbot/stats/'):
+            first, _ = self.get(url)
+            second, queries = self.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(queries, 0, url)
+        self.assertEqual(response_cache.cache_stats()['hits'], 4)
+        self.assertEqual(response_cache.cache_stats()['misses'], 4)
+
+    def test_entries_are_per_user_and_follow_writes(self):
+        self.assertEqual(len(self.get('/api/auth/users/')[0].data['results']), 2)
+        self.assertEqual(len(self.get('/api/auth/users/', self.intern)[0].data['results']), 1)
+
+        self.assertEqual(self.get('/api/tasks/analytics/')[0].data['total_tasks'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='New', project=self.project, assigned_to=self.intern, created_by=self.manager)
+        self.assertEqual(self.get('/api/tasks/analytics/')[0].data['total_tasks'], 2)
+
+        self.assertEqual(self.get('/api/chatbot/stats/')[0].data['total_sessions'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatSession.objects.create(user=self.manager, title='Chat')
+        self.assertEqual(self.get('/api/chatbot/stats/')[0].data['total_sessions'], 1)
+
+        stats = response_cache.cache_stats()
+        self.assertEqual(stats['hits'], 0)
+        self.assertGreaterEqual(stats['invalidations_by_namespace']['tasks'], 1)
+        self.assertEqual(stats['invalidations_by_namespace']['chat'], 1)
+
+    def test_writes_only_evict_the_users_who_can_see_them(self):
+        other = create_user('other', 'manager')
+        project_a = create_project(other, 'A')
+        task_a = Task.objects.create(title='Task A', project=project_a, assigned_to=other, created_by=other)
+        url = f'/api/tasks/?project={self.project.id}'
+        first, _ = self.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task_a.status = 'in_progress'
+            task_a.save()
+            Task.objects.create(title='Another', project=project_a, assigned_to=other, created_by=other)
+        second, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.cache_stats()['hits'], 1)
+
+        # The admins see every project
+        admin = create_user('admin', 'admin')
+        etag = self.get('/api/tasks/', admin)[0]['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            task_a.status = 'done'
+            task_a.save()
+        self.assertEqual(self.get('/api/tasks/', admin, HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+    def test_logins_do_not_evict_anything(self):
+        etag = self.get('/api/tasks/')[0]['ETag']
+        users = self.get('/api/auth/users/')[0].data
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(username='intern', password='pass12345'))
+        self.assertEqual(self.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        self.assertEqual(self.get('/api/auth/users/')[0].data, users)
+        self.assertEqual(response_cache.cache_stats()['invalidations'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.intern.first_name = 'Renamed'
+            self.intern.save()
+        self.assertEqual(self.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:1/1',
+    }})
+    def test_cache_outage_does_not_fail_requests(self):
+        self.client.force_authenticate(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'in_progress'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response, _ = self.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.data['results'][0]['status'], 'in_progress')
+        self.assertEqual(response_cache.cache_stats()['invalidations'], 0)
+
+
+class TaskDetailCommentsTests(APITestCase):
+    def setUp(self):
+        self.manager = create_user('manager', 'manager')
+        project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=project, assigned_to=self.manager, created_by=self.manager,
+        )
+        self.client.force_authenticate(self.manager)
+
+    def add_comments(self, count):
+        users = [
+            create_user(f'commenter{TaskComment.objects.count() + i}')
+            for i in range(count)
+        ]
+        start = timezone.now()
+        comments = TaskComment.objects.bulk_create([
+            TaskComment(task=self.task, user=user, content=f'Comment {i}') for i, user in enumerate(users)
+        ])
+        # Distinct, increasing timestamps (auto_now_add cannot be set on create)
+        for i, comment in enumerate(comments):
+            TaskComment.objects.filter(pk=comment.pk).update(created_at=start + timedelta(seconds=i))
+        TaskAttachment.objects.create(task=self.task, file='task_attachments/a.pdf', filename='a.pdf', uploaded_by=users[0])
+
+    def get_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_embeds_only_the_newest_comments(self):
+        self.add_comments(Task.DETAIL_COMMENTS + 5)
+        response, _ = self.get_detail()
+        ordered = list(TaskComment.objects.filter(task=self.task).order_by('created_at', 'id').values_list('id', flat=True))
+
+        self.assertEqual([comment['id'] for comment in response.data['comments']], ordered[5:])
+        self.assertEqual(response.data['comments_count'], Task.DETAIL_COMMENTS + 5)
+        self.assertEqual(response.data['attachments_count'], 1)
+        self.assertEqual(len(response.data['attachments']), 1)
+
+        older = self.client.get(response.data['comments_next'])
+        self.assertEqual([comment['id'] for comment in older.data['results']], ordered[:5])
+        self.assertIsNone(older.data['previous'])
+
+        response = self.client.patch(f'/api/tasks/{self.task.id}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['comments']), Task.DETAIL_COMMENTS)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_comments(3)
+        response, baseline = self.get_detail()
+        self.assertIsNone(response.data['comments_next'])
+
+        self.add_comments(Task.DETAIL_COMMENTS * 3)
+        response, queries = self.get_detail()
+        self.assertEqual(len(response.data['comments']), Task.DETAIL_COMMENTS)
+        self.assertEqual(queries, baseline)
+
+
+class AttachmentUploadTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media, ATTACHMENT_UPLOAD_DIR=os.path.join(self.media, 'parts'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.manager = create_user('manager', 'manager')
+        self.other = create_user('other', 'manager')
+        project = create_project(self.manager)
+        self.task = Task.objects.create(
+            title='Task', project=project, assigned_to=self.manager, created_by=self.manager,
+        )
+        self.content = os.urandom(300 * 1024)
+        self.client.force_authenticate(self.manager)
+
+    def start(self, **extra):
+        data = {'filename': 'docs/report.bin', 'size': len(self.content), **extra}
+        response = self.client.post(f'/api/tasks/{self.task.id}/attachments/uploads/', data)
+        self.assertEqual(response.status_code, 201)
+        return f"/api/tasks/{self.task.id}/attachments/uploads/{response.data['id']}/"
+
+    def put(self, url, start, end):
+        return self.client.put(
+            url, data=self.content[start:end], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.content)}',
+        )
+
+    def test_chunked_upload_resumes_and_completes(self):
+        digest = hashlib.sha256(self.content).hexdigest()
+        url = self.start(sha256=digest)
+
+        self.assertEqual(self.put(url, 0, 100 * 1024).data['offset'], 100 * 1024)
+        # A chunk that does not start at the offset is refused with the offset to resume from
+        response = self.put(url, 200 * 1024, len(self.content))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 100 * 1024)
+
+        # Resuming in another process: the running hash is rebuilt from the part file
+        uploads._hashes.clear()
+        self.assertEqual(self.client.get(url).data['offset'], 100 * 1024)
+        self.assertEqual(self.put(url, 100 * 1024, len(self.content)).status_code, 200)
+
+        response = self.client.post(f'{url}complete/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['sha256'], digest)
+        self.assertEqual(response.data['filename'], 'report.bin')
+
+        attachment = TaskAttachment.objects.get(task=self.task)
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'parts')), [])
+
+        listed = self.client.get(f'/api/tasks/{self.task.id}/attachments/')
+        self.assertEqual([item['id'] for item in listed.data['results']], [attachment.id])
+
+    def test_short_chunk_keeps_what_arrived(self):
+        url = self.start()
+        upload = AttachmentUpload.objects.get()
+        stream = StringIO()  # Ends immediately, like a dropped connection
+        with self.assertRaises(uploads.UploadError) as raised:
+            uploads.write_chunk(upload.pk, stream, 0, 10)
+        self.assertEqual(raised.exception.offset, 0)
+
+        self.put(url, 0, 1000)
+        response = self.client.post(f'{url}complete/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 1000)
+
+    def test_concurrent_chunks_are_refused(self):
+        url = self.start()
+        upload = AttachmentUpload.objects.get()
+        # Another request is still streaming a chunk into the part file
+        with uploads._locked_part(upload):
+            response = self.put(url, 0, 1000)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 0)
+
+        class Stream:
+            def read(self, size):
+                # The upload is removed while the bytes arrive
+                AttachmentUpload.objects.filter(pk=upload.pk).delete()
+                return b'x' * size
+
+        with self.assertRaises(uploads.UploadError) as raised:
+            uploads.write_chunk(upload.pk, Stream(), 0, 10)
+        self.assertEqual(raised.exception.status, 409)
+
+    def test_double_complete_and_purged_uploads_are_not_found(self):
+        url = self.start()
+        upload = AttachmentUpload.objects.get()
+        self.put(url, 0, len(self.content))
+        self.assertEqual(self.client.post(f'{url}complete/').status_code, 201)
+        self.assertEqual(self.client.post(f'{url}complete/').status_code, 404)
+        # A request that looked the upload up before the first completion
+        for call in (
+            lambda: uploads.complete_upload(upload.pk),
+            lambda: uploads.write_chunk(upload.pk, StringIO(), 0, 10),
+        ):
+            with self.assertRaises(uploads.UploadError) as raised:
+                call()
+            self.assertEqual(raised.exception.status, 404)
+
+        # The part file purged while the row is still being read
+        url = self.start()
+        upload = AttachmentUpload.objects.get()
+        os.remove(uploads.part_path(upload))
+        for call in (
+            lambda: uploads.complete_upload(upload.pk),
+            lambda: uploads.write_chunk(upload.pk, StringIO(), 0, 10),
+        ):
+            with self.assertRaises(uploads.UploadError) as raised:
+                call()
+            self.assertEqual(raised.exception.status, 404)
+        self.assertEqual(TaskAttachment.objects.count(), 1)
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        url = self.start(sha256='0' * 64)
+        self.put(url, 0, len(self.content))
+        response = self.client.post(f'{url}complete/')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertFalse(TaskAttachment.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'parts')), [])
+
+    def test_uploads_are_private_and_bounded(self):
+        url = self.start()
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_authenticate(self.manager)
+        with override_settings(ATTACHMENT_MAX_SIZE=10):
+            response = self.client.post(
+                f'/api/tasks/{self.task.id}/attachments/uploads/', {'filename': 'big.bin', 'size': 11}
+            )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.put(url, 0, 10).status_code, 200)
+        response = self.client.put(url, data=b'x', content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-0/1')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,266 @@
+"""
+Resumable, chunked attachment uploads.
+
+A client creates an upload (filename, size, optionally the expected
+SHA-256), PUTs the file in chunks and then completes it. Each chunk carries
+``Content-Range: bytes <start>-<end>/<size>`` and must start at the
+upload's current offset; after an interruption the client reads the offset
+back and continues from there, keeping whatever already arrived.
+
+Chunks are streamed from the request into one part file per upload in
+READ_SIZE pieces, so memory stays flat whatever the chunk size, and fed to a
+running SHA-256 as they arrive. Completion hands the part file and its
+digest to the blob storage as a temporary file: it is moved into place
+rather than copied, or dropped if the same contents are already stored, so
+the bytes are never read back.
+
+A chunk is written under an exclusive lock on the part file, outside any
+transaction; only moving the offset touches the database. The running hash
+is kept in process memory keyed by (upload, offset). A chunk that lands on
+another process, or arrives after a restart, rebuilds it from the part file
+once. A request that finds the upload gone (completed by a concurrent
+request, abandoned or purged) gets a 404 rather than an error.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttachmentUpload, TaskAttachment
+
+READ_SIZE = 64 * 1024
+
+# Running hashes kept per process; older ones are rebuilt on demand
+MAX_CACHED_HASHES = 256
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+_hashes = OrderedDict()
+_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Rejected upload request; ``offset`` is where the client should resume"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.offset = offset
+
+
+class PartFile(File):
+    """
+    An open part file that storages treat as a temporary upload, so it is
+    moved rather than copied; ``sha256`` spares blobs.storage hashing it again.
+    """
+
+    def __init__(self, file, path, sha256):
+        super().__init__(file, name=os.path.basename(path))
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def _gone():
+    # Completed, abandoned or purged by another request
+    return UploadError('This upload no longer exists', status=404)
+
+
+def part_path(upload):
+    return os.path.join(settings.ATTACHMENT_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def _remove_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def create_upload(task, user, filename, size, sha256=''):
+    if size > settings.ATTACHMENT_MAX_SIZE:
+        raise UploadError(f"Files may be at most {settings.ATTACHMENT_MAX_SIZE} bytes", status=413)
+    upload = AttachmentUpload.objects.create(task=task, user=user, filename=filename, size=size, sha256=sha256)
+    os.makedirs(settings.ATTACHMENT_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(header, upload):
+    """``(start, length)`` from a Content-Range header for this upload"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('Content-Range must be "bytes <start>-<end>/<size>"')
+    start, end, total = (int(value) for value in match.groups())
+    if total != upload.size or end < start or end >= upload.size:
+        raise UploadError(f"Range does not fit an upload of {upload.size} bytes")
+    if end - start + 1 > settings.ATTACHMENT_MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks may be at most {settings.ATTACHMENT_MAX_CHUNK_SIZE} bytes", status=413)
+    return start, end - start + 1
+
+
+def _take_hash(upload, part):
+    """The running hash of the first ``upload.offset`` bytes, removed from the cache while in use"""
+    with _lock:
+        cached = _hashes.pop(upload.pk, None)
+    if cached is not None and cached[0] == upload.offset:
+        return cached[1]
+    digest = hashlib.sha256()
+    remaining = upload.offset
+    # Through the locked handle: the path may already be gone
+    part.seek(0)
+    while remaining:
+        data = part.read(min(READ_SIZE, remaining))
+        if not data:
+            break
+        digest.update(data)
+        remaining -= len(data)
+    return digest
+
+
+def _keep_hash(upload, digest):
+    with _lock:
+        _hashes[upload.pk] = (upload.offset, digest)
+        while len(_hashes) > MAX_CACHED_HASHES:
+            _hashes.popitem(last=False)
+
+
+@contextmanager
+def _locked_part(upload, blocking=True):
+    """The part file opened for update under an exclusive lock, held by one writer at a time"""
+    try:
+        part = open(part_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise _gone()
+    with part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            raise UploadError('Another chunk is being written', status=409, offset=upload.offset)
+        try:
+            yield part
+        finally:
+            fcntl.flock(part, fcntl.LOCK_UN)
+
+
+def write_chunk(upload_id, stream, start, length):
+    """
+    Append ``length`` bytes from ``stream`` at ``start``. Whatever arrives is
+    kept even if the stream ends early, in which case UploadError reports
+    the offset to resume from.
+
+    The bytes are streamed under the part file lock rather than a row lock,
+    so no transaction stays open while a large chunk arrives; the offset is
+    then moved with one conditional UPDATE.
+    """
+    try:
+        upload = AttachmentUpload.objects.get(pk=upload_id)
+    except AttachmentUpload.DoesNotExist:
+        raise _gone()
+    with _locked_part(upload, blocking=False) as part:
+        try:
+            upload.refresh_from_db(fields=['offset'])
+        except AttachmentUpload.DoesNotExist:
+            raise _gone()
+        if start != upload.offset:
+            raise UploadError(f"Expected a chunk starting at {upload.offset}", status=409, offset=upload.offset)
+
+        digest = _take_hash(upload, part)
+        received = 0
+        # Drop anything an earlier, unrecorded attempt left past the offset
+        part.seek(start)
+        part.truncate()
+        while received < length and stream is not None:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            part.write(data)
+            digest.update(data)
+            received += len(data)
+        part.flush()
+
+        upload.offset = start + received
+        upload.updated_at = timezone.now()
+        moved = AttachmentUpload.objects.filter(pk=upload.pk, offset=start).update(
+            offset=upload.offset, updated_at=upload.updated_at
+        )
+        if not moved:
+            # Deleted or completed meanwhile
+            raise UploadError('The upload changed while the chunk was written', status=409)
+        transaction.on_commit(lambda: _keep_hash(upload, digest))
+
+    if received < length:
+        raise UploadError(f"Chunk ended after {received} of {length} bytes", offset=upload.offset)
+    return upload
+
+
+def complete_upload(upload_id):
+    """Turn a fully received upload into a TaskAttachment; returns ``(attachment, sha256)``"""
+    try:
+        upload = AttachmentUpload.objects.get(pk=upload_id)
+    except AttachmentUpload.DoesNotExist:
+        raise _gone()
+    path = part_path(upload)
+    # Waits for a chunk, or another completion, still in progress
+    with _locked_part(upload) as part, transaction.atomic():
+        try:
+            upload = AttachmentUpload.objects.select_for_update().get(pk=upload_id)
+        except AttachmentUpload.DoesNotExist:
+            raise _gone()
+        if upload.offset != upload.size:
+            raise UploadError(
+                f"Only {upload.offset} of {upload.size} bytes have arrived", status=409, offset=upload.offset
+            )
+        sha256 = _take_hash(upload, part).hexdigest()
+        matches = not upload.sha256 or upload.sha256.lower() == sha256
+        if matches:
+            attachment = TaskAttachment(
+                task_id=upload.task_id, filename=upload.filename, uploaded_by_id=upload.user_id
+            )
+            part.seek(0)
+            try:
+                attachment.file.save(upload.filename, PartFile(part, path, sha256), save=False)
+            except FileNotFoundError:
+                # Purged between the lock and the move
+                raise _gone()
+            attachment.save()
+            upload.delete()
+
+    if not matches:
+        delete_upload(upload)
+        raise UploadError('Checksum mismatch; the upload was discarded', status=422)
+    # Still there when the contents were already stored
+    _remove_part(path)
+    return attachment, sha256
+
+
+def delete_upload(upload):
+    with _lock:
+        _hashes.pop(upload.pk, None)
+    _remove_part(part_path(upload))
+    upload.delete()
+
+
+def purge_stale_uploads(hours=None):
+    """Delete uploads untouched for ``hours`` (ATTACHMENT_UPLOAD_EXPIRY_HOURS); returns how many"""
+    if hours is None:
+        hours = settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS
+    cutoff = timezone.now() - timedelta(hours=hours)
+    purged = 0
+    for upload in AttachmentUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        delete_upload(upload)
+        purged += 1
+    return purged
@@ -3,8 +3,23 @@ from . import views
 
 urlpatterns = [
     path('', views.TaskListCreateView.as_view(), name='task-list-create'),
+    path('bulk/', views.TaskBulkView.as_view(), name='task-bulk'),
+    path('bulk/status/', views.task_bulk_status, name='task-bulk-status'),
     path('<int:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
     path('<int:task_id>/comments/', views.TaskCommentListCreateView.as_view(), name='task-comments'),
+    path('<int:task_id>/attachments/', views.TaskAttachmentListView.as_view(), name='task-attachments'),
+    path(
+        '<int:task_id>/attachments/uploads/',
+        views.AttachmentUploadCreateView.as_view(), name='task-attachment-uploads'
+    ),
+    path(
+        '<int:task_id>/attachments/uploads/<uuid:upload_id>/',
+        views.AttachmentUploadView.as_view(), name='task-attachment-upload'
+    ),
+    path(
+        '<int:task_id>/attachments/uploads/<uuid:upload_id>/complete/',
+        views.AttachmentUploadCompleteView.as_view(), name='task-attachment-upload-complete'
+    ),
     path('analytics/', views.task_analytics, name='task-analytics'),
     path('my-tasks/', views.my_tasks, name='my-tasks'),
 ]
@@ -1,30 +1,59 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Count, Q
+from rest_framework.views import APIView
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Lead, TruncDate
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.conf import settings
-from .models import Task, TaskComment, TaskAttachment
+from analytics.rollups import task_counts
+from projects.models import Project
+from taskmanager.compiled import CompiledListMixin, CompiledSerializer
+from taskmanager.conditional import ConditionalListMixin, conditional
+from taskmanager.fieldsets import FieldSelection, SparseFieldsetViewMixin
+from taskmanager.response_cache import CachedListMixin, cache_response
+from taskmanager.pagination import AttachmentPagination, NewestFirstPagination, OldestFirstPagination
+from . import uploads
+from .bulk import BULK_MAX_TASKS, bulk_create_tasks, bulk_set_status, bulk_update_tasks
+from .models import AttachmentUpload, Task, TaskComment, TaskAttachment, TaskStatusEvent
 from .serializers import (
     TaskSerializer, TaskListSerializer, TaskCommentSerializer,
-    TaskCommentCreateSerializer, TaskAttachmentSerializer
+    TaskCommentCreateSerializer, TaskAttachmentSerializer,
+    TaskBulkItemSerializer, TaskBulkStatusSerializer, TaskFilterSerializer,
+    AttachmentUploadSerializer
 )
+from .filters import filter_tasks, order_tasks
 
+User = get_user_model()
 
-class TaskListCreateView(generics.ListCreateAPIView):
+
+def task_filters(request):
+    """Validated list filters from the query string; raises ValidationError (400)"""
+    serializer = TaskFilterSerializer(data=request.query_params.dict())
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+class TaskListCreateView(
+    ConditionalListMixin, CachedListMixin, CompiledListMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView
+):
     serializer_class = TaskSerializer
+    conditional_namespaces = cache_namespaces = ('tasks:{viewer}', 'projects:{viewer}')
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NewestFirstPagination
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_admin:
-            return Task.objects.all()
-        elif user.is_manager:
-            return Task.objects.filter(
-                Q(assigned_to=user) | Q(created_by=user) | Q(project__created_by=user)
-            ).distinct()
-        else:
-            return Task.objects.filter(assigned_to=user)
+        queryset = Task.objects.visible_to(self.request.user)
+        if self.request.method == 'GET':
+            filters = task_filters(self.request)
+            if 'ordering' in filters and self.paginator.use_keyset(self.request):
+                raise ValidationError({'ordering': ['Cursor pagination always orders by creation time']})
+            queryset = filter_tasks(queryset, filters, self.request.user)
+            queryset = order_tasks(queryset, filters.get('ordering')).with_list_relations(self.field_selection())
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -32,29 +61,33 @@ class TaskListCreateView(generics.ListCreateAPIView):
         return TaskSerializer
 
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_admin:
-            return Task.objects.all()
-        elif user.is_manager:
-            return Task.objects.filter(
-                Q(assigned_to=user) | Q(created_by=user) | Q(project__created_by=user)
-            ).distinct()
-        else:
-            return Task.objects.filter(assigned_to=user)
-
-
-class TaskCommentListCreateView(generics.ListCreateAPIView):
+        queryset = Task.objects.visible_to(self.request.user)
+        if self.request.method in ('GET', 'PUT', 'PATCH'):
+            queryset = queryset.with_detail_relations(self.field_selection())
+        return queryset
+    
+    def perform_update(self, serializer):
+        # Attributed in the status event log
+        serializer.instance._changed_by = self.request.user
+        serializer.save()
+
+
+class TaskCommentListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     serializer_class = TaskCommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OldestFirstPagination
     
     def get_queryset(self):
         task_id = self.kwargs['task_id']
-        return TaskComment.objects.filter(task_id=task_id)
+        return TaskComment.objects.filter(
+            task_id=task_id,
+            task__in=Task.objects.visible_to(self.request.user)
+        ).select_related('user')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -63,84 +96,315 @@ class TaskCommentListCreateView(generics.ListCreateAPIView):
     
     def perform_create(self, serializer):
         task_id = self.kwargs['task_id']
-        task = Task.objects.get(id=task_id)
+        task = get_object_or_404(Task.objects.visible_to(self.request.user), id=task_id)
         serializer.save(task=task)
 
 
+class TaskAttachmentListView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """Attachments of a task; new ones arrive through the upload endpoints below"""
+    serializer_class = TaskAttachmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AttachmentPagination
+    
+    def get_queryset(self):
+        return TaskAttachment.objects.filter(
+            task_id=self.kwargs['task_id'],
+            task__in=Task.objects.visible_to(self.request.user)
+        ).select_related('uploaded_by').order_by('uploaded_at', 'id')
+
+
+def upload_error_response(error):
+    data = {'error': error.message}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    return Response(data, status=error.status)
+
+
+class AttachmentUploadMixin:
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_task(self):
+        return get_object_or_404(Task.objects.visible_to(self.request.user), id=self.kwargs['task_id'])
+    
+    def get_upload(self):
+        # Uploads are private to the user who started them
+        return get_object_or_404(
+            AttachmentUpload.objects.filter(task__in=Task.objects.visible_to(self.request.user)),
+            pk=self.kwargs['upload_id'], task_id=self.kwargs['task_id'], user=self.request.user
+        )
+
+
+class AttachmentUploadCreateView(AttachmentUploadMixin, APIView):
+    """Start a resumable upload: ``{filename, size, sha256?}``"""
+    
+    def post(self, request, task_id):
+        task = self.get_task()
+        serializer = AttachmentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = uploads.create_upload(task, request.user, **serializer.validated_data)
+        except uploads.UploadError as error:
+            return upload_error_response(error)
+        return Response(AttachmentUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class AttachmentUploadView(AttachmentUploadMixin, APIView):
+    """
+    GET reports the offset to resume from, PUT appends one chunk
+    (``Content-Range: bytes <start>-<end>/<size>``, raw bytes in the body)
+    and DELETE abandons the upload.
+    """
+    
+    def get(self, request, task_id, upload_id):
+        return Response(AttachmentUploadSerializer(self.get_upload()).data)
+    
+    def put(self, request, task_id, upload_id):
+        upload = self.get_upload()
+        try:
+            start, length = uploads.parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), upload)
+            # The raw request stream: the body is never parsed or buffered whole
+            upload = uploads.write_chunk(upload.pk, request.stream, start, length)
+        except uploads.UploadError as error:
+            return upload_error_response(error)
+        return Response(AttachmentUploadSerializer(upload).data)
+    
+    def delete(self, request, task_id, upload_id):
+        uploads.delete_upload(self.get_upload())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AttachmentUploadCompleteView(AttachmentUploadMixin, APIView):
+    """Turn a fully received upload into an attachment"""
+    
+    def post(self, request, task_id, upload_id):
+        upload = self.get_upload()
+        try:
+            attachment, sha256 = uploads.complete_upload(upload.pk)
+        except uploads.UploadError as error:
+            return upload_error_response(error)
+        data = TaskAttachmentSerializer(attachment, context={'request': request}).data
+        data['sha256'] = sha256
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+def missing_ids(queryset, ids):
+    """Ids from ``ids`` that ``queryset`` does not contain, checked in one query"""
+    found = set(queryset.filter(id__in=ids).values_list('id', flat=True))
+    return sorted(set(ids) - found)
+
+
+def check_bulk_references(rows, user):
+    """Error response if any row points at a project the user cannot see or a missing user"""
+    project_ids = {row['project_id'] for row in rows if 'project_id' in row}
+    missing = missing_ids(Project.objects.visible_to(user), project_ids)
+    if missing:
+        return Response(
+            {'error': f"Projects not found: {', '.join(map(str, missing))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    user_ids = {row['assigned_to_id'] for row in rows if 'assigned_to_id' in row}
+    missing = missing_ids(User.objects.all(), user_ids)
+    if missing:
+        return Response(
+            {'error': f"Users not found: {', '.join(map(str, missing))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
+def check_bulk_tasks(task_ids, user):
+    """Error response unless every task id is visible to the user"""
+    missing = missing_ids(Task.objects.visible_to(user), task_ids)
+    if missing:
+        return Response(
+            {'error': f"Tasks not found: {', '.join(map(str, missing))}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return None
+
+
+class TaskBulkView(APIView):
+    """
+    POST creates and PATCH partially updates up to BULK_MAX_TASKS tasks sent
+    as ``{"tasks": [...]}``; the whole batch succeeds or fails together.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_rows(self, request, partial=False):
+        items = request.data.get('tasks') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return None, Response({'error': 'Expected a non-empty "tasks" list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_MAX_TASKS:
+            return None, Response(
+                {'error': f"At most {BULK_MAX_TASKS} tasks per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = TaskBulkItemSerializer(data=items, many=True, partial=partial)
+        if not serializer.is_valid():
+            return None, Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return serializer.validated_data, None
+    
+    def post(self, request):
+        rows, error = self.get_rows(request)
+        if error is None:
+            error = check_bulk_references(rows, request.user)
+        if error is not None:
+            return error
+        
+        for row in rows:
+            row.pop('id', None)
+        tasks = bulk_create_tasks(rows, request.user)
+        return Response({'created': len(tasks), 'ids': [task.id for task in tasks]}, status=status.HTTP_201_CREATED)
+    
+    def patch(self, request):
+        rows, error = self.get_rows(request, partial=True)
+        if error is not None:
+            return error
+        
+        updates = {}
+        for row in rows:
+            task_id = row.pop('id', None)
+            if task_id is None:
+                return Response({'error': 'Every task needs an "id"'}, status=status.HTTP_400_BAD_REQUEST)
+            if task_id in updates:
+                return Response({'error': f"Task {task_id} appears more than once"}, status=status.HTTP_400_BAD_REQUEST)
+            updates[task_id] = row
+        
+        error = check_bulk_tasks(list(updates), request.user) or check_bulk_references(rows, request.user)
+        if error is not None:
+            return error
+        
+        tasks = bulk_update_tasks(updates, request.user)
+        return Response({'updated': len(tasks)})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def task_bulk_status(request):
+    """Move ``{"ids": [...], "status": ...}`` to one status in a single UPDATE"""
+    serializer = TaskBulkStatusSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    task_ids = set(serializer.validated_data['ids'])
+    if len(task_ids) > BULK_MAX_TASKS:
+        return Response({'error': f"At most {BULK_MAX_TASKS} tasks per request"}, status=status.HTTP_400_BAD_REQUEST)
+    error = check_bulk_tasks(list(task_ids), request.user)
+    if error is not None:
+        return error
+    
+    updated = bulk_set_status(task_ids, serializer.validated_data['status'], request.user)
+    return Response({'updated': updated})
+
+
+# Distributions returned by task_analytics; callers can narrow them with ?include=
+DEFAULT_ANALYTICS_DIMENSIONS = ('status', 'priority', 'workload', 'daily')
+ANALYTICS_DIMENSIONS = DEFAULT_ANALYTICS_DIMENSIONS + ('time_in_status',)
+
+
+def time_in_status(events):
+    intervals = events.annotate(
+        left_at=Window(Lead('timestamp'), partition_by=[F('task_id')], order_by=F('timestamp').asc())
+    ).values_list('to_status', 'timestamp', 'left_at')
+    
+    totals = {}
+    for status_name, entered_at, left_at in intervals:
+        if left_at is None:
+            continue
+        hours, samples = totals.get(status_name, (0.0, 0))
+        totals[status_name] = (hours + (left_at - entered_at).total_seconds() / 3600, samples + 1)
+    
+    return [
+        {'status': status_name, 'average_hours': round(hours / samples, 2), 'samples': samples}
+        for status_name, (hours, samples) in sorted(totals.items())
+    ]
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional('tasks:{viewer}', 'projects:{viewer}')
+@cache_response('tasks:{viewer}', 'projects:{viewer}')
 def task_analytics(request):
     user = request.user
     
-    # Base queryset based on user role
-    if user.is_admin:
-        tasks = Task.objects.all()
-    elif user.is_manager:
-        # Manager can see tasks they are assigned to, created by them, or in projects they created
-        tasks = Task.objects.filter(
-            Q(assigned_to=user) | Q(created_by=user) | Q(project__created_by=user)
-        ).distinct()
+    include = request.query_params.get('include')
+    if include is None:
+        dimensions = set(DEFAULT_ANALYTICS_DIMENSIONS)
     else:
-        # Intern can only see tasks assigned to them
-        tasks = Task.objects.filter(assigned_to=user)
-    
-    # Analytics data
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='completed').count()
-    in_progress_tasks = tasks.filter(status='in_progress').count()
-    overdue_tasks = tasks.filter(
-        due_date__lt=timezone.now(),
-        status__in=['todo', 'in_progress', 'review']
-    ).count()
+        dimensions = {name.strip() for name in include.split(',') if name.strip()}
+        unknown = dimensions - set(ANALYTICS_DIMENSIONS)
+        if unknown:
+            return Response(
+                {'error': f"Unknown analytics dimension(s): {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    # Base queryset based on user role
+    tasks = Task.objects.visible_to(user).order_by()
+    
+    # Counts by status come from the rollup, so they cost per key rather than per task
+    by_status = {status_key: count for (status_key,), count in task_counts(user, 'status').items()}
+    total_tasks = sum(by_status.values())
+    completed_tasks = by_status.get('completed', 0)
+    
+    data = {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'in_progress_tasks': by_status.get('in_progress', 0),
+        # The partial index on flagged tasks, plus (status, due_date) for those not swept yet
+        'overdue_tasks': tasks.overdue().count(),
+        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
+    }
     
     # Status distribution
-    status_distribution = tasks.values('status').annotate(count=Count('status'))
+    if 'status' in dimensions:
+        data['status_distribution'] = [
+            {'status': status_key, 'count': count} for status_key, count in sorted(by_status.items())
+        ]
     
-    # Priority distribution
-    priority_distribution = tasks.values('priority').annotate(count=Count('priority'))
+    # Priority distribution (priority is not a rollup key)
+    if 'priority' in dimensions:
+        data['priority_distribution'] = list(tasks.values('priority').annotate(count=Count('id')))
     
     # Tasks by user (workload distribution)
-    workload_distribution = tasks.values('assigned_to__username').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    if 'workload' in dimensions:
+        workload = task_counts(user, 'assigned_to__username')
+        data['workload_distribution'] = [
+            {'assigned_to__username': username, 'count': count}
+            for (username,), count in sorted(workload.items(), key=lambda item: (-item[1], item[0]))
+        ]
     
-    # Completion rate over time (last 30 days)
+    # Completions over time (last 30 days), bucketed by when the transition happened
     thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-    daily_completions = tasks.filter(
-        status='completed',
-        updated_at__gte=thirty_days_ago
-    ).extra(
-        select={'day': "date(tasks_task.updated_at)"}
-    ).values('day').annotate(count=Count('id')).order_by('day')
+    events = TaskStatusEvent.objects.visible_to(user).filter(timestamp__gte=thirty_days_ago)
+    if 'daily' in dimensions:
+        data['daily_completions'] = list(
+            events.filter(to_status='completed')
+            .annotate(day=TruncDate('timestamp'))
+            .values('day').annotate(count=Count('task', distinct=True)).order_by('day')
+        )
+    
+    # Average time spent in each status, for intervals that started in the window
+    if 'time_in_status' in dimensions:
+        data['time_in_status'] = time_in_status(events)
     
     # Debug information (only in development)
     if settings.DEBUG:
         print(f"User {user.username} ({user.role}) - Tasks: {total_tasks}")
-        if not user.is_admin:
-            assigned_tasks = Task.objects.filter(assigned_to=user)
-            print(f"Directly assigned tasks: {assigned_tasks.count()}")
-            for task in assigned_tasks:
-                print(f"  - {task.title} (Status: {task.status}, Project: {task.project.title})")
     
-    return Response({
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'in_progress_tasks': in_progress_tasks,
-        'overdue_tasks': overdue_tasks,
-        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
-        'status_distribution': list(status_distribution),
-        'priority_distribution': list(priority_distribution),
-        'workload_distribution': list(workload_distribution),
-        'daily_completions': list(daily_completions),
-    })
+    return Response(data)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def my_tasks(request):
     user = request.user
-    tasks = Task.objects.filter(assigned_to=user).order_by('-created_at')
-    serializer = TaskListSerializer(tasks, many=True)
+    filters = task_filters(request)
+    selection = FieldSelection.from_request(request)
+    tasks = filter_tasks(Task.objects.filter(assigned_to=user), filters, user)
+    tasks = order_tasks(tasks, filters.get('ordering')).with_list_relations(selection)
+    serializer = CompiledSerializer(TaskListSerializer, tasks, many=True, context={'selection': selection})
     return Response(serializer.data)
 
 
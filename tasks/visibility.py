@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from .models import Task, TaskVisibility
+
+
+def expected_visibility(task_ids):
+    """Map task id -> set of user ids that should be able to see it"""
+    expected = defaultdict(set)
+    rows = Task.objects.filter(id__in=task_ids).values_list(
+        'id', 'assigned_to_id', 'created_by_id', 'project__created_by_id'
+    )
+    for task_id, *user_ids in rows:
+        expected[task_id].update(user_id for user_id in user_ids if user_id)
+    return expected
+
+
+def sync_task_visibility(task_ids, expected=None):
+    """Bring the TaskVisibility rows for the given tasks in line with their current owners"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    if expected is None:
+        expected = expected_visibility(task_ids)
+    
+    existing = defaultdict(set)
+    stale = []
+    for row_id, task_id, user_id in TaskVisibility.objects.filter(
+        task_id__in=task_ids
+    ).values_list('id', 'task_id', 'user_id'):
+        if user_id in expected.get(task_id, ()):
+            existing[task_id].add(user_id)
+        else:
+            stale.append(row_id)
+    
+    if stale:
+        TaskVisibility.objects.filter(id__in=stale).delete()
+    
+    missing = [
+        TaskVisibility(task_id=task_id, user_id=user_id)
+        for task_id, user_ids in expected.items()
+        for user_id in user_ids - existing[task_id]
+    ]
+    if missing:
+        TaskVisibility.objects.bulk_create(missing, ignore_conflicts=True)
+
+
+def sync_task_instance(task):
+    """Sync a single saved task without re-reading it"""
+    user_ids = {task.assigned_to_id, task.created_by_id, task.project.created_by_id}
+    user_ids.discard(None)
+    sync_task_visibility([task.id], expected={task.id: user_ids})
+
+
+def sync_project_visibility(project, batch_size=1000):
+    """Re-sync every task in a project, e.g. after its creator changed"""
+    task_ids = list(Task.objects.filter(project=project).values_list('id', flat=True))
+    for start in range(0, len(task_ids), batch_size):
+        sync_task_visibility(task_ids[start:start + batch_size])